@@ -0,0 +1,176 @@
+"""
+ExportShield: Offline Agent Benchmark
+-------------------------------------
+Drives /agent and /evaluate through the Flask app in-process with a pool of
+concurrent clients and reports throughput, latency percentiles and the
+backend metrics snapshot.
+
+Runs without network access by replaying recorded Gemini responses
+(llm_replay.py). Make a recording once on a connected machine, then replay
+it anywhere:
+
+    python agent_benchmark.py --mode record --requests 20
+    python agent_benchmark.py --mode replay --latency-ms 600 --jitter-ms 200 --requests 500 --concurrency 16
+
+Prompts missing from the recording get a generic fallback answer
+(LLM_REPLAY_ON_MISS=fake); use --strict to fail on misses instead.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Multi-turn refinement conversations (/agent) and form submissions (/evaluate)
+AGENT_SCENARIOS = [
+    {
+        "name": "refinement",
+        "turns": [
+            ({"role": "user", "content": "I need to check an export license"}, {}),
+            ({"role": "user", "content": "Destination is China"}, {"eccn": "5A002"}),
+            ({"role": "user", "content": "ECCN 5A002, Value $5000"}, {"eccn": "5A002", "destination": "China"}),
+            ({"role": "user", "content": "End user is Huawei Technologies, commercial"}, {"eccn": "5A002", "destination": "China", "value": 5000}),
+        ],
+    },
+    {
+        "name": "full_shipment",
+        "turns": [
+            ({"role": "user", "content": "Please evaluate this complete shipment."},
+             {"eccn": "6A003", "destination": "China", "value": 2500, "endUserName": "Huawei Technologies",
+              "endUserType": "Commercial", "supplier": "Xinjiang Cotton Co", "commodity": "Raw Cotton"}),
+        ],
+    },
+    {
+        "name": "general_qa",
+        "turns": [
+            ({"role": "user", "content": "What is the difference between EAR99 and a controlled ECCN?"}, {}),
+        ],
+    },
+]
+
+EVALUATE_PAYLOADS = [
+    {"eccn": "5A002", "destination": "France", "value": 5000, "endUserType": "Commercial"},
+    {"eccn": "6A003", "destination": "China", "value": 2500, "endUserName": "Huawei Technologies",
+     "supplier": "Xinjiang Cotton Co", "commodity": "Raw Cotton", "origin": "China"},
+    {"eccn": "3A090", "destination": "Germany", "value": 120000, "endUserType": "Government",
+     "supplier": "Acme Components", "commodity": "GPU modules", "htsCode": "8473.30"},
+]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+def _run_agent_conversation(client, scenario, session_id):
+    history = []
+    latencies = []
+    for message, context in scenario["turns"]:
+        history.append(message)
+        start = time.perf_counter()
+        resp = client.post('/agent', json={"messages": history, "context": context, "session_id": session_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            raise RuntimeError(f"/agent returned {resp.status_code}")
+        history.append({"role": "assistant", "content": "ok"})
+    return latencies
+
+def _run_evaluate(client, payload):
+    start = time.perf_counter()
+    resp = client.post('/evaluate', json=payload)
+    if resp.status_code != 200:
+        raise RuntimeError(f"/evaluate returned {resp.status_code}")
+    return [(time.perf_counter() - start) * 1000]
+
+
+def run_benchmark(app, target, requests, concurrency):
+    """Returns { target, requests, errors, elapsed_s, calls_per_s, p50_ms, p95_ms, p99_ms }."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        try:
+            if target == 'agent':
+                scenario = AGENT_SCENARIOS[i % len(AGENT_SCENARIOS)]
+                lat = _run_agent_conversation(client, scenario, f"bench-{i}")
+            else:
+                lat = _run_evaluate(client, EVALUATE_PAYLOADS[i % len(EVALUATE_PAYLOADS)])
+            with lock:
+                latencies.extend(lat)
+        except Exception as e:
+            print(f"Benchmark Error: {e}", file=sys.stderr)
+            with lock:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "target": target,
+        "requests": requests,
+        "http_calls": len(latencies),
+        "errors": errors[0],
+        "elapsed_s": round(elapsed, 3),
+        "calls_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput/latency benchmark of the agent stack.")
+    parser.add_argument('--mode', choices=['replay', 'record', 'live'], default='replay')
+    parser.add_argument('--recording', help="JSONL recording path (default: LLM_RECORD_PATH)")
+    parser.add_argument('--target', choices=['agent', 'evaluate', 'both'], default='both')
+    parser.add_argument('--requests', type=int, default=100, help="Conversations (/agent) or submissions (/evaluate)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=None, help="Synthetic LLM latency in replay mode")
+    parser.add_argument('--jitter-ms', type=float, default=None)
+    parser.add_argument('--recorded-latency', action='store_true', help="Replay with the latency observed when recording")
+    parser.add_argument('--strict', action='store_true', help="Fail on prompts missing from the recording")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the LLM response cache")
+    args = parser.parse_args(argv)
+
+    # Configure before app import: the model adapter is chosen at import time
+    os.environ['LLM_MODE'] = args.mode
+    if args.recording:
+        os.environ['LLM_RECORD_PATH'] = args.recording
+    if args.latency_ms is not None:
+        os.environ['LLM_REPLAY_LATENCY_MS'] = str(args.latency_ms)
+    if args.jitter_ms is not None:
+        os.environ['LLM_REPLAY_JITTER_MS'] = str(args.jitter_ms)
+    if args.recorded_latency:
+        os.environ['LLM_REPLAY_USE_RECORDED_LATENCY'] = 'true'
+    if args.strict:
+        os.environ['LLM_REPLAY_ON_MISS'] = 'error'
+    if args.no_cache:
+        os.environ['LLM_CACHE_MAX_ENTRIES'] = '0'
+        os.environ['LLM_CACHE_DB'] = ''
+
+    from app import app
+    import metrics
+
+    targets = ['agent', 'evaluate'] if args.target == 'both' else [args.target]
+    for target in targets:
+        metrics.reset()
+        result = run_benchmark(app, target, args.requests, args.concurrency)
+        print(json.dumps(result))
+        snap = metrics.snapshot()
+        print(json.dumps({"ratios": snap["ratios"], "timings_ms": snap["timings_ms"]}, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,7 +6,16 @@ Uses Gemini 3 Pro for finding intent and generating natural language answers.
 """
 import os
 import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import google.generativeai as genai
+import metrics
+from llm_client import generate_text, stream_text
+from intent_extractor import extract as extract_intent, FAST_PATH_MIN_CONFIDENCE
+from shipment_normalizer import normalize_shipment
+from prompt_builder import PromptBuilder, render_context, PROMPT_TOKEN_BUDGET_INTENT
 from typing import List, Dict, Any, Optional
 from data_models import ShipmentCase, AgentResponse, LicenseResult, ScreeningResult, AgentMessage
 
@@ -19,161 +28,341 @@ from dps_service import screen_party
 # Global fallback (legacy) - prefer injection
 # We will remove the top-level configuration to avoid confusion/errors at import time.
 
+# Tool execution limits (per /agent turn)
+TOOL_TIMEOUT_S = float(os.getenv('TOOL_TIMEOUT_S', '5'))
+TOOL_MAX_WORKERS = int(os.getenv('TOOL_MAX_WORKERS', '8'))
+
+# Per-session tool result cache for incremental re-evaluation across turns
+AGENT_SESSION_MAX = int(os.getenv('AGENT_SESSION_MAX', '2000'))
+AGENT_SESSION_TTL_S = float(os.getenv('AGENT_SESSION_TTL_S', '1800'))
+
+def _timed(fn, *args):
+    """Run fn(*args) and return (result, elapsed_ms)."""
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, round((time.perf_counter() - start) * 1000, 2)
+
+# ShipmentCase fields each engine reads. A tool result computed on one shipment is
+# valid for another if these fields are equal.
+TOOL_INPUTS = {
+    'license': ('eccn', 'destination', 'value', 'end_user_type'),
+    'dps': ('end_user_name',),
+    'uflpa': ('supplier_name', 'commodity_description', 'origin_country', 'hts_code'),
+}
+
+def tool_inputs(name: str, shipment: ShipmentCase) -> tuple:
+    return tuple(getattr(shipment, f) for f in TOOL_INPUTS[name])
+
+metrics.register_ratio('agent.no_llm_share', 'agent.turns_without_llm', 'agent.turns')
+
+INTENT_ROUTER_HEADER = """Act as an Export Compliance Agent Router.
+Analyze the conversation history and current shipment context.
+"""
+
+INTENT_ROUTER_INSTRUCTIONS = """
+Your Goal:
+1. Determine the INTENT:
+   - 'license_check': User wants to check export license requirements. Also use this if user is providing specific shipment data (e.g. "Value is 5000").
+   - 'screening': User wants to screen a party (DPS) or supplier (UFLPA).
+   - 'full_check': User provided enough data for a full shipment evaluation.
+   - 'general_qa': User is asking a general regulatory question.
+   - 'update_details': User explicitly REQUESTS to add/edit details (e.g. "I want to add details", "Let me update"). Do NOT use this if user is just providing the data values.
+
+2. Extract ENTITIES to update the context:
+   - eccn (e.g. 5A002, 3A090), destination, value, end_user_type, end_user_name, supplier_name, commodity_description, origin_country.
+   - end_use (purpose), is_reexport (boolean), unit (e.g. kg, lbs, units).
+
+3. Identify MISSING CRITICAL FIELDS based on intent:
+   - Check 'Current Shipment Context' first (including fields listed as already provided). IF values exist there, they are NOT missing.
+   - If intent is 'license_check' OR 'full_check', check: eccn, destination, value, end_use, end_user_name, commodity_description.
+   - If intent is 'screening': end_user_name OR supplier_name.
+   - Always list ALL missing fields found.
+
+   CRITICAL: EXTRACT 'supplier_name' IF MENTIONED (e.g. "Supplier is X", "Vendor Y", "Made by Z").
+   CRITICAL: EXTRACT 'origin_country' IF MENTIONED (e.g. "From China", "Origin: CN").
+
+4. Output JSON ONLY:
+{"intent":"...","shipment_updates":{"field":"value"},"missing_fields":["eccn","destination","value","end_use","end_user_name"],"needs_clarification":true/false}
+"""
+metrics.register_ratio('agent.speculation_hit_rate', 'agent.speculation.hit', 'agent.speculation.launched')
+metrics.register_ratio('agent.tool_reuse_rate', 'agent.tools_reused', 'agent.tools_requested')
+
+
+class _SessionState:
+    """
+    What the previous turns of one conversation already computed.
+    `tools` maps tool name -> (input fingerprint, result); `shipment` is the last
+    shipment seen, used to report which fields a turn changed.
+    """
+    __slots__ = ('tools', 'shipment', 'prompt_context', 'touched')
+
+    def __init__(self):
+        self.tools = {}
+        self.shipment = None
+        self.prompt_context = None   # context the intent prompt was built from last turn
+        self.touched = time.monotonic()
+
+    def lookup(self, name: str, shipment: ShipmentCase):
+        entry = self.tools.get(name)
+        if entry is not None and entry[0] == tool_inputs(name, shipment):
+            return entry[1]
+        return None
+
+    def store(self, name: str, shipment: ShipmentCase, result):
+        self.tools[name] = (tool_inputs(name, shipment), result)
+
+    def changed_fields(self, shipment: ShipmentCase) -> List[str]:
+        current = shipment.to_dict()
+        if self.shipment is None:
+            return sorted(current)
+        keys = set(current) | set(self.shipment)
+        return sorted(k for k in keys if current.get(k) != self.shipment.get(k))
+
+
+class _SessionStore:
+    """LRU + idle TTL map of session_id -> _SessionState."""
+
+    def __init__(self, max_sessions: int = AGENT_SESSION_MAX, ttl_s: float = AGENT_SESSION_TTL_S):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> _SessionState:
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or now - state.touched > self.ttl_s:
+                state = _SessionState()
+                self._sessions[session_id] = state
+            state.touched = now
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            metrics.set_gauge('agent.sessions', len(self._sessions))
+            return state
+
+
+class _Speculation:
+    """
+    Engine runs started on the incoming context while intent inference is in flight.
+    A run is reused only if the final shipment has the same inputs for that tool.
+    """
+
+    def __init__(self, shipment: ShipmentCase, futures: Dict[str, Any]):
+        self.shipment = shipment
+        self.futures = futures
+        self.hits = []
+        self.saved_ms = 0.0
+
+    def take(self, name: str, shipment: ShipmentCase):
+        future = self.futures.pop(name, None)
+        if future is None:
+            return None
+        if tool_inputs(name, shipment) != tool_inputs(name, self.shipment):
+            future.cancel()
+            metrics.incr('agent.speculation.miss')
+            return None
+        metrics.incr('agent.speculation.hit')
+        self.hits.append(name)
+        return future
+
+    def record_saved(self, elapsed_ms: float, waited_ms: float):
+        # Engine time that overlapped inference instead of adding to the turn
+        saved = max(0.0, elapsed_ms - waited_ms)
+        self.saved_ms += saved
+        metrics.observe_ms('agent.speculation.saved', saved)
+
+    def discard(self):
+        for future in self.futures.values():
+            future.cancel()
+            metrics.incr('agent.speculation.miss')
+        self.futures.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "saved_ms": round(self.saved_ms, 2)}
+
 class AgentOrchestrator:
-    def __init__(self, model: Optional[genai.GenerativeModel] = None):
+    def __init__(self, model: Optional[genai.GenerativeModel] = None,
+                 tool_timeout: float = TOOL_TIMEOUT_S, max_workers: int = TOOL_MAX_WORKERS):
         self.model = model
+        self.tool_timeout = tool_timeout
+        # Bounded pool shared by all requests so concurrent turns can't oversubscribe engines
+        self.tool_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+        self.sessions = _SessionStore()
 
-    def infer_intent(self, messages: List[Dict[str, str]], context: Dict[str, Any]) -> Dict[str, Any]:
+    def infer_intent(self, messages: List[Dict[str, str]], context: Dict[str, Any],
+                     previous_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Uses LLM to infer user intent and extract structured data.
         Returns a dict with 'intent', 'shipment_updates', 'missing_fields', 'needs_clarification'.
+        `previous_context` (the context of the last prompt sent) lets the prompt name the changed fields.
         """
+        return self._fast_path_intent(messages, context) or self._model_intent(messages, context, previous_context)
+
+    def _fast_path_intent(self, messages: List[Dict[str, str]], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Deterministic extraction for plain shipment-data messages; None if not confident enough."""
+        last_user = next((m.get('content', '') for m in reversed(messages) if m.get('role', 'user') == 'user'), '')
+        fast = extract_intent(last_user, context)
+        if fast['confidence'] < FAST_PATH_MIN_CONFIDENCE:
+            return None
+        metrics.incr('agent.intent_fast_path')
+        fast['source'] = 'fast_path'
+        return self._finalize_inference(fast, context)
+
+    def _model_intent(self, messages: List[Dict[str, str]], context: Dict[str, Any],
+                      previous_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if not self.model:
-            return {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [], "needs_clarification": False}
-
-        # Safer message processing
-        history_lines = []
-        for m in messages[-4:]:
-            role = m.get('role', 'user')
-            content = m.get('content', '')
-            history_lines.append(f"{role}: {content}")
-        
-        history_text = "\n".join(history_lines)
-        current_data = json.dumps(context)
-        
-        prompt = f"""
-        Act as an Export Compliance Agent Router.
-        Analyze the conversation history and current shipment context.
-        
-        Current Shipment Context: {current_data}
-        
-        Conversation History:
-        {history_text}
-        
-        Your Goal:
-        1. Determine the INTENT:
-           - 'license_check': User wants to check export license requirements. Also use this if user is providing specific shipment data (e.g. "Value is 5000").
-           - 'screening': User wants to screen a party (DPS) or supplier (UFLPA).
-           - 'full_check': User provided enough data for a full shipment evaluation.
-           - 'general_qa': User is asking a general regulatory question.
-           - 'update_details': User explicitly REQUESTS to add/edit details (e.g. "I want to add details", "Let me update"). Do NOT use this if user is just providing the data values.
-        
-        2. Extract ENTITIES to update the context:
-           - eccn (e.g. 5A002, 3A090), destination, value, end_user_type, end_user_name, supplier_name, commodity_description, origin_country.
-           - end_use (purpose), is_reexport (boolean), unit (e.g. kg, lbs, units).
-           
-        3. Identify MISSING CRITICAL FIELDS based on intent:
-           - Check 'Current Shipment Context' first. IF values exist there, they are NOT missing.
-           - If intent is 'license_check' OR 'full_check':
-             - Missing 'eccn'? (Only if context.eccn is empty/null)
-             - Missing 'destination'? (Only if context.destination is empty/null)
-             - Missing 'value'? (Only if context.value is empty/null)
-             - Missing 'end_use'? (Only if context.end_use is empty/null)
-             - Missing 'end_user_name'? (Only if context.end_user_name is empty/null)
-             - Missing 'commodity_description'? (Only if context.commodity_description is empty/null)
-           - If intent is 'screening':
-             - Missing 'end_user_name' OR 'supplier_name'?
-           - Always list ALL missing fields found.
-           
-           CRITICAL: EXTRACT 'supplier_name' IF MENTIONED (e.g. "Supplier is X", "Vendor Y", "Made by Z").
-           CRITICAL: EXTRACT 'origin_country' IF MENTIONED (e.g. "From China", "Origin: CN").
-
-        4. Output JSON ONLY:
-        {{
-            "intent": "...",
-            "shipment_updates": {{ "field": "value" }},
-            "missing_fields": ["eccn", "destination", "value", "end_use", "end_user_name"], 
-            "needs_clarification": true/false
-        }}
-        """
+            return {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [], "needs_clarification": False, "source": "fallback"}
+
+        builder = PromptBuilder(PROMPT_TOKEN_BUDGET_INTENT)
+        builder.add(INTENT_ROUTER_HEADER)
+        builder.add("Current Shipment Context:")
+        builder.add(render_context(context, previous_context, empty_text="No shipment data yet."))
+        builder.add("\nConversation History:")
+        builder.add_history(messages[-8:], user_label="user", assistant_label="assistant")
+        builder.add(INTENT_ROUTER_INSTRUCTIONS)
+        prompt = builder.build()
+        metrics.set_gauge('agent.intent_prompt_tokens_est', builder.stats['prompt_tokens_est'])
+        metrics.incr('agent.intent_history_summarized', builder.stats['history_summarized'])
+        metrics.incr('agent.intent_history_dropped', builder.stats['history_dropped'])
         
         try:
-            print(f"DEBUG: calling intent LLM with history size {len(history_lines)}", flush=True)
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response_text = generate_text(self.model, prompt, generation_config={"response_mime_type": "application/json"}, label='intent')
             print("DEBUG: Intent LLM responded", flush=True)
-            parsed = json.loads(response.text)
+            parsed = json.loads(response_text)
             print(f"DEBUG: Parsed Extraction: {json.dumps(parsed)}", flush=True) # DEBUG LOG
-            
-            # Double Check: Remove fields from 'missing_fields' if they are already in the context
-            # This is the "No Looping" enforcement layer
-            final_missing = []
-            updates = parsed.get('shipment_updates', {})
-            
-            for field in parsed.get('missing_fields', []):
-                # Check if it's in existing context OR in the new updates
-                # Map field names if necessary (e.g. 'destination' vs 'destination_country')
-                has_value_in_context = context.get(field) or context.get(field.lower()) or context.get(field.replace('_', ''))
-                has_value_in_updates = updates.get(field) or updates.get(field.lower())
-                
-                if not has_value_in_context and not has_value_in_updates:
-                    final_missing.append(field)
-
-            # FORCE CHECK: Programmatically ensure extended fields are requested if intent is relevant
-            # This bypasses LLM randomness to satisfy user requirement for "End User" etc.
-            if parsed['intent'] in ['license_check', 'full_check']:
-                required_extended = ['end_use', 'end_user_name', 'commodity_description']
-                for req in required_extended:
-                    has_val = context.get(req) or updates.get(req)
-                    if not has_val and req not in final_missing:
-                         final_missing.append(req)
-            
-            parsed['missing_fields'] = final_missing
-            
-            # Special logic: If no missing fields for license check, upgrade intent
-            if parsed['intent'] == 'license_check' and not final_missing:
-                parsed['intent'] = 'full_check'
-
-            return parsed
+            parsed['source'] = 'llm'
+            return self._finalize_inference(parsed, context)
         except Exception as e:
             print(f"Intent Inference Error: {e}")
             # Fallback to general QA if inference fails
-            return {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [], "needs_clarification": False}
+            return {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [], "needs_clarification": False, "source": "llm",
+                    "error": str(e)}
+
+    def _finalize_inference(self, parsed: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """Shared post-processing for LLM and fast-path inference results."""
+        # Double Check: Remove fields from 'missing_fields' if they are already in the context
+        # This is the "No Looping" enforcement layer
+        final_missing = []
+        updates = parsed.get('shipment_updates', {})
+        
+        for field in parsed.get('missing_fields', []):
+            # Check if it's in existing context OR in the new updates
+            # Map field names if necessary (e.g. 'destination' vs 'destination_country')
+            has_value_in_context = context.get(field) or context.get(field.lower()) or context.get(field.replace('_', ''))
+            has_value_in_updates = updates.get(field) or updates.get(field.lower())
+            
+            if not has_value_in_context and not has_value_in_updates:
+                final_missing.append(field)
+
+        # FORCE CHECK: Programmatically ensure extended fields are requested if intent is relevant
+        # This bypasses LLM randomness to satisfy user requirement for "End User" etc.
+        if parsed['intent'] in ['license_check', 'full_check']:
+            required_extended = ['end_use', 'end_user_name', 'commodity_description']
+            for req in required_extended:
+                has_val = context.get(req) or updates.get(req)
+                if not has_val and req not in final_missing:
+                     final_missing.append(req)
+        
+        parsed['missing_fields'] = final_missing
+        
+        # Special logic: If no missing fields for license check, upgrade intent
+        if parsed['intent'] == 'license_check' and not final_missing:
+            parsed['intent'] = 'full_check'
+
+        return parsed
+
+    def _run_license(self, shipment: ShipmentCase) -> LicenseResult:
+        lic_data = run_license_exception_engine(
+            shipment.eccn, 
+            shipment.destination, 
+            shipment.value or 0, 
+            shipment.end_user_type
+        )
+        return LicenseResult(
+            status=lic_data['status'],
+            exceptions=lic_data.get('results', []),
+            trace=lic_data['trace'],
+            details={"eccn_description": lic_data.get('eccn_description')}
+        )
 
-    def execute_tools(self, intent: str, shipment: ShipmentCase) -> Dict[str, Any]:
+    def _run_dps(self, shipment: ShipmentCase) -> ScreeningResult:
+        dps_data = screen_party(shipment.end_user_name)
+        return ScreeningResult(
+            engine="DPS",
+            outcome=dps_data['status'], 
+            risk_level=dps_data['status'] if dps_data['status'] != 'CLEAR' else 'LOW',
+            matches=dps_data.get('matches', []),
+            reasoning=[dps_data.get('message', '')]
+        )
+
+    def _run_uflpa(self, shipment: ShipmentCase) -> ScreeningResult:
+        uflpa_data = screen_forced_labour(
+            shipment.supplier_name or "",
+            shipment.commodity_description or "",
+            shipment.origin_country or "",
+            "", # region
+            shipment.hts_code
+        )
+        return ScreeningResult(
+            engine="UFLPA",
+            outcome="WARNING" if uflpa_data['risk_level'] != 'CLEAR' else 'CLEAR',
+            risk_level=uflpa_data['risk_level'],
+            matches={'match': uflpa_data.get('matches', {})},
+            reasoning=uflpa_data.get('reasons', [])
+        )
+
+    def select_tools(self, intent: str, shipment: ShipmentCase) -> Dict[str, Any]:
+        """Engines that `intent` calls for and that have enough data to run for this shipment."""
+        jobs = {}
+        # License Check
+        if intent in ['license_check', 'full_check'] and shipment.eccn and shipment.destination:
+            jobs['license'] = self._run_license
+        # DPS runs whenever an end user is known
+        if shipment.end_user_name:
+            jobs['dps'] = self._run_dps
+        # UFLPA
+        if intent in ['screening', 'full_check'] or (shipment.supplier_name or shipment.origin_country):
+            if shipment.supplier_name or shipment.commodity_description or shipment.origin_country or shipment.hts_code:
+                jobs['uflpa'] = self._run_uflpa
+        return jobs
+
+    def speculate(self, shipment: ShipmentCase, session: Optional[_SessionState] = None) -> Optional[_Speculation]:
+        """Start every runnable engine on `shipment` without waiting for intent."""
+        jobs = self.select_tools('full_check', shipment)
+        if session:
+            # Already answered for these inputs on an earlier turn
+            jobs = {name: fn for name, fn in jobs.items() if session.lookup(name, shipment) is None}
+        if not jobs:
+            return None
+        futures = {name: self.tool_executor.submit(_timed, fn, shipment) for name, fn in jobs.items()}
+        metrics.incr('agent.speculation.launched', len(futures))
+        return _Speculation(shipment, futures)
+
+    def execute_tools(self, intent: str, shipment: ShipmentCase, timings: Optional[Dict[str, float]] = None,
+                      speculation: Optional[_Speculation] = None,
+                      session: Optional[_SessionState] = None) -> Dict[str, Any]:
         """
         Runs appropriate internal engines safely.
+        Selected engines run concurrently on the shared tool executor, each with its
+        own deadline. A failed or timed-out engine (license included) degrades to UNKNOWN.
+        Per-tool durations (ms) are written into `timings` if given; for a failed or
+        timed-out tool that is how long the turn waited on it.
+        Results from earlier turns of `session` are reused when the tool's input
+        fields (TOOL_INPUTS) are unchanged; runs already started by `speculate`
+        are reused when their inputs still match.
         """
         results = {
             "license": None,
             "dps": None,
             "uflpa": None
         }
-        
-        # License Check
-        if intent in ['license_check', 'full_check']:
-            # Require minimum viable data to run engine
-            if shipment.eccn and shipment.destination:
-                try:
-                    lic_data = run_license_exception_engine(
-                        shipment.eccn, 
-                        shipment.destination, 
-                        shipment.value or 0, 
-                        shipment.end_user_type
-                    )
-                    results['license'] = LicenseResult(
-                        status=lic_data['status'],
-                        exceptions=lic_data.get('results', []),
-                        trace=lic_data['trace'],
-                        details={"eccn_description": lic_data.get('eccn_description')}
-                    )
-                except Exception as e:
-                    print(f"License Engine Error: {e}")
-        
+        jobs = self.select_tools(intent, shipment)
+
         # DPS
         if intent in ['screening', 'full_check'] or shipment.end_user_name:
-            if shipment.end_user_name:
-                try:
-                    dps_data = screen_party(shipment.end_user_name)
-                    results['dps'] = ScreeningResult(
-                        engine="DPS",
-                        outcome=dps_data['status'], 
-                        risk_level=dps_data['status'] if dps_data['status'] != 'CLEAR' else 'LOW',
-                        matches=dps_data.get('matches', []),
-                        reasoning=[dps_data.get('message', '')]
-                    )
-                except Exception as e:
-                    print(f"DPS Error: {e}")
-            else:
+            if 'dps' not in jobs:
                 # Explicit UNKNOWN for clarity (Enterprise Requirement)
                 results['dps'] = ScreeningResult(
                     engine="DPS",
@@ -185,24 +374,7 @@ class AgentOrchestrator:
 
         # UFLPA
         if intent in ['screening', 'full_check'] or (shipment.supplier_name or shipment.origin_country):
-            if shipment.supplier_name or shipment.commodity_description or shipment.origin_country:
-                try:
-                    uflpa_data = screen_forced_labour(
-                        shipment.supplier_name or "",
-                        shipment.commodity_description or "",
-                        shipment.origin_country or "",
-                        "" # region
-                    )
-                    results['uflpa'] = ScreeningResult(
-                        engine="UFLPA",
-                        outcome="WARNING" if uflpa_data['risk_level'] != 'CLEAR' else 'CLEAR',
-                        risk_level=uflpa_data['risk_level'],
-                        matches={'match': uflpa_data.get('matches', {})},
-                        reasoning=uflpa_data.get('reasons', [])
-                    )
-                except Exception as e:
-                     print(f"UFLPA Error: {e}")
-            else:
+            if 'uflpa' not in jobs:
                 # Explicit UNKNOWN for clarity (Enterprise Requirement)
                 results['uflpa'] = ScreeningResult(
                      engine="UFLPA",
@@ -211,6 +383,59 @@ class AgentOrchestrator:
                      matches=[],
                      reasoning=["Supplier/Commodity missing. Traceability not run."]
                 )
+
+        # Dispatch concurrently; each tool records its own wall time
+        futures = {}
+        speculative = set()
+        metrics.incr('agent.tools_requested', len(jobs))
+        for name, fn in jobs.items():
+            cached = session.lookup(name, shipment) if session else None
+            if cached is not None:
+                results[name] = cached
+                metrics.incr('agent.tools_reused')
+                if timings is not None:
+                    timings[name] = 0.0
+                continue
+            future = speculation.take(name, shipment) if speculation else None
+            if future is not None:
+                speculative.add(name)
+            else:
+                future = self.tool_executor.submit(_timed, fn, shipment)
+            futures[name] = future
+        deadline = time.monotonic() + self.tool_timeout
+        for name, future in futures.items():
+            try:
+                wait_start = time.perf_counter()
+                value, elapsed_ms = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                if name in speculative:
+                    speculation.record_saved(elapsed_ms, (time.perf_counter() - wait_start) * 1000)
+                results[name] = value
+                if session:
+                    session.store(name, shipment, value)
+                if timings is not None:
+                    timings[name] = elapsed_ms
+            except Exception as e:
+                timed_out = isinstance(e, FutureTimeoutError)
+                future.cancel()
+                print(f"{name.upper()} Tool {'Timeout' if timed_out else 'Error'}: {e}")
+                if timings is not None:
+                    # How long the turn actually waited on this tool
+                    timings[name] = round((time.perf_counter() - wait_start) * 1000, 2)
+                failure = 'timed out' if timed_out else 'failed'
+                if name == 'license':
+                    results[name] = LicenseResult(
+                        status="UNKNOWN",
+                        trace=[f"License determination {failure}. Result unavailable."],
+                        details={"error": "timeout" if timed_out else "error"}
+                    )
+                else:
+                    results[name] = ScreeningResult(
+                        engine=name.upper(),
+                        outcome="UNKNOWN",
+                        risk_level="UNKNOWN",
+                        matches=[],
+                        reasoning=[f"{name.upper()} screening {failure}. Result unavailable."]
+                    )
                 
         return results
 
@@ -242,48 +467,81 @@ class AgentOrchestrator:
     def generate_next_steps(self, tool_results):
         actions = []
         # Logic to suggest next steps
-        if tool_results.get('license'):
+        if tool_results.get('license') and tool_results['license'].status != 'UNKNOWN':
              # Return structured actions for ActionButtons.jsx
              actions.append({"label": "Download PDF", "type": "pdf"})
              actions.append({"label": "Email Summary", "type": "email"})
         
         return actions
 
-    def process_request(self, messages: List[Dict[str, str]], current_shipment: Dict[str, Any]) -> Dict[str, Any]:
-        # 1. Infer Intent
-        inference = self.infer_intent(messages, current_shipment)
+    def build_shipment(self, context: Dict[str, Any], updates: Dict[str, Any]) -> ShipmentCase:
+        """Merges inferred updates into the request context and maps keys onto ShipmentCase."""
+        return normalize_shipment(context, updates)
+
+    @staticmethod
+    def _drain(messages_list: List[AgentMessage], cursor: List[int]):
+        """Yield bubbles appended since the last drain."""
+        while cursor[0] < len(messages_list):
+            yield 'message', messages_list[cursor[0]]
+            cursor[0] += 1
+
+    def process_request(self, messages: List[Dict[str, str]], current_shipment: Dict[str, Any],
+                        session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Blocking variant: runs the full turn and returns the AgentResponse dict."""
+        for event, payload in self.iter_events(messages, current_shipment, session_id=session_id):
+            if event == 'final':
+                return payload.to_dict()
+
+    def iter_events(self, messages: List[Dict[str, str]], current_shipment: Dict[str, Any], stream_tokens: bool = False,
+                    session_id: Optional[str] = None):
+        """
+        Runs one agent turn as a stream of (event, payload) pairs:
+          ('status', {...})          - progress markers
+          ('message', AgentMessage)  - each bubble as soon as it is built
+          ('token', str)             - narrative text chunks (only if stream_tokens)
+          ('final', AgentResponse)   - complete response, always last
+        With a `session_id`, engine results carry over between turns and only the
+        engines whose input fields changed are re-run.
+        """
+        metrics.incr('agent.turns')
+        turn_start = time.perf_counter()
+        cursor = [0]
+        session = self.sessions.get(session_id) if session_id else None
+        yield 'status', {"stage": "inferring_intent"}
+
+        # 1. Infer Intent (the fast path answers without the LLM)
+        inference = self._fast_path_intent(messages, current_shipment)
+        speculation = None
+        if inference is None:
+            # Speculate: while the intent LLM is in flight, run the engines on the
+            # context we already have. Reused below only if their inputs don't change.
+            if self.model:
+                speculation = self.speculate(self.build_shipment(current_shipment, {}), session)
+            inference = self._model_intent(messages, current_shipment, session.prompt_context if session else None)
+        if session and inference.get('source') == 'llm' and 'error' not in inference:
+            # Only a prompt the model actually answered counts as "last turn"
+            session.prompt_context = dict(current_shipment)
+        llm_used = inference.get('source') == 'llm'
         intent = inference.get('intent', 'general_qa')
         updates = inference.get('shipment_updates') or {}
         missing_fields = inference.get('missing_fields') or []
         needs_clarification = inference.get('needs_clarification', False)
         
         # 2. Update Shipment Case
-        normalized_data = {}
-        combined_data = {**current_shipment, **updates}
-        
-        for k, v in combined_data.items():
-            key = k.lower()
-            if 'user' in key and 'type' in key: normalized_data['end_user_type'] = v
-            elif 'user' in key and 'name' in key: normalized_data['end_user_name'] = v
-            elif 'supplier' in key: normalized_data['supplier_name'] = v
-            elif 'commodity' in key or 'prod' in key: normalized_data['commodity_description'] = v
-            elif 'origin' in key: normalized_data['origin_country'] = v
-            elif 'use' in key and 'end' in key and 'type' not in key and 'name' not in key: normalized_data['end_use'] = v
-            elif 'reexport' in key: normalized_data['is_reexport'] = str(v).lower() == 'true'
-            elif 'unit' in key: normalized_data['unit'] = v
-            elif key == 'valueusd': 
-                try:
-                    normalized_data['value'] = float(str(v).replace('$', '').replace(',', ''))
-                except:
-                    normalized_data['value'] = 0.0
-            else: normalized_data[k] = v 
-            
-        shipment = ShipmentCase(**{k: v for k, v in normalized_data.items() if k in ShipmentCase.__annotations__})
+        shipment = self.build_shipment(current_shipment, updates)
         
         # 3. Execute Tools
         tool_results = {"license": None, "dps": None, "uflpa": None}
+        tool_timings = {}
         if intent != 'general_qa':
-            tool_results = self.execute_tools(intent, shipment)
+            yield 'status', {"stage": "running_tools", "intent": intent}
+            tool_results = self.execute_tools(intent, shipment, tool_timings, speculation, session)
+        if speculation:
+            speculation.discard()
+        changed_fields = None
+        if session:
+            changed_fields = session.changed_fields(shipment)
+            session.shipment = shipment.to_dict()
             
         # 4. Build Structured Messages (ENTERPRISE SINGLE BUBBLE MODEL)
         messages_list = []
@@ -298,6 +556,7 @@ class AgentOrchestrator:
         
         if confirmed_chips:
             messages_list.append(AgentMessage(role="assistant", kind="confirmation_chips", data={"chips": confirmed_chips}))
+        yield from self._drain(messages_list, cursor)
 
 
         # --- BUBBLE 2: SUMMARY & CONTENT CONTENT ---
@@ -369,6 +628,9 @@ class AgentOrchestrator:
             # Logic: If restricted license or bad screening, escalate risk
             if tool_results.get('license') and tool_results['license'].status == 'RESTRICTED':
                 status = "RESTRICTED"; risk_level = "HIGH"
+            elif tool_results.get('license') and tool_results['license'].status == 'UNKNOWN':
+                # License engine failed or timed out: never report the shipment as clean
+                status = "UNKNOWN"; risk_level = "UNKNOWN"
             
             # DPS/UFLPA logic
             dps_res = tool_results.get('dps')
@@ -395,6 +657,7 @@ class AgentOrchestrator:
                 role="assistant", kind="verdict_card",
                 data={"status": status, "risk_level": risk_level, "summary": f"Shipment to {shipment.destination}"}
             ))
+            yield from self._drain(messages_list, cursor)
 
             # 3. Exception Grid
             if tool_results['license'] and tool_results['license'].exceptions:
@@ -437,8 +700,25 @@ class AgentOrchestrator:
             narrative = "I cannot answer that."
             try:
                 if self.model:
-                    resp = self.model.generate_content(qa_prompt); narrative = resp.text.strip()
-            except: pass
+                    llm_used = True
+                    if stream_tokens:
+                        chunks = []
+                        for chunk in stream_text(self.model, qa_prompt, label='qa'):
+                            chunks.append(chunk)
+                            yield 'token', chunk
+                        narrative = ''.join(chunks).strip() or narrative
+                    else:
+                        narrative = generate_text(self.model, qa_prompt, label='qa').strip()
+            except Exception: pass
             messages_list.append(AgentMessage(role="assistant", kind="text", content=narrative))
             
-        return AgentResponse(shipment=shipment, messages=messages_list, mood=mood, intent=intent, needs_clarification=needs_clarification, missing_fields=missing_fields).to_dict()
+        yield from self._drain(messages_list, cursor)
+        if not llm_used:
+            metrics.incr('agent.turns_without_llm')
+        metrics.observe_ms('agent.turn', (time.perf_counter() - turn_start) * 1000)
+        meta = {"tool_timings_ms": tool_timings, "intent_source": inference.get('source')}
+        if speculation:
+            meta["speculation"] = speculation.summary()
+        if session:
+            meta["changed_fields"] = changed_fields
+        yield 'final', AgentResponse(shipment=shipment, messages=messages_list, mood=mood, intent=intent, needs_clarification=needs_clarification, missing_fields=missing_fields, meta=meta, session_id=session_id)
@@ -4,8 +4,10 @@ Flask Backend for Export Compliance Assistant
 """
 import os
 import json
+import sqlite3
+import time
 import uuid
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import google.generativeai as genai
@@ -16,12 +18,25 @@ load_dotenv()
 # Import New Engines
 from license_exceptions_engine import run_license_exception_engine, get_all_countries
 from forced_labour_screening import screen_forced_labour
+from hts_risk_index import lookup_hts_risk_batch
+from supply_chain_graph import SupplyChainGraph, screen_skus
 from dps_service import screen_party # Keeping DPS as experimental/separate for now
 from agent_orchestrator import AgentOrchestrator
+import metrics
+from shipment_normalizer import unknown_key_stats
+from evaluation_store import EVALUATION_STORE
+from job_queue import JOB_QUEUE, PermanentJobError
+from insight_service import InsightService, evaluation_id_for, insight_id_for, template_insight
+from batch_evaluation import BatchInputError, BatchRowError, BatchSummary, iter_chunks, iter_json_rows, EVALUATE_BATCH_MAX_ROWS
+from llm_client import generate_text
+from llm_gateway import LLMGateway
+from llm_replay import RecordingModel, ReplayModel, LLM_MODE, LLM_RECORD_PATH
 
 
 # Import Utils
-from chat_agent import get_chat_response, add_message, log_audit_event
+from chat_agent import (get_chat_response, get_or_create_conversation, record_turn, update_context,
+                        log_audit_event, get_audit_log)
+from audit_store import AUDIT_STORE, parse_time
 from export_utils import generate_report_data, generate_pdf_report, format_report_as_text, format_report_as_json
 
 
@@ -31,33 +46,63 @@ app = Flask(__name__)
 CORS(app)
 
 # Configure Gemini
+# All model calls go through LLMGateway (concurrency cap, deadlines, retries, circuit breaker).
+# LLM_FAKE_URL swaps Gemini for the local fake server (fake_llm_server.py) in tests/load runs.
+# LLM_MODE=record captures prompt/response pairs to LLM_RECORD_PATH; LLM_MODE=replay serves them offline.
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-if GOOGLE_API_KEY:
+LLM_FAKE_URL = os.getenv('LLM_FAKE_URL')
+if LLM_MODE == 'replay':
+    base_model = ReplayModel()
+    print(f"DEBUG: Replaying LLM responses from {LLM_RECORD_PATH}", flush=True)
+elif LLM_FAKE_URL:
+    from fake_llm_server import FakeModel  # test/load-run stand-in, only imported when configured
+    base_model = FakeModel(LLM_FAKE_URL)
+    print(f"DEBUG: Using fake LLM server at {LLM_FAKE_URL}", flush=True)
+elif GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-2.0-flash')  # Faster than gemini-3-pro-preview
+    base_model = genai.GenerativeModel('gemini-2.0-flash')  # Faster than gemini-3-pro-preview
     print(f"DEBUG: GOOGLE_API_KEY loaded: {GOOGLE_API_KEY[:5]}...", flush=True)
 else:
-    model = None
+    base_model = None
     print("WARNING: No GOOGLE_API_KEY found. AI features disabled.")
 
+if base_model is not None and LLM_MODE == 'record':
+    base_model = RecordingModel(base_model)
+    print(f"DEBUG: Recording LLM responses to {LLM_RECORD_PATH}", flush=True)
+
+model = LLMGateway(base_model) if base_model is not None else None
+if model:
+    model.start_background_warmup()
+
 # Initialize Orchestrator
 # Initialize Orchestrator
 orchestrator = AgentOrchestrator(model=model)
 
+# Deferred /evaluate AI insight (LLM off the request path, templated fallback past the deadline)
+INSIGHTS = InsightService(model, store=EVALUATION_STORE)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check for readiness probes."""
     return jsonify({"status": "healthy", "service": "export-compliance-backend"}), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """In-process counters and timings for this worker."""
+    snapshot = metrics.snapshot()
+    snapshot["unknown_shipment_keys"] = unknown_key_stats()
+    return jsonify(snapshot)
+
+
 @app.route('/agent', methods=['POST'])
 def agent_endpoint():
     print("DEBUG: Entered agent_endpoint", flush=True)
     """
     Main Agent Endpoint.
     Orchestrates logic based on refined ShipmentCase and intent.
-    Input: { "messages": [...], "context": {...} }
-    Output: AgentResponse JSON
+    Input: { "messages": [...], "context": {...}, "session_id": optional }
+    Output: AgentResponse JSON (echoes session_id; send it back to reuse engine results across turns)
     """
     data = request.json
     if not data:
@@ -65,15 +110,54 @@ def agent_endpoint():
         
     messages = data.get('messages', [])
     context = data.get('context', {})
+    session_id = data.get('session_id') or str(uuid.uuid4())
     
     # Process via Orchestrator
     try:
-        response = orchestrator.process_request(messages, context)
+        response = orchestrator.process_request(messages, context, session_id=session_id)
         return jsonify(response)
     except Exception as e:
         print(f"Agent Error: {e}")
         return jsonify({"error": str(e), "message": "An error occurred while processing your request."}), 500
 
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@app.route('/agent/stream', methods=['POST'])
+def agent_stream_endpoint():
+    """
+    Streaming variant of /agent (Server-Sent Events).
+    Events: status, message (one AgentMessage per bubble), token (narrative text chunks),
+    done (full AgentResponse), error.
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    messages = data.get('messages', [])
+    context = data.get('context', {})
+    session_id = data.get('session_id') or str(uuid.uuid4())
+
+    def generate():
+        try:
+            for event, payload in orchestrator.iter_events(messages, context, stream_tokens=True, session_id=session_id):
+                if event == 'message':
+                    yield _sse('message', payload.to_dict())
+                elif event == 'token':
+                    yield _sse('token', {"text": payload})
+                elif event == 'final':
+                    yield _sse('done', payload.to_dict())
+                else:
+                    yield _sse(event, payload)
+        except Exception as e:
+            print(f"Agent Stream Error: {e}")
+            yield _sse('error', {"error": str(e), "message": "An error occurred while processing your request."})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx/Railway)
+    })
+
 @app.route('/countries', methods=['GET'])
 def get_countries():
     """Return list of all available countries."""
@@ -81,10 +165,203 @@ def get_countries():
 
 @app.route('/evaluate', methods=['POST'])
 def evaluate():
+    """
+    Runs all engines and persists the result; the AI insight is deferred.
+    The response carries `evaluation_id` (pass it to /report or /send-email;
+    omitted if the evaluation store is unavailable) and `insight_id`: poll
+    /insights/<insight_id> or stream /insights/<insight_id>/stream for the
+    insight text. `?insight=wait` blocks until the insight is ready (bounded
+    by INSIGHT_DEADLINE_S).
+    """
     data = request.json
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
+    license_outcome, uflpa_outcome, dps_outcome = run_engines(data)
+    _log_evaluation(data, license_outcome, uflpa_outcome)
+    result = {
+        "license_results": license_outcome,
+        "uflpa_results": uflpa_outcome,
+        "dps_results": dps_outcome,
+        "ai_insight": None,
+        "insight_status": "pending",
+    }
+    evaluation_id = _save_evaluation(data, result)
+    insight_id = INSIGHTS.submit(evaluation_id, data, license_outcome, uflpa_outcome)
+
+    wait_s = None if request.args.get('insight') == 'wait' else 0
+    insight = INSIGHTS.wait(insight_id, timeout_s=wait_s)
+    result.update(ai_insight=insight["ai_insight"], insight_status=insight["status"], insight_source=insight["source"])
+    if evaluation_id:
+        result["evaluation_id"] = evaluation_id
+    return jsonify({**result, "insight_id": insight_id})
+
+@app.route('/insights/<insight_id>', methods=['GET'])
+def get_insight(insight_id):
+    """Deferred AI insight for an evaluation: { status: pending|ready, source: llm|template, ai_insight }."""
+    insight = _insight_state(insight_id, wait_s=0)
+    if insight is None:
+        return jsonify({"error": f"Insight {insight_id} not found"}), 404
+    return jsonify(insight)
+
+@app.route('/insights/<insight_id>/stream', methods=['GET'])
+def stream_insight(insight_id):
+    """SSE: `pending` once, then a single `insight` event when the text is ready."""
+    insight = _insight_state(insight_id, wait_s=0)
+    if insight is None:
+        return jsonify({"error": f"Insight {insight_id} not found"}), 404
+
+    def generate():
+        state = insight
+        if state["status"] != 'ready':
+            yield _sse('pending', state)
+            while state is not None and state["status"] != 'ready':
+                state = _insight_state(insight_id, wait_s=1.0)
+                if state is not None and state["status"] != 'ready':
+                    yield ": keepalive\n\n"
+        yield _sse('insight', state)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _insight_state(insight_id, wait_s=0):
+    """
+    Insight dict from this process, or from the stored evaluation when another
+    worker (or a previous process) took the request. A stored insight still
+    pending past its deadline is settled with the template here.
+    """
+    state = INSIGHTS.wait(insight_id, timeout_s=wait_s)
+    if state is not None:
+        return state
+    evaluation_id = evaluation_id_for(insight_id)
+    stored = EVALUATION_STORE.get(evaluation_id)
+    if stored is None:
+        return None
+    result = stored['result']
+    if result.get('insight_status', 'ready') != 'ready':
+        if time.time() - stored['created_at'] < INSIGHTS.deadline_s:
+            if wait_s:
+                time.sleep(min(wait_s, 0.25))
+            return {"insight_id": insight_id, "evaluation_id": evaluation_id, "status": 'pending',
+                    "source": None, "ai_insight": None, "latency_ms": None}
+        result = _settle_stored_insight(evaluation_id, stored['input'], result)
+    return {"insight_id": insight_id, "evaluation_id": evaluation_id, "status": 'ready',
+            "source": result.get('insight_source', 'llm'), "ai_insight": result.get('ai_insight'), "latency_ms": None}
+
+def _settle_stored_insight(evaluation_id, data, result):
+    """Stored result with its insight filled in (waits for this process's pending insight, else the template)."""
+    if result.get('insight_status', 'ready') == 'ready':
+        return result
+    state = INSIGHTS.wait(insight_id_for(evaluation_id))
+    if state is None:
+        text = template_insight(data, result.get('license_results', {}), result.get('uflpa_results', {}))
+        EVALUATION_STORE.set_insight(evaluation_id, text, 'template')
+        state = {"ai_insight": text, "source": 'template'}
+    return {**result, "ai_insight": state["ai_insight"], "insight_status": 'ready', "insight_source": state["source"]}
+
+@app.route('/evaluate/batch', methods=['POST'])
+def evaluate_batch():
+    """
+    Evaluates many shipments in one request.
+    Body: JSON array or NDJSON of /evaluate payloads. Response: NDJSON, one
+    line per input as soon as its chunk is done ({index, ref, license_results,
+    uflpa_results, dps_results} or {index, error}), then one {summary} line.
+    ?insight=summary adds one AI insight for the whole batch (per-row insight is never run).
+    Results are not stored and the audit log gets one summary event per batch.
+    """
+    want_insight = request.args.get('insight', 'none') == 'summary'
+    stream = request.stream
+    batch_id = f"BATCH-{uuid.uuid4().hex[:12].upper()}"
+
+    def generate():
+        summary = BatchSummary()
+        start = time.perf_counter()
+        index = 0
+        try:
+            for chunk in iter_chunks(iter_json_rows(stream)):
+                too_many = index + len(chunk) > EVALUATE_BATCH_MAX_ROWS
+                chunk = chunk[:EVALUATE_BATCH_MAX_ROWS - index]
+                lines = []
+                hts_entries = lookup_hts_risk_batch([row.get('htsCode', '') if isinstance(row, dict) else '' for row in chunk])
+                for row, hts_entry in zip(chunk, hts_entries):
+                    out = {"index": index}
+                    if isinstance(row, dict):
+                        ref = row.get('id') or row.get('reference') or row.get('ref')
+                        if ref is not None:
+                            out["ref"] = ref
+                        try:
+                            license_outcome, uflpa_outcome, dps_outcome = run_engines(row, hts_entry)
+                            summary.add(row, license_outcome, uflpa_outcome, dps_outcome)
+                            out.update(license_results=license_outcome, uflpa_results=uflpa_outcome,
+                                       dps_results=dps_outcome)
+                        except Exception as e:
+                            summary.add_error()
+                            out["error"] = str(e)
+                    else:
+                        summary.add_error()
+                        out["error"] = str(row) if isinstance(row, BatchRowError) else "Row is not a JSON object"
+                    lines.append(json.dumps(out, default=str))
+                    index += 1
+                metrics.incr('evaluate_batch.rows', len(chunk))
+                if lines:
+                    yield "\n".join(lines) + "\n"
+                if too_many:
+                    raise BatchInputError(f"Batch exceeds {EVALUATE_BATCH_MAX_ROWS} rows")
+        except BatchInputError as e:
+            yield json.dumps({"index": index, "error": str(e), "fatal": True}) + "\n"
+
+        result = {"batch_id": batch_id, **summary.to_dict()}
+        if want_insight and model and summary.rows > summary.errors:
+            try:
+                result["ai_insight"] = generate_text(model, summary.insight_prompt(), label='insight').strip()
+            except Exception as e:
+                print(f"Gemini Error: {e}")
+                result["ai_insight"] = "AI Insights unavailable."
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        log_audit_event('evaluation_batch', {
+            'batch_id': batch_id,
+            'rows': summary.rows,
+            'errors': summary.errors,
+            'license_status': dict(summary.license_status),
+            'uflpa_risk': dict(summary.uflpa_risk),
+        })
+        metrics.observe_ms('evaluate_batch', result["elapsed_ms"])
+        yield json.dumps({"summary": result}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Batch-Id': batch_id, 'X-Accel-Buffering': 'no'})
+
+def run_evaluation(data):
+    """License, UFLPA and DPS engines plus the consolidated AI insight for one form submission."""
+    license_outcome, uflpa_outcome, dps_outcome = run_engines(data)
+    _log_evaluation(data, license_outcome, uflpa_outcome)
+
+    # AI insight, bounded by the hedged deadline (templated insight if the LLM is slow)
+    ai_insight = INSIGHTS.generate(data, license_outcome, uflpa_outcome)
+
+    return {
+        "license_results": license_outcome,
+        "uflpa_results": uflpa_outcome,
+        "dps_results": dps_outcome,
+        "ai_insight": ai_insight
+    }
+
+def _log_evaluation(data, license_outcome, uflpa_outcome):
+    log_audit_event('evaluation', {
+        'eccn': data.get('eccn', ''), 
+        'destination': data.get('destination', ''),
+        'supplier': data.get('supplier', ''),
+        'license_status': license_outcome['status'],
+        'risk_factors': uflpa_outcome['risk_level']
+    })
+
+def run_engines(data, hts_entry=None):
+    """
+    (license, uflpa, dps) outcomes for one shipment; no audit entry, no LLM call.
+    `hts_entry` is the shipment's precomputed HTS index match (batch callers).
+    """
     # 1. License Exception Engine
     # ---------------------------
     eccn = data.get('eccn', '')
@@ -102,8 +379,11 @@ def evaluate():
     commodity = data.get('commodity', '') # Description acts as commodity often
     origin = data.get('origin', '')
     region = data.get('region', '')
+    hts_code = data.get('htsCode', '')
+    supplier_address = data.get('supplierAddress', '')
     
-    uflpa_outcome = screen_forced_labour(supplier, commodity, origin, region)
+    uflpa_outcome = screen_forced_labour(supplier, commodity, origin, region, hts_code, supplier_address,
+                                         hts_entry=hts_entry)
     
     # 3. DPS (Experimental/Future)
     # ----------------------------
@@ -112,40 +392,34 @@ def evaluate():
     if end_user_name:
         dps_outcome = screen_party(end_user_name)
 
-    # 4. Audit Log
-    # ------------
-    log_audit_event('evaluation', {
-        'eccn': eccn, 
-        'destination': destination,
-        'supplier': supplier,
-        'risk_factors': uflpa_outcome['risk_level']
-    })
-
-    # 5. AI Insight (Consolidated)
-    # ----------------------------
-    ai_insight = "AI Insights unavailable."
-    if model:
-        try:
-            prompt = (
-                f"Act as an Export Compliance Specialist.\n"
-                f"Review this shipment:\n"
-                f"1. License Check: {license_outcome['status']}. ECCN {eccn} to {destination}. Exceptions: {[r['code'] for r in license_outcome['results'] if r['type']=='EXCEPTION']}\n"
-                f"2. Forced Labor Check: {uflpa_outcome['risk_level']}. Supplier: {supplier}. Commodity: {commodity}.\n\n"
-                f"Provide 2 concise paragraphs:\n"
-                f"- License View: Summary of license requirements/exceptions.\n"
-                f"- Supply Chain View: Summary of UFLPA risks and recommended due diligence."
-            )
-            response = model.generate_content(prompt)
-            ai_insight = response.text.strip()
-        except Exception as e:
-            print(f"Gemini Error: {e}")
+    return license_outcome, uflpa_outcome, dps_outcome
 
-    return jsonify({
-        "license_results": license_outcome,
-        "uflpa_results": uflpa_outcome,
-        "dps_results": dps_outcome,
-        "ai_insight": ai_insight
-    })
+def _resolve_evaluation(data):
+    """
+    Returns (input_data, result, evaluation_id) for a /report or /send-email request.
+    With `evaluationId` the stored evaluation is used as-is (input_data is None if unknown);
+    raw form data is evaluated once and stored (evaluation_id is None if storing failed).
+    """
+    evaluation_id = data.get('evaluationId') or data.get('evaluation_id')
+    if evaluation_id:
+        stored = EVALUATION_STORE.get(evaluation_id)
+        if stored is None:
+            return None, None, evaluation_id
+        # Stored input wins so the report always matches the stored result
+        result = _settle_stored_insight(evaluation_id, stored['input'], stored['result'])
+        return {**data, **stored['input']}, result, evaluation_id
+
+    result = run_evaluation(data)
+    return data, result, _save_evaluation(data, result)
+
+def _save_evaluation(data, result):
+    """Stores the evaluation and returns its ID, or None if the store is unavailable (the result is still served)."""
+    try:
+        return EVALUATION_STORE.save(data, result)
+    except sqlite3.Error as e:
+        print(f"Evaluation store error: {e}")
+        metrics.incr('evaluation_store.errors')
+        return None
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -158,40 +432,31 @@ def chat():
     user_message = data.get('message', '')
     form_context = data.get('context', {})
     
-    # Update context if form data provided
+    # Update context if form data provided (facts kept by conversation compaction)
     if form_context:
-        # This function is no longer imported, assuming it's handled by get_chat_response or removed.
-        # For now, commenting out or adapting based on new chat_agent.
-        # update_context(session_id, form_context)
-        pass # Placeholder for context handling if needed by new chat_agent
+        update_context(session_id, form_context)
     
-    # Add user message to history
-    add_message(session_id, 'user', user_message)
-    
-    # Get compliance results if context has ECCN
+    # Engine results for the current form (deterministic, no LLM): grounded answers,
+    # and the tool results conversation compaction builds its decisions from
     compliance_results = None
-    if form_context.get('eccn'):
-        # This logic needs to be updated to use the new evaluate function structure
-        # For now, keeping it simple or assuming get_chat_response handles it.
-        # compliance_results, _ = evaluate_export(form_context)
-        pass
-    
-    # Generate AI response
+    context = get_or_create_conversation(session_id).get('context', {})
+    if context.get('eccn'):
+        try:
+            license_outcome, uflpa_outcome, dps_outcome = run_engines(context)
+            compliance_results = {
+                "license_results": license_outcome,
+                "uflpa_results": uflpa_outcome,
+                "dps_results": dps_outcome,
+            }
+        except (TypeError, ValueError) as e:
+            print(f"Chat Engine Error: {e}")  # incomplete/invalid form data: answer without results
+    
+    # Generate AI response; both messages are recorded in the session either way
     ai_response = "I'm here to help with export compliance. What would you like to know?"
     if model:
-        try:
-            # Assuming get_chat_response now handles building prompt and context
-            # Fix: Pass 'model' as 3rd arg, and form_context/results as 4th?
-            # Actually chat_agent.py expects (session_id, user_message, model, compliance_results)
-            # We treat form_context as compliance_results/context for now?
-            # Actually update_context should be called first if we want context.
-            ai_response = get_chat_response(session_id, user_message, model, form_context)
-        except Exception as e:
-            print(f"Gemini Chat Error: {e}")
-            ai_response = "I'm having trouble connecting right now. Please try again."
-    
-    # Add AI response to history
-    add_message(session_id, 'assistant', ai_response)
+        ai_response = get_chat_response(session_id, user_message, model, compliance_results)
+    else:
+        record_turn(session_id, user_message, ai_response, compliance_results)
     
     # Log to audit
     log_audit_event('chat', {'message': user_message, 'context': form_context}, ai_response)
@@ -209,8 +474,10 @@ def generate_report():
     if not data:
         return jsonify({"error": "No data provided"}), 400
     
-    # Run evaluation (using the new evaluate logic)
-    evaluation_response = evaluate().json # Call the evaluate endpoint internally
+    # Render from the stored evaluation (or evaluate once if only form data was sent)
+    report_input, evaluation_response, evaluation_id = _resolve_evaluation(data)
+    if evaluation_response is None:
+        return jsonify({"error": f"Evaluation {evaluation_id} not found"}), 404
     
     results = evaluation_response.get('license_results', {})
     uflpa_results = evaluation_response.get('uflpa_results', {})
@@ -218,7 +485,8 @@ def generate_report():
     ai_suggestion = evaluation_response.get('ai_insight', "No AI recommendation available.")
     
     # Generate report
-    report_data = generate_report_data(data, results, uflpa_results, dps_results, ai_suggestion)
+    report_data = generate_report_data(report_input, results, uflpa_results, dps_results, ai_suggestion)
+    report_data['evaluation_id'] = evaluation_id
     report_format = data.get('format', 'json')
     
     if report_format == 'pdf':
@@ -234,9 +502,43 @@ def generate_report():
 
 @app.route('/audit', methods=['GET'])
 def get_audit():
-    """Get the audit log."""
-    limit = request.args.get('limit', 50, type=int)
-    return jsonify({"audit_log": get_audit_log(limit)})
+    """
+    Get the audit log, newest first.
+    Filters: event_type, eccn, destination, party, since/until (epoch seconds or ISO-8601).
+    Pass `cursor` from the previous page's `next_cursor` to page back in time.
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    try:
+        events, next_cursor = get_audit_log(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            event_type=request.args.get('event_type'),
+            eccn=request.args.get('eccn'),
+            destination=request.args.get('destination'),
+            party=request.args.get('party'),
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filter: {e}"}), 400
+    return jsonify({"audit_log": events, "next_cursor": next_cursor})
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """
+    Usage counters from the audit rollups: all-time totals by event type, status,
+    destination, ECCN and risk, plus a per-bucket series.
+    granularity: minute | hour (default) | day; since/until: epoch seconds or ISO-8601.
+    """
+    try:
+        stats = AUDIT_STORE.usage(
+            granularity=request.args.get('granularity', 'hour'),
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    return jsonify(stats)
 
 
 @app.route('/screen-dps', methods=['POST'])
@@ -275,6 +577,31 @@ def screen_uflpa_endpoint():
     
     return jsonify(result)
 
+@app.route('/screen-supply-chain', methods=['POST'])
+def screen_supply_chain_endpoint():
+    """
+    Multi-tier UFLPA screening over a supplier graph.
+    Input: { "edges": [{buyer, supplier, material, region}], "roots": ["SKU-1", ...] }
+    """
+    data = request.json
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    roots = data.get('roots') or ([data['root']] if data.get('root') else [])
+    if not roots:
+        return jsonify({"error": "At least one root (finished good / SKU) is required"}), 400
+
+    graph = SupplyChainGraph.from_edges(data.get('edges', []))
+    results = screen_skus(graph, roots)
+
+    log_audit_event('SUPPLY_CHAIN_SCREEN', {
+        'roots': roots,
+        'edges': graph.edge_count,
+        'flagged': [r['root'] for r in results if r['risk_level'] != 'CLEAR']
+    })
+
+    return jsonify({"results": results})
+
 @app.route('/email-status', methods=['GET'])
 def email_status():
     """Check email service configuration status."""
@@ -283,56 +610,77 @@ def email_status():
 
 @app.route('/send-email', methods=['POST'])
 def send_email():
-    """Send compliance report via email."""
-    from email_service import email_service, generate_compliance_email_html
-    from export_utils import generate_report_data, generate_pdf_report
-    
+    """
+    Queue a compliance report email.
+    Rendering and SMTP delivery run on the job queue; the response carries
+    `job_id` right away (poll /jobs/<job_id> for the outcome).
+    """
     data = request.json
+    if not data:
+        return jsonify({'success': False, 'error': 'No data provided'}), 400
     to_email = data.get('email')
     
     if not to_email:
         return jsonify({'success': False, 'error': 'Email address required'}), 400
-    
-    # 1. License Engine
-    eccn = data.get('eccn', '')
-    destination = data.get('destination', '')
-    value = float(data.get('value', 0))
-    end_user_type = data.get('endUserType', 'Commercial')
-    
-    license_results = run_license_exception_engine(eccn, destination, value, end_user_type)
 
-    # 2. UFLPA Engine
-    supplier = data.get('supplier', '')
-    commodity = data.get('commodity', '') # Description
-    origin = data.get('origin', '')
-    region = data.get('region', '')
-    
-    uflpa_results = screen_forced_labour(supplier, commodity, origin, region)
-    
-    # 3. DPS (Mock)
-    dps_results = None
-    if data.get('endUserName'):
-         dps_results = screen_party(data.get('endUserName'))
-
-    # AI Insight
-    ai_suggestion = ""
-    if GOOGLE_API_KEY and model:
-        try:
-             prompt = f"Summarize compliance for ECCN {eccn} to {destination} in 2 sentences."
-             response = model.generate_content(prompt)
-             ai_suggestion = response.text.strip()
-        except Exception:
-             pass
+    # Fail now rather than as a permanent job failure the UI never sees
+    from email_service import email_service
+    if not email_service.is_configured():
+        return jsonify({'success': False, 'error': f'Email not configured. Provider: {email_service.provider}.'}), 503
+    
+    # Resolve (or evaluate once and store) here so the job only needs the ID
+    report_input, evaluation, evaluation_id = _resolve_evaluation(data)
+    if evaluation is None:
+        return jsonify({'success': False, 'error': f'Evaluation {evaluation_id} not found'}), 404
+    if evaluation_id is None:
+        # The job loads the evaluation by ID
+        return jsonify({'success': False, 'error': 'Evaluation store unavailable, please retry.'}), 503
+
+    job_id = JOB_QUEUE.enqueue('send_email', {
+        'to_email': to_email,
+        'evaluation_id': evaluation_id,
+        'include_pdf': data.get('includePdf', True),
+    })
+    return jsonify({
+        'success': True,
+        'queued': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'evaluation_id': evaluation_id,
+    }), 202
+
+def _send_report_email_job(payload):
+    """Job handler: render the stored evaluation and deliver it. Raises on failure so the queue retries."""
+    from email_service import email_service, generate_compliance_email_html
+
+    if not email_service.is_configured():
+        raise PermanentJobError(f'Email not configured. Provider: {email_service.provider}.')
+
+    to_email = payload['to_email']
+    evaluation_id = payload['evaluation_id']
+    stored = EVALUATION_STORE.get(evaluation_id)
+    if stored is None:
+        raise PermanentJobError(f'Evaluation {evaluation_id} not found')
+    report_input = stored['input']
+    evaluation = _settle_stored_insight(evaluation_id, report_input, stored['result'])
+
+    eccn = report_input.get('eccn', '')
+    destination = report_input.get('destination', '')
+    license_results = evaluation.get('license_results', {})
+    uflpa_results = evaluation.get('uflpa_results', {})
+    dps_results = evaluation.get('dps_results')
+    ai_suggestion = evaluation.get('ai_insight', '')
 
     # Generate Report
-    report_data = generate_report_data(data, license_results, uflpa_results, dps_results, ai_suggestion)
+    report_data = generate_report_data(report_input, license_results, uflpa_results, dps_results, ai_suggestion)
+    report_data['evaluation_id'] = evaluation_id
     
     # Generate email HTML
     html_content = generate_compliance_email_html(report_data)
     
     # Generate PDF attachment
     attachments = []
-    if data.get('includePdf', True):
+    if payload.get('include_pdf', True):
         try:
             pdf_bytes = generate_pdf_report(report_data)
             attachments.append({
@@ -354,12 +702,27 @@ def send_email():
     # Log the email send attempt
     log_audit_event('email_send', {
         'to': to_email,
+        'evaluation_id': evaluation_id,
         'eccn': eccn,
         'destination': destination,
         'success': result.get('success', False)
     })
-    
-    return jsonify(result)
+
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or 'Email delivery failed')
+    return result
+
+JOB_QUEUE.register('send_email', _send_report_email_job)
+# Start the pool at import (per gunicorn worker) so jobs left in JOB_QUEUE_DB resume without a new enqueue
+JOB_QUEUE.start()
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a queued job: queued | running | retrying | succeeded | failed."""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=False)
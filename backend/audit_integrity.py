@@ -0,0 +1,212 @@
+"""
+Audit Integrity
+---------------
+Tamper evidence for the audit segments written by audit_store.
+
+- Every record is hash-chained to its predecessor in the same writer
+  series: hash = SHA-256(prev_hash || event bytes), stored next to the
+  event as  {"seq":N,"prev":"<hex>","hash":"<hex>","event":{...}}
+- Every AUDIT_SEAL_EVERY records (or AUDIT_SEAL_INTERVAL_S, or at segment
+  rollover) the writer seals the new records: a Merkle root over their
+  hashes goes to <writer>.seals, each seal chained to the previous one and
+  HMAC-signed when AUDIT_SEAL_KEY is set (without a key, someone able to
+  rewrite the files could also recompute the hashes)
+
+verify_directory() checks segments in parallel processes (chain, seal
+roots, MACs), then the links between segments and between seals.
+"""
+import hashlib
+import hmac
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+AUDIT_SEAL_EVERY = int(os.getenv('AUDIT_SEAL_EVERY', '1000'))
+AUDIT_SEAL_INTERVAL_S = float(os.getenv('AUDIT_SEAL_INTERVAL_S', '10'))
+AUDIT_SEAL_KEY = os.getenv('AUDIT_SEAL_KEY', '')
+
+GENESIS = '0' * 64
+SEAL_SUFFIX = '.seals'
+
+_EVENT_MARKER = b',"event":'
+
+
+def chain_hash(prev_hex, event_bytes):
+    """Raw SHA-256 digest of prev_hash || event bytes."""
+    return hashlib.sha256(bytes.fromhex(prev_hex) + event_bytes).digest()
+
+def record_line(seq, prev_hex, hash_hex, event_bytes):
+    return b'{"seq":%d,"prev":"%s","hash":"%s","event":%s}\n' % (seq, prev_hex.encode(), hash_hex.encode(), event_bytes)
+
+def parse_record(line):
+    """(seq, prev_hex, hash_hex, event_bytes) from one record line (exact event bytes, as hashed)."""
+    split = line.index(_EVENT_MARKER)
+    head = json.loads(line[:split] + b'}')
+    event_bytes = line[split + len(_EVENT_MARKER):line.rindex(b'}')]
+    return head['seq'], head['prev'], head['hash'], event_bytes
+
+def merkle_root(leaves):
+    """Hex Merkle root over raw leaf digests (odd node carried up by duplication)."""
+    if not leaves:
+        return GENESIS
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+def seal_record(writer_id, segment, first_seq, last_seq, root, prev_seal, sealed_at, key=AUDIT_SEAL_KEY):
+    body = {
+        "writer": writer_id,
+        "segment": segment,
+        "first_seq": first_seq,
+        "last_seq": last_seq,
+        "root": root,
+        "prev_seal": prev_seal,
+        "sealed_at": sealed_at,
+    }
+    body["seal_hash"] = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    if key:
+        body["mac"] = hmac.new(key.encode(), body["seal_hash"].encode(), hashlib.sha256).hexdigest()
+    return body
+
+def _seal_errors(seal, key):
+    body = {k: v for k, v in seal.items() if k not in ('seal_hash', 'mac')}
+    errors = []
+    if hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest() != seal.get('seal_hash'):
+        errors.append(f"seal {seal.get('first_seq')}-{seal.get('last_seq')}: seal hash mismatch")
+    if key:
+        expected = hmac.new(key.encode(), str(seal.get('seal_hash')).encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, seal.get('mac', '')):
+            errors.append(f"seal {seal.get('first_seq')}-{seal.get('last_seq')}: bad MAC")
+    return errors
+
+
+# =============================================================================
+# VERIFICATION
+# =============================================================================
+
+def verify_segment(path, seals, key=AUDIT_SEAL_KEY):
+    """
+    Checks one segment: hash chain, seq continuity and every seal over it.
+    Returns { segment, records, first_seq, first_prev, last_seq, last_hash, sealed_through, errors }.
+    """
+    name = os.path.basename(path)
+    seals = sorted(seals, key=lambda s: s['first_seq'])
+    errors = []
+    result = {"segment": name, "records": 0, "first_seq": None, "first_prev": None,
+              "last_seq": None, "last_hash": None, "sealed_through": None, "errors": errors}
+    prev_hash = None
+    leaves = []
+    seal_i = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                errors.append(f"{name}: torn record after seq {result['last_seq']}")
+                break
+            try:
+                seq, prev, stored_hash, event_bytes = parse_record(line)
+            except (ValueError, KeyError) as e:
+                errors.append(f"{name}: unreadable record after seq {result['last_seq']}: {e}")
+                break
+            if result["first_seq"] is None:
+                result["first_seq"], result["first_prev"] = seq, prev
+            elif seq != result["last_seq"] + 1:
+                errors.append(f"{name}: seq gap {result['last_seq']} -> {seq}")
+            if prev_hash is not None and prev != prev_hash:
+                errors.append(f"{name}: seq {seq} does not chain to seq {result['last_seq']}")
+            digest = chain_hash(prev, event_bytes)
+            if digest.hex() != stored_hash:
+                errors.append(f"{name}: seq {seq} hash mismatch (record edited)")
+            prev_hash = stored_hash
+            result["last_seq"], result["last_hash"] = seq, stored_hash
+            result["records"] += 1
+
+            # Seal windows are contiguous seq ranges inside this segment
+            if seal_i < len(seals) and seals[seal_i]['first_seq'] <= seq <= seals[seal_i]['last_seq']:
+                leaves.append(digest)
+                if seq == seals[seal_i]['last_seq']:
+                    seal = seals[seal_i]
+                    if merkle_root(leaves) != seal['root']:
+                        errors.append(f"{name}: seal {seal['first_seq']}-{seal['last_seq']} Merkle root mismatch")
+                    errors.extend(_seal_errors(seal, key))
+                    result["sealed_through"] = seq
+                    leaves = []
+                    seal_i += 1
+    for seal in seals[seal_i:]:
+        errors.append(f"{name}: seal {seal['first_seq']}-{seal['last_seq']} covers missing records")
+    return result
+
+
+def _load_seals(directory):
+    """writer_id -> seals in file order."""
+    seals = {}
+    for name in os.listdir(directory):
+        if not name.endswith(SEAL_SUFFIX):
+            continue
+        writer = name[:-len(SEAL_SUFFIX)]
+        with open(os.path.join(directory, name), 'rb') as f:
+            seals[writer] = [json.loads(line) for line in f if line.endswith(b"\n")]
+    return seals
+
+def _writer_of(segment_name):
+    return segment_name.rsplit('-', 1)[0]
+
+def verify_directory(directory, segment_names, workers=None, key=AUDIT_SEAL_KEY):
+    """
+    Verifies all segments (in parallel) plus cross-segment and seal-chain links.
+    Returns { ok, segments, records, sealed_records, unsealed_records, errors }.
+    """
+    all_seals = _load_seals(directory)
+    errors = []
+    for writer, seals in all_seals.items():
+        prev = GENESIS
+        for seal in seals:
+            if seal.get('prev_seal') != prev:
+                errors.append(f"{writer}.seals: seal {seal.get('first_seq')}-{seal.get('last_seq')} breaks the seal chain")
+            prev = seal.get('seal_hash')
+
+    present = set(segment_names)
+    for writer, seals in all_seals.items():
+        for missing in sorted({s.get('segment') for s in seals} - present):
+            errors.append(f"{writer}.seals: sealed segment {missing} is missing")
+
+    jobs = []
+    for name in segment_names:
+        seals = [s for s in all_seals.get(_writer_of(name), []) if s.get('segment') == name]
+        jobs.append((os.path.join(directory, name), seals, key))
+    if workers == 1 or len(jobs) <= 1:
+        results = [verify_segment(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(verify_segment, *zip(*jobs)))
+
+    # Segments of one writer must chain end-to-start, starting from genesis
+    last_by_writer = {}
+    for r in results:
+        errors.extend(r["errors"])
+        if r["records"] == 0:
+            continue
+        writer = _writer_of(r["segment"])
+        prev = last_by_writer.get(writer)
+        expected_prev, expected_seq = (GENESIS, 1) if prev is None else (prev["last_hash"], prev["last_seq"] + 1)
+        if r["first_prev"] != expected_prev or r["first_seq"] != expected_seq:
+            errors.append(f"{r['segment']}: does not continue the previous segment of writer {writer}")
+        last_by_writer[writer] = r
+
+    # A writer's seals must cover its records up to the last seal (missing tail segments)
+    for writer, seals in all_seals.items():
+        if seals and seals[-1]['last_seq'] > last_by_writer.get(writer, {}).get('last_seq', 0):
+            errors.append(f"{writer}: sealed records through seq {seals[-1]['last_seq']} are missing")
+
+    records = sum(r["records"] for r in results)
+    sealed = sum(s['last_seq'] - s['first_seq'] + 1 for seals in all_seals.values() for s in seals)
+    return {
+        "ok": not errors,
+        "segments": len(results),
+        "records": records,
+        "sealed_records": sealed,
+        "unsealed_records": max(0, records - sealed),
+        "errors": errors,
+    }
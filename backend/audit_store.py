@@ -0,0 +1,466 @@
+"""
+Audit Store
+-----------
+Durable, append-only compliance record behind log_audit_event.
+
+- Events are queued in memory and written by one background thread per
+  process, so log_audit_event never waits on disk
+- The writer group-commits: it collects events for up to
+  AUDIT_COMMIT_INTERVAL_MS (or AUDIT_COMMIT_MAX_EVENTS), appends them as
+  JSON lines to the current segment and fsyncs once per batch
+- Segments are per writer process (<start>-<pid>-<n>.log) and roll over at
+  AUDIT_SEGMENT_MAX_MB; they are never rewritten
+- A SQLite index (WAL, shared by all workers) maps event_type, ECCN,
+  destination, party and time to (segment, offset, length); /audit pages
+  through it newest first with an opaque cursor
+- Usage rollups (usage_stats.py) are updated in the same index
+  transaction, so /stats never scans the log
+
+Records are hash-chained and sealed under Merkle-root checkpoints
+(audit_integrity.py). The segments are the source of truth:
+
+    python audit_store.py verify     # chain + seals, segments in parallel
+    python audit_store.py reindex    # rebuild the index from the segments
+"""
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import metrics
+from audit_integrity import (AUDIT_SEAL_EVERY, AUDIT_SEAL_INTERVAL_S, AUDIT_SEAL_KEY, GENESIS, SEAL_SUFFIX,
+                             chain_hash, record_line, parse_record, merkle_root, seal_record, verify_directory)
+from usage_stats import UsageRollups, usage_keys
+
+AUDIT_DIR = os.getenv('AUDIT_DIR', os.path.join(os.path.dirname(__file__), 'data', 'audit'))
+AUDIT_SEGMENT_MAX_MB = float(os.getenv('AUDIT_SEGMENT_MAX_MB', '64'))
+AUDIT_COMMIT_INTERVAL_MS = float(os.getenv('AUDIT_COMMIT_INTERVAL_MS', '5'))
+AUDIT_COMMIT_MAX_EVENTS = int(os.getenv('AUDIT_COMMIT_MAX_EVENTS', '2000'))
+AUDIT_FSYNC = os.getenv('AUDIT_FSYNC', 'true').lower() == 'true'
+
+_INDEX_FILE = 'index.sqlite3'
+# Retry interval for index rows whose transaction failed (e.g. "database is locked")
+_INDEX_RETRY_S = 1.0
+_SEGMENT_SUFFIX = '.log'
+
+# input_data keys that name the counterparty, in priority order
+_PARTY_KEYS = ('company', 'end_user_name', 'endUserName', 'supplier', 'party', 'to')
+
+
+def _fold(value):
+    return str(value).strip().lower() if value not in (None, '') else None
+
+def index_fields(event):
+    """(event_type, eccn, destination, party) for one event; nested `context` dicts count too."""
+    data = event.get('input_data') or {}
+    if not isinstance(data, dict):
+        data = {}
+    context = data.get('context') if isinstance(data.get('context'), dict) else {}
+    eccn = data.get('eccn') or context.get('eccn')
+    destination = data.get('destination') or context.get('destination')
+    party = next((data[k] for k in _PARTY_KEYS if isinstance(data.get(k), str) and data[k]), None)
+    if party is None:
+        party = next((context[k] for k in _PARTY_KEYS if isinstance(context.get(k), str) and context[k]), None)
+    return (
+        event.get('event_type'),
+        str(eccn).strip().upper() if eccn else None,
+        _fold(destination),
+        _fold(party),
+    )
+
+
+class AuditStore:
+    def __init__(self, directory=AUDIT_DIR, segment_max_mb=AUDIT_SEGMENT_MAX_MB,
+                 commit_interval_ms=AUDIT_COMMIT_INTERVAL_MS, commit_max_events=AUDIT_COMMIT_MAX_EVENTS,
+                 fsync=AUDIT_FSYNC, seal_every=AUDIT_SEAL_EVERY, seal_interval_s=AUDIT_SEAL_INTERVAL_S,
+                 seal_key=AUDIT_SEAL_KEY):
+        self.directory = directory
+        self.segment_max_bytes = int(segment_max_mb * 1024 * 1024)
+        self.commit_interval_s = commit_interval_ms / 1000
+        self.commit_max_events = max(1, commit_max_events)
+        self.fsync = fsync
+        self.seal_every = max(1, seal_every)
+        self.seal_interval_s = seal_interval_s
+        self.seal_key = seal_key
+        self._local = threading.local()
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._committed_cond = threading.Condition(self._lock)
+        self._enqueued = 0
+        self._committed = 0
+        self._pid = None
+        self._segment = None   # (name, file)
+        self._segment_no = 0
+        self._writer_id = None
+        self._rollups = UsageRollups()
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS audit_index ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, event_type TEXT, eccn TEXT,"
+            " destination TEXT, party TEXT, segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+        )
+        for column in ('event_type', 'eccn', 'destination', 'party'):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS audit_{column} ON audit_index ({column}, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS audit_ts ON audit_index (ts)")
+        UsageRollups.create(conn)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, _INDEX_FILE), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------------------------------
+    # Write path
+    # -------------------------------------------------------------------------
+
+    def append(self, event):
+        """Queues one event for the writer thread; returns immediately."""
+        self._ensure_writer()
+        # Serialize now: later changes to the caller's dict must not reach the record
+        line = json.dumps(event, default=str, separators=(',', ':')).encode('utf-8')
+        entry = (time.time(), *index_fields(event), usage_keys(event), line)
+        with self._lock:
+            self._enqueued += 1
+            backlog = self._enqueued - self._committed
+        self._queue.put(entry)
+        metrics.set_gauge('audit.backlog', backlog)
+
+    def flush(self, timeout_s=5.0):
+        """Blocks until everything appended so far is on disk. False on timeout."""
+        deadline = time.monotonic() + timeout_s
+        with self._committed_cond:
+            target = self._enqueued
+            while self._committed < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._committed_cond.wait(remaining)
+        return True
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # New process (first use or after fork): own writer thread and segment series
+            self._pid = os.getpid()
+            self._queue = queue.SimpleQueue()
+            self._enqueued = self._committed = 0
+            self._segment = None
+            self._segment_no = 0
+            self._writer_id = f"{int(time.time() * 1000):012x}-{os.getpid()}"
+            # Hash chain and seal state of this writer series
+            self._seq = 0
+            self._prev_hash = GENESIS
+            self._unsealed = []
+            self._prev_seal = GENESIS
+            self._last_seal = time.monotonic()
+            self._seal_file = None
+            self._index_backlog = []   # [(rows, usage)] written to segments, not yet indexed
+            threading.Thread(target=self._writer, name='audit-writer', daemon=True).start()
+
+    def _writer(self):
+        while True:
+            if self._index_backlog:
+                timeout = _INDEX_RETRY_S
+            else:
+                timeout = self.seal_interval_s if self._unsealed else None
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                # Idle: seal the tail so it is not left unsealed until the next event
+                try:
+                    self._seal()
+                except Exception as e:
+                    print(f"Audit Store Error: {e}")
+                self._mark_committed(self._index())
+                continue
+            deadline = time.monotonic() + self.commit_interval_s
+            while len(batch) < self.commit_max_events:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = 0
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # Segment write failed: these events are lost, don't let flush() wait on them
+                print(f"Audit Store Error: {e}")
+                metrics.incr('audit.write_errors')
+                done = len(batch)
+            self._mark_committed(done + self._index())
+
+    def _mark_committed(self, count):
+        if not count:
+            return
+        with self._committed_cond:
+            self._committed += count
+            self._committed_cond.notify_all()
+            metrics.set_gauge('audit.backlog', self._enqueued - self._committed)
+
+    def _open_segment(self):
+        if self._segment is not None:
+            self._seal()  # seals never span segments
+            self._segment[1].close()
+        self._segment_no += 1
+        name = f"{self._writer_id}-{self._segment_no:06d}{_SEGMENT_SUFFIX}"
+        self._segment = (name, open(os.path.join(self.directory, name), 'ab'))
+        metrics.incr('audit.segments')
+
+    def _commit(self, batch):
+        start = time.perf_counter()
+        if self._segment is None or self._segment[1].tell() >= self.segment_max_bytes:
+            self._open_segment()
+        name, f = self._segment
+        start_offset = offset = f.tell()
+        chunks = []
+        rows = []
+        usage = []
+        digests = []
+        seq = self._seq
+        prev_hash = self._prev_hash
+        for ts, event_type, eccn, destination, party, keys, event_bytes in batch:
+            seq += 1
+            digest = chain_hash(prev_hash, event_bytes)
+            hash_hex = digest.hex()
+            line = record_line(seq, prev_hash, hash_hex, event_bytes)
+            digests.append(digest)
+            prev_hash = hash_hex
+            chunks.append(line)
+            rows.append((ts, event_type, eccn, destination, party, name, offset, len(line)))
+            usage.append((ts, keys))
+            offset += len(line)
+        try:
+            f.write(b''.join(chunks))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        except Exception:
+            self._discard_partial_write(start_offset)
+            raise
+        # Advance the chain only once the batch is on disk
+        self._seq = seq
+        self._prev_hash = prev_hash
+        self._unsealed.extend(digests)
+        self._index_backlog.append((rows, usage))
+        if len(self._unsealed) >= self.seal_every or time.monotonic() - self._last_seal >= self.seal_interval_s:
+            try:
+                self._seal()
+            except Exception as e:
+                print(f"Audit Store Error: {e}")  # retried on the next batch / idle tick
+        metrics.incr('audit.events', len(batch))
+        metrics.incr('audit.commits')
+        metrics.observe_ms('audit.commit', (time.perf_counter() - start) * 1000)
+
+    def _discard_partial_write(self, offset):
+        """
+        Cuts a failed batch off the current segment so it still ends on the last
+        committed record. The file is closed first so no buffered bytes of the
+        batch can reach it later.
+        """
+        name, f = self._segment
+        path = os.path.join(self.directory, name)
+        try:
+            f.close()
+        except Exception:
+            pass
+        os.truncate(path, offset)
+        self._segment = (name, open(path, 'ab'))
+
+    def _index(self):
+        """
+        Indexes the written-but-unindexed batches in one transaction. On failure the
+        transaction is rolled back and the rows stay queued for the next attempt.
+        Returns the number of events indexed.
+        """
+        if not self._index_backlog:
+            return 0
+        rows = [row for batch_rows, _ in self._index_backlog for row in batch_rows]
+        usage = [entry for _, batch_usage in self._index_backlog for entry in batch_usage]
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO audit_index (ts, event_type, eccn, destination, party, segment, offset, length)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self._rollups.apply(conn, usage)
+        except Exception as e:
+            print(f"Audit Index Error (will retry): {e}")
+            metrics.incr('audit.index_errors')
+            metrics.set_gauge('audit.index_backlog', len(rows))
+            return 0
+        self._index_backlog = []
+        metrics.set_gauge('audit.index_backlog', 0)
+        return len(rows)
+
+    def _seal(self):
+        """Appends a Merkle-root checkpoint over the records written since the last seal."""
+        self._last_seal = time.monotonic()
+        if not self._unsealed:
+            return
+        start = time.perf_counter()
+        count = len(self._unsealed)
+        seal = seal_record(self._writer_id, self._segment[0], self._seq - count + 1, self._seq,
+                           merkle_root(self._unsealed), self._prev_seal, time.time(), key=self.seal_key)
+        if self._seal_file is None:
+            self._seal_file = open(os.path.join(self.directory, self._writer_id + SEAL_SUFFIX), 'ab')
+        self._seal_file.write((json.dumps(seal, sort_keys=True) + "\n").encode())
+        self._seal_file.flush()
+        if self.fsync:
+            os.fsync(self._seal_file.fileno())
+        self._prev_seal = seal['seal_hash']
+        self._unsealed = []
+        metrics.incr('audit.seals')
+        metrics.observe_ms('audit.seal', (time.perf_counter() - start) * 1000)
+
+    def close(self):
+        self.flush()
+        if self._segment is not None:
+            self._seal()
+            self._segment[1].close()
+            self._segment = None
+
+    # -------------------------------------------------------------------------
+    # Read path
+    # -------------------------------------------------------------------------
+
+    def query(self, event_type=None, eccn=None, destination=None, party=None, since=None, until=None,
+              cursor=None, limit=50):
+        """
+        Newest-first page of events matching every given filter.
+        since/until: epoch seconds. Returns (events, next_cursor); next_cursor is None on the last page.
+        """
+        clauses, params = [], []
+        for column, value in (('event_type', event_type), ('eccn', eccn.strip().upper() if eccn else None),
+                              ('destination', _fold(destination)), ('party', _fold(party))):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(float(until))
+        if cursor:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT id, segment, offset, length FROM audit_index {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return self._read(rows[:limit]), next_cursor
+
+    def usage(self, granularity='hour', since=None, until=None):
+        """Usage totals and per-bucket counts (see usage_stats.UsageRollups.query)."""
+        return UsageRollups.query(self._conn(), granularity=granularity, since=since, until=until)
+
+    def _read(self, rows):
+        events = []
+        files = {}
+        try:
+            for _, segment, offset, length in rows:
+                f = files.get(segment)
+                if f is None:
+                    f = files[segment] = open(os.path.join(self.directory, segment), 'rb')
+                f.seek(offset)
+                events.append(json.loads(parse_record(f.read(length))[3]))
+        finally:
+            for f in files.values():
+                f.close()
+        return events
+
+    def segments(self):
+        """Segment file names, oldest first."""
+        return sorted(n for n in os.listdir(self.directory) if n.endswith(_SEGMENT_SUFFIX))
+
+    def rebuild_index(self):
+        """Re-creates the index and usage rollups from the segments. Returns the number of events indexed."""
+        conn = self._conn()
+        rows = []
+        usage = []
+        for name in self.segments():
+            offset = 0
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write
+                    event = json.loads(parse_record(line)[3])
+                    ts = _event_ts(event)
+                    rows.append((ts, *index_fields(event), name, offset, len(line)))
+                    usage.append((ts, usage_keys(event)))
+                    offset += len(line)
+        rows.sort(key=lambda r: r[0])
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM audit_index")
+            conn.executemany(
+                "INSERT INTO audit_index (ts, event_type, eccn, destination, party, segment, offset, length)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute("DELETE FROM usage_rollups")
+            self._rollups.apply(conn, usage)
+        return len(rows)
+
+
+def _event_ts(event):
+    try:
+        return datetime.fromisoformat(event['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+def parse_time(value):
+    """Epoch seconds or ISO-8601 -> epoch seconds (None passes through)."""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+AUDIT_STORE = AuditStore()
+atexit.register(AUDIT_STORE.flush)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit store maintenance.")
+    parser.add_argument('command', choices=['verify', 'reindex'])
+    parser.add_argument('--dir', default=AUDIT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Parallel segment verifiers (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    store = AUDIT_STORE if args.dir == AUDIT_DIR else AuditStore(args.dir)
+    if args.command == 'verify':
+        start = time.perf_counter()
+        report = verify_directory(store.directory, store.segments(), workers=args.workers, key=store.seal_key)
+        report["elapsed_s"] = round(time.perf_counter() - start, 2)
+        print(json.dumps(report, indent=2))
+        return 0 if report["ok"] else 1
+    if args.command == 'reindex':
+        start = time.perf_counter()
+        count = store.rebuild_index()
+        print(f"Indexed {count} events from {len(store.segments())} segments in {time.perf_counter() - start:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
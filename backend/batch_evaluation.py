@@ -0,0 +1,193 @@
+"""
+Batch Evaluation Helpers
+------------------------
+Streaming input parsing and running totals for /evaluate/batch.
+
+The body is read incrementally: a JSON array or NDJSON (one object per
+line) is decoded object by object from a fixed-size read buffer, so a
+1M-row request never sits in memory as a whole. BatchSummary keeps
+counters only, never the rows.
+"""
+import codecs
+import json
+import os
+import re
+from collections import Counter
+
+EVALUATE_BATCH_CHUNK = int(os.getenv('EVALUATE_BATCH_CHUNK', '500'))
+EVALUATE_BATCH_MAX_ROWS = int(os.getenv('EVALUATE_BATCH_MAX_ROWS', '1000000'))
+
+_READ_SIZE = 64 * 1024
+# A single undecodable row larger than this is treated as malformed input
+_MAX_ROW_CHARS = 1024 * 1024
+_SEPARATORS = ' \t\r\n,'
+# Distinct destinations / ECCNs tracked for the summary (bounds memory on hostile input)
+_MAX_DISTINCT = 1000
+
+
+class BatchInputError(ValueError):
+    """Malformed batch body (not a JSON array / NDJSON of objects)."""
+
+
+class BatchRowError(BatchInputError):
+    """One unreadable row; yielded (not raised) so the rest of the batch still runs."""
+
+
+# Invalid UTF-8 bytes survive decoding as lone surrogates (surrogateescape)
+_INVALID_UTF8 = re.compile('[\udc80-\udcff]')
+
+
+def iter_json_rows(stream, read_size=_READ_SIZE):
+    """
+    Yields decoded values from a JSON array or NDJSON byte stream.
+    A bad NDJSON line (invalid JSON or UTF-8) is yielded as a BatchRowError and
+    parsing resumes at the next line; in a JSON array, invalid UTF-8 inside a
+    row fails that row and invalid JSON raises BatchInputError.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')(errors='surrogateescape')
+    buf = ''
+    pos = 0
+    eof = False
+    in_array = None  # decided by the first non-blank character
+    skipping = False  # NDJSON: dropping the rest of an oversized bad line
+
+    def fill():
+        nonlocal buf, pos, eof
+        data = stream.read(read_size)
+        if not data:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b'', final=True)
+        else:
+            buf = buf[pos:] + utf8.decode(data)
+        pos = 0
+
+    while True:
+        if skipping:
+            newline = buf.find('\n', pos)
+            if newline < 0:
+                pos = len(buf)
+                if eof:
+                    return
+                fill()
+                continue
+            pos = newline + 1
+            skipping = False
+
+        while pos < len(buf) and buf[pos] in _SEPARATORS:
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                if in_array:
+                    raise BatchInputError("Unterminated JSON array")
+                return
+            fill()
+            continue
+
+        if in_array is None:
+            in_array = buf[pos] == '['
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if in_array:
+                if eof or len(buf) - pos > _MAX_ROW_CHARS:
+                    raise BatchInputError(f"Invalid JSON at row boundary: {e.msg}") from None
+                fill()
+                continue
+            newline = buf.find('\n', pos)
+            if newline < 0 and not eof and len(buf) - pos <= _MAX_ROW_CHARS:
+                fill()  # the line may continue in the next read
+                continue
+            reason = "invalid UTF-8" if _INVALID_UTF8.search(buf, pos, newline if newline >= 0 else len(buf)) else e.msg
+            yield BatchRowError(f"Invalid NDJSON line: {reason}")
+            if newline < 0:
+                pos = len(buf)
+                skipping = not eof
+            else:
+                pos = newline + 1
+            continue
+        if end == len(buf) and not eof and not isinstance(value, (dict, list)):
+            # A bare scalar may continue in the next read
+            fill()
+            continue
+        bad_bytes = _INVALID_UTF8.search(buf, pos, end)
+        pos = end
+        yield BatchRowError("Row is not valid UTF-8") if bad_bytes else value
+
+
+def iter_chunks(rows, size=EVALUATE_BATCH_CHUNK):
+    """Groups rows into lists of at most `size`."""
+    chunk = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    except BatchInputError:
+        # Rows decoded before the bad one are still evaluated
+        if chunk:
+            yield chunk
+        raise
+    if chunk:
+        yield chunk
+
+
+class BatchSummary:
+    """Running totals over a batch (counts only)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.errors = 0
+        self.license_status = Counter()
+        self.uflpa_risk = Counter()
+        self.dps_status = Counter()
+        self.destinations = Counter()
+        self.eccns = Counter()
+
+    def add(self, data, license_outcome, uflpa_outcome, dps_outcome):
+        self.rows += 1
+        self.license_status[license_outcome.get('status', 'UNKNOWN')] += 1
+        self.uflpa_risk[uflpa_outcome.get('risk_level', 'UNKNOWN')] += 1
+        if dps_outcome:
+            self.dps_status[dps_outcome.get('status', 'UNKNOWN')] += 1
+        self._tally(self.destinations, str(data.get('destination', '')))
+        self._tally(self.eccns, str(data.get('eccn', '')))
+
+    @staticmethod
+    def _tally(counter, key):
+        if key in counter or len(counter) < _MAX_DISTINCT:
+            counter[key] += 1
+
+    def add_error(self):
+        self.rows += 1
+        self.errors += 1
+
+    def to_dict(self, top=10):
+        return {
+            "rows": self.rows,
+            "errors": self.errors,
+            "license_status": dict(self.license_status),
+            "uflpa_risk": dict(self.uflpa_risk),
+            "dps_status": dict(self.dps_status),
+            "top_destinations": dict(self.destinations.most_common(top)),
+            "top_eccns": dict(self.eccns.most_common(top)),
+        }
+
+    def insight_prompt(self):
+        s = self.to_dict()
+        return (
+            f"Act as an Export Compliance Specialist.\n"
+            f"Review this batch of {s['rows']} shipments ({s['errors']} could not be evaluated):\n"
+            f"1. License Check outcomes: {s['license_status']}. Top ECCNs: {s['top_eccns']}. Top destinations: {s['top_destinations']}\n"
+            f"2. Forced Labor Check outcomes: {s['uflpa_risk']}. Denied party screening: {s['dps_status']}.\n\n"
+            f"Provide 2 concise paragraphs:\n"
+            f"- License View: Where the batch needs licenses and which exceptions dominate.\n"
+            f"- Supply Chain View: UFLPA / denied-party exposure and which shipments to review first."
+        )
@@ -7,72 +7,60 @@ import json
 import uuid
 import os
 import google.generativeai as genai
+from llm_client import generate_text
+from prompt_builder import PromptBuilder, compact_json, render_context, PROMPT_TOKEN_BUDGET_CHAT
+import metrics
+from conversation_store import make_conversation_store
+from conversation_summary import (CONVERSATION_COMPACT_AFTER, CONVERSATION_COMPACT_KEEP, CONVERSATION_COMPACT_LLM,
+                                  fold, narrative_prompt, clip_narrative, render_summary, result_facts)
+from audit_store import AUDIT_STORE
 
-# In-memory conversation storage (per session)
-conversations = {}
-
-# In-memory audit log
-audit_log = []
+# Conversation storage (per session): bounded in-memory LRU or SQLite shared by all workers
+CONVERSATIONS = make_conversation_store()
 
 def get_or_create_conversation(session_id):
-    """Get existing conversation or create new one."""
-    if session_id not in conversations:
-        conversations[session_id] = {
-            'id': session_id,
-            'created_at': datetime.now().isoformat(),
-            'messages': [],
-            'context': {}  # Store form data context
-        }
-    return conversations[session_id]
-
-def add_message(session_id, role, content):
-    """Add a message to the conversation."""
-    conv = get_or_create_conversation(session_id)
-    conv['messages'].append({
-        'role': role,
-        'content': content,
-        'timestamp': datetime.now().isoformat()
-    })
-    return conv
+    """Get existing conversation or create new one: { id, created_at, context, meta }."""
+    return CONVERSATIONS.get(session_id)
+
+def add_message(session_id, role, content, data=None):
+    """Add a message to the conversation (data: tool results of the turn, kept for compaction)."""
+    return CONVERSATIONS.append(session_id, role, content, data)
 
 def get_conversation_history(session_id, max_messages=10):
     """Get recent conversation history for context."""
-    conv = get_or_create_conversation(session_id)
-    return conv['messages'][-max_messages:]
+    return CONVERSATIONS.history(session_id, max_messages)
 
 def update_context(session_id, context_data):
     """Update the conversation context with form data."""
-    conv = get_or_create_conversation(session_id)
-    conv['context'].update(context_data)
-    return conv['context']
-
-def build_chat_prompt(session_id, user_message, compliance_results=None):
-    """Build a prompt for the AI with conversation history."""
-    conv = get_or_create_conversation(session_id)
-    history = get_conversation_history(session_id)
-    context = conv.get('context', {})
-    
-    # Build conversation history string
-    history_str = ""
-    for msg in history[-5:]:  # Last 5 messages for context
-        role = "User" if msg['role'] == 'user' else "Assistant"
-        history_str += f"{role}: {msg['content']}\n"
-    
-    prompt = f"""You are an expert Export Compliance Assistant. You help users navigate US export control regulations (EAR, ITAR).
-
-CONVERSATION CONTEXT:
-{json.dumps(context, indent=2) if context else "No form data yet."}
-
-CONVERSATION HISTORY:
-{history_str if history_str else "This is the start of the conversation."}
-
-COMPLIANCE RESULTS (if available):
-{json.dumps(compliance_results, indent=2) if compliance_results else "No evaluation performed yet."}
-
-USER'S CURRENT MESSAGE:
-{user_message}
-
-INSTRUCTIONS:
+    return CONVERSATIONS.update_context(session_id, context_data)
+
+def compact_conversation(session_id, model=None):
+    """Folds older messages into the session summary once the session is long enough."""
+    folded = []
+
+    def fold_messages(summary, messages):
+        folded.extend(messages)
+        return fold(summary, messages)
+
+    count = CONVERSATIONS.compact(session_id, CONVERSATION_COMPACT_AFTER, CONVERSATION_COMPACT_KEEP, fold_messages)
+    if not count:
+        return 0
+    metrics.incr('conversations.compactions')
+    metrics.incr('conversations.compacted_messages', count)
+
+    # Optional narrative on top of the deterministic summary (outside the store's lock)
+    if CONVERSATION_COMPACT_LLM and model:
+        try:
+            summary = get_or_create_conversation(session_id)['meta'].get('summary') or {}
+            text = generate_text(model, narrative_prompt(summary, folded), cache=None, label='chat_compact')
+            CONVERSATIONS.set_meta(session_id, 'summary', {**summary, 'narrative': clip_narrative(text)})
+        except Exception as e:
+            print(f"Chat Compaction Error: {e}")
+    return count
+
+CHAT_SYSTEM_PROMPT = "You are an expert Export Compliance Assistant. You help users navigate US export control regulations (EAR, ITAR)."
+
+CHAT_INSTRUCTIONS = """INSTRUCTIONS:
 1. Be conversational and helpful.
 2. If user hasn't provided ECCN yet, ask for it.
 3. If you need clarification, ask ONE specific question.
@@ -81,35 +69,68 @@ INSTRUCTIONS:
 6. Keep responses concise (2-3 sentences max unless explaining complex topics).
 
 YOUR RESPONSE:"""
-    
-    return prompt
+
+def build_chat_prompt(session_id, user_message, compliance_results=None):
+    """Build a token-budgeted prompt for the AI with conversation history."""
+    conv = get_or_create_conversation(session_id)
+    history = get_conversation_history(session_id)
+    context = conv.get('context', {})
+
+    # The current message is already the last history entry; it gets its own section
+    if history and history[-1]['role'] == 'user' and history[-1]['content'] == user_message:
+        history = history[:-1]
+
+    builder = PromptBuilder(PROMPT_TOKEN_BUDGET_CHAT)
+    builder.add(CHAT_SYSTEM_PROMPT)
+    builder.add("\nCONVERSATION CONTEXT:")
+    builder.add(render_context(context, conv['meta'].get('prompt_context'), empty_text="No form data yet."))
+    earlier = render_summary(conv['meta'].get('summary'))
+    if earlier:
+        builder.add("\nEARLIER IN THIS CONVERSATION:")
+        builder.add(earlier)
+    builder.add("\nCONVERSATION HISTORY:")
+    builder.add_history(history)
+    builder.add("\nCOMPLIANCE RESULTS (if available):")
+    builder.add(compact_json(compliance_results) if compliance_results else "No evaluation performed yet.")
+    builder.add(f"\nUSER'S CURRENT MESSAGE:\n{user_message}\n")
+    builder.add(CHAT_INSTRUCTIONS)
+    return builder.build()
+
+def record_turn(session_id, user_message, reply, compliance_results=None, model=None):
+    """Stores a user/assistant exchange (with the turn's facts and results) and compacts if due."""
+    add_message(session_id, 'user', user_message)
+    context = get_or_create_conversation(session_id).get('context', {})
+    # Only the outcome fields are kept per message; compaction needs nothing more
+    add_message(session_id, 'assistant', reply, {'context': dict(context), 'results': result_facts(compliance_results)})
+    compact_conversation(session_id, model)
 
 def get_chat_response(session_id, user_message, model, compliance_results=None):
     """
     Generate a response from the AI agent using the conversation history and context.
+    The exchange is recorded in the session whether or not the LLM call succeeds.
     """
     try:
-        # 1. Add user message to history
-        add_message(session_id, 'user', user_message)
-
-        # 2. Build Prompt
+        # 1. Build Prompt (the current message gets its own section)
         prompt = build_chat_prompt(session_id, user_message, compliance_results)
 
-        # 3. Call Gemini
+        # 2. Call Gemini
         if model:
-            response = model.generate_content(prompt)
-            ai_text = response.text.strip()
+            # History makes every chat prompt unique, so skip the response cache
+            ai_text = generate_text(model, prompt, cache=None, label='chat').strip()
+            # The changed-fields hint next turn is relative to this (answered) prompt
+            CONVERSATIONS.set_meta(session_id, 'prompt_context', dict(get_or_create_conversation(session_id)['context']))
         else:
              ai_text = "I'm sorry, I can't connect to the AI service right now. Please check your API key."
+    except Exception as e:
+        print(f"Chat Error: {e}")
+        ai_text = "I encountered an error processing your request. Please try again."
 
-        # 4. Add AI response to history
-        add_message(session_id, 'assistant', ai_text)
-
-        return ai_text
-
+    # 3. Record both messages, with the turn's facts and results for compaction
+    try:
+        record_turn(session_id, user_message, ai_text, compliance_results, model)
     except Exception as e:
         print(f"Chat Error: {e}")
-        return "I encountered an error processing your request. Please try again."
+    return ai_text
 
 def log_audit_event(event_type, data, result=None, ai_suggestion=None):
     """Log an event to the audit log."""
@@ -121,9 +142,12 @@ def log_audit_event(event_type, data, result=None, ai_suggestion=None):
         'result': result,
         'ai_suggestion': ai_suggestion
     }
-    audit_log.append(event)
+    AUDIT_STORE.append(event)
     return event
 
-def get_audit_log(limit=50):
-    """Get recent audit log entries."""
-    return audit_log[-limit:]
+def get_audit_log(limit=50, cursor=None, **filters):
+    """
+    Get audit log entries, newest first: (events, next_cursor).
+    Filters: event_type, eccn, destination, party, since, until (epoch seconds).
+    """
+    return AUDIT_STORE.query(cursor=cursor, limit=limit, **filters)
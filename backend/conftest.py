@@ -0,0 +1,41 @@
+"""
+Test isolation: the stores read their paths from the environment at import
+(audit_store, evaluation_store, job_queue, llm_cache, conversation_store), and
+some test modules import them at collection time. pytest_configure runs before
+collection, so every store the suite touches lives under a temporary
+directory instead of backend/data.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+_DATA_DIR = None
+
+
+def pytest_configure(config):
+    global _DATA_DIR
+    _DATA_DIR = tempfile.mkdtemp(prefix='exportshield-test-')
+    os.environ['AUDIT_DIR'] = os.path.join(_DATA_DIR, 'audit')
+    os.environ['EVALUATION_DB'] = os.path.join(_DATA_DIR, 'evaluations.sqlite3')
+    os.environ['JOB_QUEUE_DB'] = os.path.join(_DATA_DIR, 'jobs.sqlite3')
+    os.environ['CONVERSATION_DB'] = os.path.join(_DATA_DIR, 'conversations.sqlite3')
+    os.environ['LLM_CACHE_DB'] = ''  # memory only
+
+
+def pytest_unconfigure(config):
+    # Let the audit writer thread finish before its directory goes away
+    audit_store = sys.modules.get('audit_store')
+    if audit_store is not None:
+        audit_store.AUDIT_STORE.flush(timeout_s=2)
+    if _DATA_DIR:
+        shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The Flask app module, imported against the temporary data directory."""
+    import app
+    return app
@@ -0,0 +1,301 @@
+"""
+Conversation Store
+------------------
+Session storage for chat_agent (messages, form context, prompt metadata).
+
+- MemoryConversationStore: per-process LRU + idle TTL, each session's
+  messages in a bounded deque
+- SQLiteConversationStore: one SQLite file (WAL) shared by every gunicorn
+  worker on the host, so a session keeps its history whichever worker
+  serves the next turn; survives restarts
+
+Both append in O(1) and read the last k messages in O(k). Each session
+keeps at most CONVERSATION_MAX_MESSAGES messages (oldest dropped);
+compact() folds older messages into meta['summary'] before that point
+(conversation_summary.py).
+Selected with CONVERSATION_STORE=memory|sqlite.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+
+import metrics
+
+CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')  # memory | sqlite
+CONVERSATION_DB = os.getenv('CONVERSATION_DB', os.path.join(os.path.dirname(__file__), 'data', 'conversations.sqlite3'))
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '5000'))
+CONVERSATION_TTL_S = float(os.getenv('CONVERSATION_TTL_S', '86400'))
+CONVERSATION_MAX_MESSAGES = int(os.getenv('CONVERSATION_MAX_MESSAGES', '200'))
+
+# Expired-session sweep runs every N appends
+_SWEEP_EVERY = 500
+
+
+def _message(role, content, data=None):
+    message = {'role': role, 'content': content, 'timestamp': datetime.now().isoformat()}
+    if data:
+        message['data'] = data
+    return message
+
+
+class _Conversation:
+    __slots__ = ('record', 'messages', 'touched')
+
+    def __init__(self, session_id, max_messages):
+        self.record = {'id': session_id, 'created_at': datetime.now().isoformat(), 'context': {}, 'meta': {}}
+        self.messages = deque(maxlen=max_messages)
+        self.touched = time.monotonic()
+
+
+class MemoryConversationStore:
+    def __init__(self, max_sessions=CONVERSATION_MAX_SESSIONS, ttl_s=CONVERSATION_TTL_S,
+                 max_messages=CONVERSATION_MAX_MESSAGES):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.max_messages = max_messages
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _conversation(self, session_id):
+        """Caller holds the lock. Returns the live session, creating it (and evicting) as needed."""
+        now = time.monotonic()
+        conv = self._sessions.get(session_id)
+        if conv is not None and now - conv.touched > self.ttl_s:
+            del self._sessions[session_id]
+            conv = None
+            metrics.incr('conversations.expired')
+        if conv is None:
+            conv = self._sessions[session_id] = _Conversation(session_id, self.max_messages)
+            # Least recently used first: drop expired, then over-cap sessions
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if oldest is conv or (len(self._sessions) <= self.max_sessions and now - oldest.touched <= self.ttl_s):
+                    break
+                del self._sessions[oldest_id]
+                metrics.incr('conversations.evicted')
+        else:
+            self._sessions.move_to_end(session_id)
+        conv.touched = now
+        return conv
+
+    def get(self, session_id):
+        """{ id, created_at, context, meta } (created if missing)."""
+        with self._lock:
+            return self._conversation(session_id).record
+
+    def append(self, session_id, role, content, data=None):
+        message = _message(role, content, data)
+        with self._lock:
+            self._conversation(session_id).messages.append(message)
+        return message
+
+    def history(self, session_id, limit=10):
+        """Last `limit` messages, oldest first."""
+        with self._lock:
+            messages = self._conversation(session_id).messages
+            recent = list(islice(reversed(messages), limit))
+        recent.reverse()
+        return recent
+
+    def update_context(self, session_id, context_data):
+        with self._lock:
+            context = self._conversation(session_id).record['context']
+            context.update(context_data)
+            return dict(context)
+
+    def set_meta(self, session_id, key, value):
+        with self._lock:
+            self._conversation(session_id).record['meta'][key] = value
+
+    def compact(self, session_id, threshold, keep, fold):
+        """
+        Once the session holds more than `threshold` messages, folds all but the
+        newest `keep` into meta['summary'] = fold(summary, messages). Returns the number folded.
+        """
+        with self._lock:
+            conv = self._conversation(session_id)
+            count = len(conv.messages) - keep if len(conv.messages) > threshold else 0
+            if count <= 0:
+                return 0
+            older = [conv.messages.popleft() for _ in range(count)]
+            meta = conv.record['meta']
+            meta['summary'] = fold(meta.get('summary'), older)
+        return count
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._sessions)}
+
+
+class SQLiteConversationStore:
+    def __init__(self, db_path=CONVERSATION_DB, ttl_s=CONVERSATION_TTL_S, max_messages=CONVERSATION_MAX_MESSAGES):
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._appends = 0
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " session_id TEXT PRIMARY KEY, created_at TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " next_seq INTEGER NOT NULL DEFAULT 0, context TEXT NOT NULL DEFAULT '{}', meta TEXT NOT NULL DEFAULT '{}')"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+            " timestamp TEXT NOT NULL, data TEXT, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+        if 'data' not in [row[1] for row in conn.execute("PRAGMA table_info(messages)")]:
+            conn.execute("ALTER TABLE messages ADD COLUMN data TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, session_id):
+        """Creates or refreshes the session row; expired sessions start over."""
+        now = time.time()
+        row = conn.execute("SELECT updated_at FROM conversations WHERE session_id = ?", (session_id,)).fetchone()
+        if row is not None and now - row[0] > self.ttl_s:
+            self._delete(conn, session_id)
+            metrics.incr('conversations.expired')
+            row = None
+        if row is None:
+            conn.execute(
+                "INSERT INTO conversations (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                (session_id, datetime.now().isoformat(), now)
+            )
+        else:
+            conn.execute("UPDATE conversations SET updated_at = ? WHERE session_id = ?", (now, session_id))
+
+    @staticmethod
+    def _delete(conn, session_id):
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def get(self, session_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._touch(conn, session_id)
+            row = conn.execute(
+                "SELECT created_at, context, meta FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return {'id': session_id, 'created_at': row[0], 'context': json.loads(row[1]), 'meta': json.loads(row[2])}
+
+    def append(self, session_id, role, content, data=None):
+        message = _message(role, content, data)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._touch(conn, session_id)
+            seq = conn.execute(
+                "UPDATE conversations SET next_seq = next_seq + 1 WHERE session_id = ? RETURNING next_seq",
+                (session_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO messages (session_id, seq, role, content, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, seq, role, content, message['timestamp'],
+                 json.dumps(data, default=str) if data else None)
+            )
+            # Keep the newest max_messages (a PK range delete, normally one row)
+            conn.execute("DELETE FROM messages WHERE session_id = ? AND seq <= ?", (session_id, seq - self.max_messages))
+        self._appends += 1
+        if self._appends % _SWEEP_EVERY == 0:
+            self.sweep()
+        return message
+
+    def history(self, session_id, limit=10):
+        rows = self._conn().execute(
+            "SELECT role, content, timestamp, data FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        return [_row_message(r) for r in reversed(rows)]
+
+    def _update_json(self, session_id, column, fn):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._touch(conn, session_id)
+            value = json.loads(conn.execute(
+                f"SELECT {column} FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()[0])
+            fn(value)
+            conn.execute(f"UPDATE conversations SET {column} = ? WHERE session_id = ?",
+                         (json.dumps(value, default=str), session_id))
+        return value
+
+    def update_context(self, session_id, context_data):
+        return self._update_json(session_id, 'context', lambda ctx: ctx.update(context_data))
+
+    def set_meta(self, session_id, key, value):
+        self._update_json(session_id, 'meta', lambda meta: meta.__setitem__(key, value))
+
+    def compact(self, session_id, threshold, keep, fold):
+        """Same contract as MemoryConversationStore.compact; fold and delete in one transaction."""
+        conn = self._conn()
+        size = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        if size <= threshold:
+            return 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT next_seq, meta FROM conversations WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return 0
+            cutoff = row[0] - keep
+            older = [_row_message(r) for r in conn.execute(
+                "SELECT role, content, timestamp, data FROM messages WHERE session_id = ? AND seq <= ? ORDER BY seq",
+                (session_id, cutoff)
+            )]
+            if not older:
+                return 0
+            meta = json.loads(row[1])
+            meta['summary'] = fold(meta.get('summary'), older)
+            conn.execute("UPDATE conversations SET meta = ? WHERE session_id = ?",
+                         (json.dumps(meta, default=str), session_id))
+            conn.execute("DELETE FROM messages WHERE session_id = ? AND seq <= ?", (session_id, cutoff))
+        return len(older)
+
+    def sweep(self):
+        """Deletes sessions idle longer than the TTL."""
+        conn = self._conn()
+        cutoff = time.time() - self.ttl_s
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT session_id FROM conversations WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            removed = conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,)).rowcount
+        if removed:
+            metrics.incr('conversations.expired', removed)
+
+    def stats(self):
+        count = self._conn().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count, 'path': self.db_path}
+
+
+def _row_message(row):
+    message = {'role': row[0], 'content': row[1], 'timestamp': row[2]}
+    if row[3]:
+        message['data'] = json.loads(row[3])
+    return message
+
+
+def make_conversation_store(kind=CONVERSATION_STORE):
+    if kind == 'sqlite':
+        return SQLiteConversationStore()
+    return MemoryConversationStore()
@@ -0,0 +1,145 @@
+"""
+Conversation Summary
+--------------------
+Compaction for long chat sessions.
+
+Once a session holds more than CONVERSATION_COMPACT_AFTER messages, all but
+the newest CONVERSATION_COMPACT_KEEP are folded into a structured summary
+kept in the session meta and then deleted. The summary is built
+deterministically from the tool results stored with each assistant turn:
+
+- facts:     latest value of every shipment field (ECCN, destination, ...)
+- changes:   the last few earlier values of fields that changed
+- results:   latest license / UFLPA / DPS outcome
+- decisions: outcome changes and when ("turn 7: license_status LICENSE_REQUIRED
+             for eccn 3A001, destination China")
+- topics:    short snippets of what the user asked
+
+Every list is capped, so the summary (and the prompt section rendered from
+it) stays bounded however long the session runs. With
+CONVERSATION_COMPACT_LLM=true a short LLM narrative of the folded turns is
+added on top; it is never needed for the facts.
+"""
+import os
+
+from prompt_builder import compact_json, prune
+
+CONVERSATION_COMPACT_AFTER = int(os.getenv('CONVERSATION_COMPACT_AFTER', '40'))
+CONVERSATION_COMPACT_KEEP = int(os.getenv('CONVERSATION_COMPACT_KEEP', '10'))
+CONVERSATION_COMPACT_LLM = os.getenv('CONVERSATION_COMPACT_LLM', 'false').lower() == 'true'
+
+_MAX_FACTS = 40
+_MAX_PREVIOUS = 3
+_MAX_DECISIONS = 20
+_MAX_TOPICS = 8
+_TOPIC_CHARS = 80
+_MAX_NARRATIVE_CHARS = 1200
+
+
+def empty_summary():
+    return {'turns': 0, 'messages': 0, 'facts': {}, 'changes': {}, 'results': {}, 'decisions': [], 'topics': [],
+            'narrative': ''}
+
+
+def result_facts(results):
+    """{ license_status, uflpa_risk, dps_status, evaluation_id } found in one turn's tool results."""
+    if not isinstance(results, dict):
+        return {}
+    license_results = results.get('license_results') if isinstance(results.get('license_results'), dict) else {}
+    uflpa_results = results.get('uflpa_results') if isinstance(results.get('uflpa_results'), dict) else {}
+    dps_results = results.get('dps_results') if isinstance(results.get('dps_results'), dict) else {}
+    found = {
+        'license_status': license_results.get('status') or results.get('license_status'),
+        'uflpa_risk': uflpa_results.get('risk_level') or results.get('uflpa_risk') or results.get('risk_level'),
+        'dps_status': dps_results.get('status') or results.get('dps_status'),
+        'evaluation_id': results.get('evaluation_id'),
+    }
+    return {k: v for k, v in found.items() if isinstance(v, str) and v}
+
+
+def _scalar(value):
+    return value if isinstance(value, (str, int, float, bool)) else compact_json(value)
+
+
+def fold(summary, messages):
+    """
+    Returns a new summary with `messages` (oldest first, as stored) folded in.
+    Assistant messages may carry data={'context': {...}, 'results': {...}}.
+    """
+    summary = {**empty_summary(), **(summary or {})}
+    facts = dict(summary['facts'])
+    changes = {k: list(v) for k, v in summary['changes'].items()}
+    results = dict(summary['results'])
+    decisions = list(summary['decisions'])
+    topics = list(summary['topics'])
+    turn = summary['turns']
+
+    for msg in messages:
+        if msg.get('role') == 'user':
+            turn += 1
+            snippet = ' '.join(str(msg.get('content', '')).split())[:_TOPIC_CHARS]
+            if snippet:
+                topics.append(f"turn {turn}: {snippet}")
+            continue
+        data = msg.get('data') or {}
+        for field, value in prune(data.get('context') or {}).items():
+            value = _scalar(value)
+            if facts.get(field) == value:
+                continue
+            if field in facts:
+                changes[field] = (changes.get(field, []) + [facts[field]])[-_MAX_PREVIOUS:]
+            elif len(facts) >= _MAX_FACTS:
+                continue
+            facts[field] = value
+        shipment = ', '.join(f"{k} {facts[k]}" for k in ('eccn', 'destination') if k in facts)
+        for field, value in result_facts(data.get('results')).items():
+            if results.get(field) != value and field != 'evaluation_id':
+                decisions.append(f"turn {turn}: {field} {value}" + (f" for {shipment}" if shipment else ""))
+            results[field] = value
+
+    return {
+        'turns': turn,
+        'messages': summary['messages'] + len(messages),
+        'facts': facts,
+        'changes': changes,
+        'results': results,
+        'decisions': decisions[-_MAX_DECISIONS:],
+        'topics': topics[-_MAX_TOPICS:],
+        'narrative': summary['narrative'],
+    }
+
+
+def narrative_prompt(summary, messages):
+    lines = [f"{m.get('role', 'user')}: {' '.join(str(m.get('content', '')).split())[:400]}" for m in messages]
+    return (
+        "Summarize this part of an export compliance chat in at most 3 sentences. "
+        "Keep shipment facts, screening outcomes and decisions; skip pleasantries.\n"
+        f"Summary so far: {summary.get('narrative') or 'None'}\n"
+        "Messages:\n" + "\n".join(lines)
+    )
+
+
+def clip_narrative(text):
+    text = ' '.join(text.split())
+    return text if len(text) <= _MAX_NARRATIVE_CHARS else text[:_MAX_NARRATIVE_CHARS] + '...'
+
+
+def render_summary(summary):
+    """Prompt block for the folded part of the conversation ('' if nothing was folded)."""
+    if not summary or not summary.get('messages'):
+        return ''
+    lines = [f"({summary['messages']} earlier messages over {summary['turns']} turns, summarized)"]
+    if summary.get('facts'):
+        lines.append(f"Shipment facts: {compact_json(summary['facts'])}")
+    if summary.get('changes'):
+        lines.append("Earlier values: " + "; ".join(
+            f"{field} was {', '.join(str(v) for v in values)}" for field, values in summary['changes'].items()))
+    if summary.get('results'):
+        lines.append(f"Latest results: {compact_json(summary['results'])}")
+    if summary.get('decisions'):
+        lines.append("Decisions: " + "; ".join(summary['decisions']))
+    if summary.get('topics'):
+        lines.append("User asked about: " + "; ".join(summary['topics']))
+    if summary.get('narrative'):
+        lines.append(f"Notes: {summary['narrative']}")
+    return "\n".join(lines)
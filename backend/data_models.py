@@ -20,6 +20,7 @@ class ShipmentCase:
     supplier_name: Optional[str] = None # For UFLPA
     commodity_description: Optional[str] = None # For UFLPA
     origin_country: Optional[str] = None # For UFLPA
+    hts_code: Optional[str] = None # For UFLPA (HTS prefix risk index)
     end_use: Optional[str] = None # Purpose of use
     is_reexport: bool = False
     unit: str = "units"
@@ -93,6 +94,12 @@ class AgentResponse:
     license_result: Optional[LicenseResult] = None
     screenings: List[ScreeningResult] = field(default_factory=list)
 
+    # Diagnostics (tool timings, etc.) - not rendered by the UI
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    # Conversation key for incremental re-evaluation across /agent turns
+    session_id: Optional[str] = None
+
     def to_dict(self):
         return {
             "shipment": self.shipment.to_dict(),
@@ -103,5 +110,7 @@ class AgentResponse:
             # Legacy fallbacks for older frontend checks if needed temporarily
             "license_result": self.license_result.to_dict() if self.license_result else None,
             "screenings": [s.to_dict() for s in self.screenings],
-            "missing_fields": self.missing_fields
+            "missing_fields": self.missing_fields,
+            "meta": self.meta,
+            "session_id": self.session_id
         }
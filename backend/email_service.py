@@ -1,14 +1,22 @@
 """
 Email Service for Export Compliance Assistant
-Supports SendGrid and Gmail SMTP
+Supports SendGrid, Gmail SMTP and any SMTP server (EMAIL_PROVIDER=smtp)
+
+SMTP sessions are pooled: a connected, logged-in session is reused across
+sends (NOOP health check after SMTP_IDLE_CHECK_S idle, reconnect on drop),
+and send_batch() delivers many messages over one session.
 """
 import os
 import smtplib
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 import json
 
+import metrics
+
 # Try to import SendGrid (optional)
 try:
     from sendgrid import SendGridAPIClient
@@ -18,13 +26,163 @@ try:
 except ImportError:
     SENDGRID_AVAILABLE = False
 
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+SMTP_IDLE_CHECK_S = float(os.getenv('SMTP_IDLE_CHECK_S', '30'))
+SMTP_MAX_MESSAGES_PER_CONN = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONN', '100'))
+SMTP_TIMEOUT_S = float(os.getenv('SMTP_TIMEOUT_S', '30'))
+
+# Errors after which the session is discarded and the message retried once on a fresh one
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPHeloError, OSError)
+
+
+class SMTPPool:
+    """
+    Up to `size` authenticated SMTP sessions, reused LIFO.
+    security: 'ssl' (SMTP_SSL), 'starttls' or 'none' (plain, e.g. a local aiosmtpd).
+    """
+    def __init__(self, host, port, user=None, password=None, security='ssl', size=SMTP_POOL_SIZE,
+                 idle_check_s=SMTP_IDLE_CHECK_S, max_messages=SMTP_MAX_MESSAGES_PER_CONN, timeout_s=SMTP_TIMEOUT_S):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.security = security
+        self.idle_check_s = idle_check_s
+        self.max_messages = max(1, max_messages)
+        self.timeout_s = timeout_s
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._idle = []  # [conn, last_used, messages_sent]
+        self._pid = os.getpid()
+
+    def _connect(self):
+        start = time.perf_counter()
+        if self.security == 'ssl':
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout_s)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout_s)
+            if self.security == 'starttls':
+                conn.starttls()
+        try:
+            if self.user and self.password:
+                conn.login(self.user, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        metrics.incr('smtp.connect')
+        metrics.observe_ms('smtp.connect', (time.perf_counter() - start) * 1000)
+        return [conn, time.time(), 0]
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _healthy(self, conn):
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sockets inherited across fork belong to the parent
+                self._idle, self._pid = [], os.getpid()
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            if time.time() - entry[1] < self.idle_check_s or self._healthy(entry[0]):
+                metrics.incr('smtp.reuse')
+                return entry
+            metrics.incr('smtp.stale')
+            self._close(entry[0])
+
+    def _checkin(self, entry):
+        if entry[2] >= self.max_messages:
+            self._close(entry[0])
+            return
+        entry[1] = time.time()
+        with self._lock:
+            self._idle.append(entry)
+
+    def send_messages(self, messages):
+        """
+        Sends MIME messages over one pooled session.
+        Returns one None (sent) or exception per message; a dropped session is
+        replaced and the message retried once.
+        """
+        outcomes = []
+        self._slots.acquire()
+        entry = None
+        try:
+            for msg in messages:
+                if entry is not None and entry[2] >= self.max_messages:
+                    self._close(entry[0])
+                    entry = None
+                error = None
+                for attempt in range(2):
+                    try:
+                        if entry is None:
+                            entry = self._checkout()
+                        start = time.perf_counter()
+                        entry[0].send_message(msg)
+                        entry[2] += 1
+                        metrics.incr('smtp.sent')
+                        metrics.observe_ms('smtp.send', (time.perf_counter() - start) * 1000)
+                        error = None
+                        break
+                    except _CONNECTION_ERRORS as e:
+                        error = e
+                        if entry is not None:
+                            self._close(entry[0])
+                            entry = None
+                        metrics.incr('smtp.reconnect')
+                    except smtplib.SMTPException as e:
+                        # Refused recipient/data: the session is still usable
+                        error = e
+                        if entry is not None and not self._healthy(entry[0]):
+                            self._close(entry[0])
+                            entry = None
+                        break
+                if error is not None:
+                    metrics.incr('smtp.failed')
+                outcomes.append(error)
+        finally:
+            if entry is not None:
+                self._checkin(entry)
+            self._slots.release()
+        return outcomes
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry[0])
+
+
 class EmailService:
     def __init__(self):
         self.provider = os.getenv('EMAIL_PROVIDER', 'gmail').lower()
         self.sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
         self.gmail_user = os.getenv('GMAIL_USER')
         self.gmail_app_password = os.getenv('GMAIL_APP_PASSWORD')
-        self.from_email = os.getenv('FROM_EMAIL', self.gmail_user)
+        # Generic SMTP (EMAIL_PROVIDER=smtp), e.g. a relay or `python -m aiosmtpd -n -l localhost:8025`
+        self.smtp_host = os.getenv('SMTP_HOST')
+        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
+        self.smtp_security = os.getenv('SMTP_SECURITY', 'starttls').lower()  # ssl | starttls | none
+        self.smtp_user = os.getenv('SMTP_USER')
+        self.smtp_password = os.getenv('SMTP_PASSWORD')
+        self.from_email = os.getenv('FROM_EMAIL', self.gmail_user or self.smtp_user)
+        self._pool = None
+        self._pool_lock = threading.Lock()
     
     def is_configured(self):
         """Check if email service is properly configured."""
@@ -32,6 +190,8 @@ class EmailService:
             return bool(self.sendgrid_api_key) and SENDGRID_AVAILABLE
         elif self.provider == 'gmail':
             return bool(self.gmail_user and self.gmail_app_password)
+        elif self.provider == 'smtp':
+            return bool(self.smtp_host and self.from_email)
         return False
     
     def get_status(self):
@@ -42,6 +202,19 @@ class EmailService:
             'from_email': self.from_email,
             'sendgrid_available': SENDGRID_AVAILABLE if self.provider == 'sendgrid' else None
         }
+
+    @property
+    def pool(self):
+        """SMTP session pool for the gmail/smtp providers (created on first send)."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.provider == 'gmail':
+                        self._pool = SMTPPool('smtp.gmail.com', 465, self.gmail_user, self.gmail_app_password, security='ssl')
+                    else:
+                        self._pool = SMTPPool(self.smtp_host, self.smtp_port, self.smtp_user, self.smtp_password,
+                                              security=self.smtp_security)
+        return self._pool
     
     def send_email(self, to_email, subject, html_content, attachments=None):
         """
@@ -56,21 +229,37 @@ class EmailService:
         Returns:
             dict with success status and message
         """
+        return self.send_batch([{
+            'to_email': to_email,
+            'subject': subject,
+            'html_content': html_content,
+            'attachments': attachments,
+        }])[0]
+
+    def send_batch(self, messages):
+        """
+        Send many emails; SMTP providers deliver them over one pooled session.
+        
+        Args:
+            messages: List of dicts with 'to_email', 'subject', 'html_content', optional 'attachments'
+        
+        Returns:
+            list of result dicts (same shape as send_email), one per message
+        """
         if not self.is_configured():
-            return {
-                'success': False,
-                'error': f'Email not configured. Provider: {self.provider}. Please set environment variables.'
-            }
+            error = f'Email not configured. Provider: {self.provider}. Please set environment variables.'
+            return [{'success': False, 'error': error} for _ in messages]
         
         try:
             if self.provider == 'sendgrid':
-                return self._send_sendgrid(to_email, subject, html_content, attachments)
-            elif self.provider == 'gmail':
-                return self._send_gmail(to_email, subject, html_content, attachments)
+                return [self._send_sendgrid(m['to_email'], m['subject'], m['html_content'], m.get('attachments'))
+                        for m in messages]
+            elif self.provider in ('gmail', 'smtp'):
+                return self._send_smtp(messages)
             else:
-                return {'success': False, 'error': f'Unknown provider: {self.provider}'}
+                return [{'success': False, 'error': f'Unknown provider: {self.provider}'} for _ in messages]
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return [{'success': False, 'error': str(e)} for _ in messages]
     
     def _send_sendgrid(self, to_email, subject, html_content, attachments):
         """Send email via SendGrid API."""
@@ -100,9 +289,8 @@ class EmailService:
             'status_code': response.status_code,
             'message': 'Email sent successfully via SendGrid'
         }
-    
-    def _send_gmail(self, to_email, subject, html_content, attachments):
-        """Send email via Gmail SMTP."""
+
+    def _build_message(self, to_email, subject, html_content, attachments):
         msg = MIMEMultipart()
         msg['From'] = self.from_email
         msg['To'] = to_email
@@ -115,15 +303,20 @@ class EmailService:
                 part = MIMEApplication(att['content'])
                 part.add_header('Content-Disposition', 'attachment', filename=att['filename'])
                 msg.attach(part)
-        
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(self.gmail_user, self.gmail_app_password)
-            server.send_message(msg)
-        
-        return {
-            'success': True,
-            'message': 'Email sent successfully via Gmail SMTP'
-        }
+        return msg
+    
+    def _send_smtp(self, messages):
+        """Send emails via the pooled SMTP session (Gmail or SMTP_HOST)."""
+        mime = [self._build_message(m['to_email'], m['subject'], m['html_content'], m.get('attachments'))
+                for m in messages]
+        label = 'Gmail SMTP' if self.provider == 'gmail' else 'SMTP'
+        results = []
+        for error in self.pool.send_messages(mime):
+            if error is None:
+                results.append({'success': True, 'message': f'Email sent successfully via {label}'})
+            else:
+                results.append({'success': False, 'error': str(error)})
+        return results
 
 
 def generate_compliance_email_html(report_data):
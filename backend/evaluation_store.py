@@ -0,0 +1,86 @@
+"""
+Evaluation Store
+----------------
+Persists every /evaluate result under an evaluation ID so /report and
+/send-email can render from the stored result instead of re-running the
+engines and the AI insight prompt.
+
+SQLite file in WAL mode: readers never block the writer, and all gunicorn
+workers on the host share the same store. Rows older than
+EVALUATION_RETENTION_DAYS are swept periodically.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import metrics
+
+EVALUATION_DB = os.getenv('EVALUATION_DB', os.path.join(os.path.dirname(__file__), 'data', 'evaluations.sqlite3'))
+EVALUATION_RETENTION_DAYS = float(os.getenv('EVALUATION_RETENTION_DAYS', '30'))
+
+# Run the retention sweep every N saves rather than on every insert
+_SWEEP_EVERY = 500
+
+
+class EvaluationStore:
+    def __init__(self, db_path=EVALUATION_DB, retention_days=EVALUATION_RETENTION_DAYS):
+        self.db_path = db_path
+        self.retention_s = retention_days * 86400
+        self._local = threading.local()
+        self._saves = 0
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS evaluations ("
+            " id TEXT PRIMARY KEY, created_at REAL NOT NULL, input TEXT NOT NULL, result TEXT NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, input_data, result):
+        """Stores one evaluation and returns its ID."""
+        evaluation_id = f"EVAL-{uuid.uuid4().hex[:16].upper()}"
+        now = time.time()
+        start = time.perf_counter()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO evaluations (id, created_at, input, result) VALUES (?, ?, ?, ?)",
+            (evaluation_id, now, json.dumps(input_data, default=str), json.dumps(result, default=str))
+        )
+        self._saves += 1
+        if self._saves % _SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM evaluations WHERE created_at < ?", (now - self.retention_s,))
+        metrics.observe_ms('evaluation_store.save', (time.perf_counter() - start) * 1000)
+        return evaluation_id
+
+    def set_insight(self, evaluation_id, text, source):
+        """Writes the deferred AI insight into a stored result."""
+        self._conn().execute(
+            "UPDATE evaluations SET result = json_set(result, '$.ai_insight', ?, '$.insight_status', 'ready',"
+            " '$.insight_source', ?) WHERE id = ?",
+            (text, source, evaluation_id)
+        )
+
+    def get(self, evaluation_id):
+        """{ id, created_at, input, result } or None."""
+        row = self._conn().execute(
+            "SELECT id, created_at, input, result FROM evaluations WHERE id = ?", (evaluation_id,)
+        ).fetchone()
+        if not row:
+            metrics.incr('evaluation_store.miss')
+            return None
+        metrics.incr('evaluation_store.hit')
+        return {"id": row[0], "created_at": row[1], "input": json.loads(row[2]), "result": json.loads(row[3])}
+
+
+EVALUATION_STORE = EvaluationStore()
@@ -156,7 +156,7 @@ def generate_pdf_report(report_data):
     # Results
     for res in lic.get('results', []):
         color = colors.green if res['type'] == 'EXCEPTION' else (colors.red if res['type'] == 'LICENSE_REQUIRED' else colors.orange)
-        res_text = f"<font color='{color.hexval()[2:]}'><b>[{res['code']}] {res['title']}</b></font><br/>{res['justification']}"
+        res_text = f"<font color='#{color.hexval()[2:]}'><b>[{res['code']}] {res['title']}</b></font><br/>{res['justification']}"
         elements.append(Paragraph(res_text, body_style))
         if res.get('nextSteps'):
              elements.append(Paragraph(f"<i>Next Steps: {res['nextSteps']}</i>", body_style))
@@ -171,7 +171,7 @@ def generate_pdf_report(report_data):
         elif uflpa.get('risk_level') == 'HIGH_RISK': risk_color = colors.orange
         elif uflpa.get('risk_level') == 'WARNING': risk_color = colors.yellow
         
-        elements.append(Paragraph(f"Risk Rating: <font color='{risk_color.hexval()[2:]}'><b>{uflpa.get('risk_level', 'N/A')}</b></font>", body_style))
+        elements.append(Paragraph(f"Risk Rating: <font color='#{risk_color.hexval()[2:]}'><b>{uflpa.get('risk_level', 'N/A')}</b></font>", body_style))
         
         if uflpa.get('reasons'):
             elements.append(Paragraph("<b>Risk Factors:</b>", body_style))
@@ -0,0 +1,188 @@
+"""
+Fake LLM Server
+---------------
+Stand-in for the Gemini API in tests and load runs. No API key, no network.
+
+Server: stdlib HTTP server with configurable latency, jitter and error rate.
+    POST /generate  { prompt, generation_config, stream } -> { text } or NDJSON chunks
+    GET  /health
+Client: `FakeModel`, a drop-in for `genai.GenerativeModel` (generate_content,
+count_tokens) that keeps one persistent HTTP connection per thread.
+
+Point the backend at it with LLM_FAKE_URL=http://127.0.0.1:8765
+
+Usage:
+    python fake_llm_server.py --port 8765 --latency-ms 400 --jitter-ms 200 --error-rate 0.05
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Returned for JSON-mode (intent routing) prompts
+FAKE_INTENT_JSON = {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [], "needs_clarification": False}
+
+# =============================================================================
+# SERVER
+# =============================================================================
+
+def fake_completion(prompt, generation_config=None):
+    """Deterministic canned answer for a prompt."""
+    if (generation_config or {}).get('response_mime_type') == 'application/json':
+        return json.dumps(FAKE_INTENT_JSON)
+    words = ' '.join(str(prompt).split()[-12:])
+    return f"[fake-llm] This is a simulated compliance answer. Context: {words}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive
+    config = {"latency_ms": 0.0, "jitter_ms": 0.0, "error_rate": 0.0}
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, json.dumps({"status": "ok"}))
+        else:
+            self._send(404, json.dumps({"error": "not found"}))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.path != '/generate':
+            self._send(404, json.dumps({"error": "not found"}))
+            return
+
+        cfg = self.config
+        time.sleep(max(0.0, cfg['latency_ms'] + random.uniform(0, cfg['jitter_ms'])) / 1000)
+        if random.random() < cfg['error_rate']:
+            self._send(503, json.dumps({"error": "simulated upstream failure"}))
+            return
+
+        text = fake_completion(payload.get('prompt', ''), payload.get('generation_config'))
+        if payload.get('stream'):
+            words = text.split(' ')
+            lines = [json.dumps({"text": w + (' ' if i < len(words) - 1 else '')}) for i, w in enumerate(words)]
+            self._send(200, '\n'.join(lines) + '\n', 'application/x-ndjson')
+        else:
+            self._send(200, json.dumps({"text": text}))
+
+
+def start_server(host='127.0.0.1', port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+    """Starts the server on a daemon thread. Returns (server, base_url)."""
+    handler = type('FakeLLMHandler', (_Handler,), {
+        "config": {"latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate}
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-llm-server', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+
+class FakeUpstreamError(ConnectionError):
+    """Simulated 5xx/429 from the fake server (treated as transient by the gateway)."""
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, base_url, model_name='fake-llm', timeout_s=30):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.model_name = model_name
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    def _conn(self, timeout):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+            self._local.conn = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _request(self, method, path, body=None, timeout=None):
+        timeout = timeout or self.timeout_s
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if data else {}
+        for attempt in (0, 1):
+            conn = self._conn(timeout)
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read().decode('utf-8')
+                break
+            except Exception as e:
+                # Any failure (timeout, reset, ...) leaves the connection mid-request: drop it
+                conn.close()
+                self._local.conn = None
+                # Server closed the idle keep-alive connection; reconnect once
+                stale = isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError))
+                if attempt or not stale:
+                    raise
+        if resp.status == 429 or resp.status >= 500:
+            raise FakeUpstreamError(f"Fake LLM server returned {resp.status}")
+        if resp.status >= 400:
+            raise ValueError(f"Fake LLM server returned {resp.status}: {payload}")
+        return payload
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        timeout = (request_options or {}).get('timeout')
+        body = {"prompt": prompt, "generation_config": generation_config, "stream": bool(stream)}
+        payload = self._request('POST', '/generate', body, timeout)
+        if stream:
+            return [_FakeResponse(json.loads(line)['text']) for line in payload.splitlines() if line.strip()]
+        return _FakeResponse(json.loads(payload)['text'])
+
+    def count_tokens(self, prompt):
+        self._request('GET', '/health')
+        return {"total_tokens": len(str(prompt).split())}
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Gemini server for tests and load runs.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    server, url = start_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Fake LLM server listening on {url} (latency {args.latency_ms}ms +{args.jitter_ms}ms, "
+          f"error rate {args.error_rate})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
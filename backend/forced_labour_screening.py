@@ -2,10 +2,13 @@
 ExportShield: Forced Labour Screening Engine
 ---------------------------------------------
 Dedicated module for UFLPA and forced labour risk analysis.
-Inputs: Supplier, Commodity, Origin, Region
+Inputs: Supplier, Commodity, Origin, Region, HTS Code / Supplier Address (optional)
 Outputs: Risk Level, Reason, Action, Detail
 """
 
+from hts_risk_index import lookup_hts_risk
+from xuar_gazetteer import find_xuar_places
+
 # Mock High Risk Entities (UFLPA Entity List)
 # In production, this would be a large database or API lookup
 UFLPA_ENTITY_LIST = {
@@ -34,9 +37,33 @@ UFLPA_ENTITY_LIST = {
 # High Risk Commodities (UFLPA Priority Sectors)
 HIGH_RISK_COMMODITIES = ["COTTON", "TOMATO", "POLYSILICON", "SILICA", "SOLAR", "APPAREL", "TEXTILE", "PVC"]
 
-def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None):
+def match_uflpa_entity(name):
+    """Return (entity, info) for the first UFLPA Entity List hit in `name`, or None."""
+    name_upper = (name or "").strip().upper()
+    if not name_upper:
+        return None
+    for entity, info in UFLPA_ENTITY_LIST.items():
+        if entity in name_upper:
+            return entity, info
+    return None
+
+def touches_xuar(*texts):
+    """
+    Matched XUAR places (prefectures, cities, counties, XPCC divisions) in any of
+    the origin/region/address texts. Empty list if none.
+    """
+    return find_xuar_places(*texts)
+
+def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None, hts_code=None, address=None,
+                         hts_entry=None):
     """
     Screens for Forced Labor risks based on supplier, commodity, and origin.
+    If an HTS code is given, commodity risk is resolved by longest-prefix match
+    against the HTS risk index first; the free-text keyword check is the fallback.
+    Batch callers pass `hts_entry` (this row's item from lookup_hts_risk_batch)
+    instead of having each row look its code up again.
+    A HIGH entry from China scores as a priority sector, a MEDIUM one only warns.
+    Region risk scans origin, region and supplier address against the XUAR gazetteer.
     Returns: { 
         risk_level: 'CLEAR'|'HIGH_RISK'|'SEIZURE_LIKELY', 
         reasons: [...], 
@@ -61,34 +88,55 @@ def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None
     # 1. Entity Match (Direct UFLPA List Hit)
     # ---------------------------------------
     entity_match = False
-    for entity, info in UFLPA_ENTITY_LIST.items():
-        if entity in supplier_upper and supplier_upper:
-            risk_score += 10 # Immediate Fail
-            reasons.append(f"ENTITY MATCH: '{entity}' is on the UFLPA Entity List ({info['category']}).")
-            entity_match = True
-            break
+    entity_hit = match_uflpa_entity(supplier_upper)
+    if entity_hit:
+        entity, info = entity_hit
+        risk_score += 10 # Immediate Fail
+        reasons.append(f"ENTITY MATCH: '{entity}' is on the UFLPA Entity List ({info['category']}).")
+        entity_match = True
             
     # 2. Region Match (Xinjiang / XUAR)
     # ---------------------------------
     region_match = False
-    if "XINJIANG" in origin_upper or "XINJIANG" in region_upper or "XUAR" in region_upper:
+    places = touches_xuar(origin_upper, region_upper, address)
+    if places:
         risk_score += 5
-        reasons.append("REGION MATCH: Supply chain touches Xinjiang (XUAR). Rebuttable presumption applies.")
+        place_names = ", ".join(p['name'] for p in places)
+        reasons.append(f"REGION MATCH: Supply chain touches Xinjiang (XUAR): {place_names}. Rebuttable presumption applies.")
         region_match = True
 
     # 3. Commodity Risk
     # -----------------
     commodity_match = False
-    for item in HIGH_RISK_COMMODITIES:
-        if item in commodity_upper:
-            commodity_match = True
-            if "CHINA" in origin_upper:
-                risk_score += 2
-                reasons.append(f"COMMODITY RISK: '{item}' from China is a UFLPA priority enforcement sector.")
-            else:
-                risk_score += 1
-                reasons.append(f"COMMODITY WARNING: '{item}' is a high-risk commodity sector.")
-            break
+    commodity_label = None
+    commodity_risk = "HIGH"
+    if hts_entry is not None:
+        hts_match = hts_entry['match']
+    else:
+        hts_match = lookup_hts_risk(hts_code) if hts_code else None
+    if hts_match:
+        # HTS path: exact tariff classification beats free-text keywords
+        commodity_label = f"HTS {hts_match['prefix']} ({hts_match['sector']})"
+        commodity_risk = hts_match.get('risk', "HIGH")
+    else:
+        for item in HIGH_RISK_COMMODITIES:
+            if item in commodity_upper:
+                commodity_label = f"'{item}'"
+                break
+
+    if commodity_label:
+        commodity_match = True
+        from_china = "CHINA" in origin_upper
+        if from_china and commodity_risk == "HIGH":
+            risk_score += 2
+            reasons.append(f"COMMODITY RISK: {commodity_label} from China is a UFLPA priority enforcement sector.")
+        elif from_china:
+            # MEDIUM entries (broad chapters/headings) only warn on their own
+            risk_score += 1
+            reasons.append(f"COMMODITY WARNING: {commodity_label} from China is a medium-risk UFLPA sector.")
+        else:
+            risk_score += 1
+            reasons.append(f"COMMODITY WARNING: {commodity_label} is a {commodity_risk.lower()}-risk commodity sector.")
             
     # Risk Determination
     # ------------------
@@ -98,7 +146,8 @@ def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None
             "matches": {
                 "entity": entity_match,
                 "region": region_match,
-                "commodity": commodity_match
+                "commodity": commodity_match,
+                "hts": hts_match['prefix'] if hts_match else None
             },
             "reasons": reasons,
             "action": "IMPORT PROHIBITED. Rebuttable presumption applies. Clear and convincing evidence required."
@@ -109,7 +158,8 @@ def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None
             "matches": {
                 "entity": entity_match,
                 "region": region_match,
-                "commodity": commodity_match
+                "commodity": commodity_match,
+                "hts": hts_match['prefix'] if hts_match else None
             },
             "reasons": reasons,
             "action": "Enhanced Due Diligence REQUIRED. Map supply chain to raw material level."
@@ -120,7 +170,8 @@ def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None
             "matches": {
                 "entity": entity_match,
                 "region": region_match,
-                "commodity": commodity_match
+                "commodity": commodity_match,
+                "hts": hts_match['prefix'] if hts_match else None
             },
             "reasons": reasons,
             "action": "Standard Due Diligence. Verify Country of Origin."
@@ -131,7 +182,8 @@ def screen_forced_labour(supplier=None, commodity=None, origin=None, region=None
             "matches": {
                 "entity": False,
                 "region": False,
-                "commodity": False
+                "commodity": False,
+                "hts": None
             },
             "reasons": ["No immediate UFLPA risk factors detected."],
             "action": "Proceed with standard import procedures."
@@ -0,0 +1,100 @@
+"""
+ExportShield: HS/HTS Code Risk Index
+------------------------------------
+Prefix trie over HS/HTS codes for UFLPA commodity risk.
+Inputs: HTS code (any formatting, e.g. "8541.43.0010" or "854143")
+Outputs: Longest matching risk entry (sector, risk, matched prefix)
+
+Lookup walks at most one node per digit of the code, so the cost depends
+on the code length (<= 10 digits), not on the size of the risk list.
+"""
+
+import json
+import os
+
+# =============================================================================
+# TRIE
+# =============================================================================
+
+class HtsRiskTrie:
+    """Digit trie keyed by HS/HTS prefixes (chapter, heading, subheading, line)."""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self):
+        # Each node is [children_dict, entry_or_None]
+        self._root = [{}, None]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, prefix, entry):
+        """Register a risk entry for an HS/HTS prefix."""
+        digits = normalize_hts(prefix)
+        if not digits:
+            raise ValueError(f"Invalid HTS prefix: {prefix!r}")
+        node = self._root
+        for d in digits:
+            node = node[0].setdefault(d, [{}, None])
+        if node[1] is None:
+            self._size += 1
+        node[1] = {**entry, 'prefix': digits}
+
+    def longest_match(self, code):
+        """Return the entry for the longest registered prefix of `code`, or None."""
+        digits = normalize_hts(code)
+        node = self._root
+        best = None
+        for d in digits:
+            node = node[0].get(d)
+            if node is None:
+                break
+            if node[1] is not None:
+                best = node[1]
+        return best
+
+    def lookup_batch(self, codes):
+        """Longest-prefix lookup for every code of an entry (one result per code)."""
+        return [self.longest_match(c) for c in codes]
+
+
+def normalize_hts(code):
+    """Strip dots/spaces/dashes from an HTS code. Returns '' if nothing numeric remains."""
+    if code is None:
+        return ''
+    return ''.join(ch for ch in str(code) if ch.isdigit())
+
+# =============================================================================
+# DATA LOADING
+# =============================================================================
+
+def load_hts_risk_index(file_path=None):
+    """Build the trie from `data/uflpa_hts_risk.json`."""
+    if file_path is None:
+        file_path = os.path.join(os.path.dirname(__file__), 'data', 'uflpa_hts_risk.json')
+    trie = HtsRiskTrie()
+    try:
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {file_path} not found. HTS risk index is empty.")
+        return trie
+
+    for prefix, entry in data.get('prefixes', {}).items():
+        trie.insert(prefix, entry)
+    return trie
+
+HTS_RISK_INDEX = load_hts_risk_index()
+
+def lookup_hts_risk(hts_code):
+    """Longest-prefix risk lookup against the shared index."""
+    return HTS_RISK_INDEX.longest_match(hts_code)
+
+def lookup_hts_risk_batch(hts_codes):
+    """
+    Screens all HTS lines of an entry at once.
+    Returns: [{ hts_code, match }] in input order.
+    """
+    matches = HTS_RISK_INDEX.lookup_batch(hts_codes)
+    return [{'hts_code': code, 'match': match} for code, match in zip(hts_codes, matches)]
@@ -0,0 +1,200 @@
+"""
+Deferred AI Insight
+-------------------
+Generates the /evaluate "AI Insight" paragraph off the request path.
+
+/evaluate returns the engine results with an insight_id at once; the LLM
+call runs on a small thread pool and the finished text is written back to
+the stored evaluation. Callers poll /insights/<id> or stream it over SSE.
+
+Hedged deadline: an insight still pending INSIGHT_DEADLINE_S after submit
+is settled with a templated insight built from the engine outputs (the
+LLM answer, when it arrives, still lands in the response cache). When the
+backlog exceeds INSIGHT_MAX_PENDING new insights go straight to the
+template instead of queueing behind it.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from llm_client import generate_text
+
+INSIGHT_DEADLINE_S = float(os.getenv('INSIGHT_DEADLINE_S', '4'))
+INSIGHT_WORKERS = int(os.getenv('INSIGHT_WORKERS', '4'))
+INSIGHT_MAX_PENDING = int(os.getenv('INSIGHT_MAX_PENDING', '200'))
+# Settled insights kept in memory for polling (the stored evaluation keeps the text)
+INSIGHT_HISTORY_MAX = int(os.getenv('INSIGHT_HISTORY_MAX', '5000'))
+
+PENDING, READY = 'pending', 'ready'
+
+
+def insight_id_for(evaluation_id):
+    """EVAL-XXXX -> INS-XXXX (the insight of a stored evaluation)."""
+    return 'INS-' + evaluation_id.split('-', 1)[-1]
+
+def evaluation_id_for(insight_id):
+    return 'EVAL-' + insight_id.split('-', 1)[-1]
+
+
+def insight_prompt(data, license_outcome, uflpa_outcome):
+    return (
+        f"Act as an Export Compliance Specialist.\n"
+        f"Review this shipment:\n"
+        f"1. License Check: {license_outcome['status']}. ECCN {data.get('eccn', '')} to {data.get('destination', '')}. Exceptions: {[r['code'] for r in license_outcome['results'] if r['type']=='EXCEPTION']}\n"
+        f"2. Forced Labor Check: {uflpa_outcome['risk_level']}. Supplier: {data.get('supplier', '')}. Commodity: {data.get('commodity', '')}.\n\n"
+        f"Provide 2 concise paragraphs:\n"
+        f"- License View: Summary of license requirements/exceptions.\n"
+        f"- Supply Chain View: Summary of UFLPA risks and recommended due diligence."
+    )
+
+def template_insight(data, license_outcome, uflpa_outcome):
+    """Deterministic two-paragraph insight from the engine outputs alone."""
+    eccn = data.get('eccn', '') or 'N/A'
+    destination = data.get('destination', '') or 'N/A'
+    results = license_outcome.get('results', [])
+    exceptions = [f"{r['code']} ({r['title']})" for r in results if r.get('type') == 'EXCEPTION']
+    required = [r for r in results if r.get('type') == 'LICENSE_REQUIRED']
+
+    license_view = f"License View: ECCN {eccn} to {destination} evaluates as {license_outcome.get('status', 'UNKNOWN')}."
+    if required:
+        license_view += f" A license is required ({required[0].get('title', '')}): {required[0].get('justification', '')}"
+    if exceptions:
+        license_view += f" Available license exceptions: {', '.join(exceptions)}. Confirm every condition of the exception before relying on it."
+    elif not required:
+        license_view += " No license exception needs to be claimed on these facts."
+
+    risk = uflpa_outcome.get('risk_level', 'UNKNOWN')
+    supply_view = f"Supply Chain View: UFLPA screening rates this shipment {risk}."
+    reasons = uflpa_outcome.get('reasons') or []
+    if reasons:
+        supply_view += " Risk factors: " + "; ".join(str(r) for r in reasons[:3]) + "."
+    if uflpa_outcome.get('action'):
+        supply_view += f" Recommended action: {uflpa_outcome['action']}"
+
+    return f"{license_view}\n\n{supply_view}"
+
+
+class _Insight:
+    __slots__ = ('id', 'evaluation_id', 'status', 'source', 'text', 'fallback', 'created', 'deadline', 'settled_ms', 'event')
+
+    def __init__(self, insight_id, evaluation_id, fallback, deadline_s):
+        self.id = insight_id
+        self.evaluation_id = evaluation_id
+        self.status = PENDING
+        self.source = None
+        self.text = None
+        self.fallback = fallback
+        self.created = time.perf_counter()
+        self.deadline = self.created + deadline_s
+        self.settled_ms = None
+        self.event = threading.Event()
+
+    def to_dict(self):
+        return {
+            "insight_id": self.id,
+            "evaluation_id": self.evaluation_id,
+            "status": self.status,
+            "source": self.source,
+            "ai_insight": self.text,
+            "latency_ms": self.settled_ms,
+        }
+
+
+class InsightService:
+    def __init__(self, model, store=None, deadline_s=INSIGHT_DEADLINE_S, workers=INSIGHT_WORKERS,
+                 max_pending=INSIGHT_MAX_PENDING, history_max=INSIGHT_HISTORY_MAX):
+        self.model = model
+        self.store = store
+        self.deadline_s = deadline_s
+        self.max_pending = max_pending
+        self.history_max = history_max
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='insight')
+        self._lock = threading.Lock()
+        self._insights = OrderedDict()
+        self._pending = 0
+
+    def submit(self, evaluation_id, data, license_outcome, uflpa_outcome):
+        """Starts the insight for a stored evaluation; returns its insight_id."""
+        insight_id = insight_id_for(evaluation_id) if evaluation_id else f"INS-{uuid.uuid4().hex[:16].upper()}"
+        fallback = template_insight(data, license_outcome, uflpa_outcome)
+        insight = _Insight(insight_id, evaluation_id, fallback, self.deadline_s)
+        with self._lock:
+            self._insights[insight_id] = insight
+            while len(self._insights) > self.history_max:
+                oldest_id, oldest = next(iter(self._insights.items()))
+                if oldest.status == PENDING:
+                    break
+                del self._insights[oldest_id]
+            shed = self.model is None or self._pending >= self.max_pending
+            if not shed:
+                self._pending += 1
+
+        if shed:
+            if self.model is not None:
+                metrics.incr('insight.shed')
+            self._settle(insight, fallback, 'template')
+        else:
+            prompt = insight_prompt(data, license_outcome, uflpa_outcome)
+            self._pool.submit(self._generate, insight, prompt)
+        return insight_id
+
+    def _generate(self, insight, prompt):
+        try:
+            text = generate_text(self.model, prompt, label='insight').strip()
+            self._settle(insight, text or insight.fallback, 'llm' if text else 'template')
+        except Exception as e:
+            print(f"Gemini Error: {e}")
+            self._settle(insight, insight.fallback, 'template')
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _settle(self, insight, text, source):
+        """First settle wins (LLM answer or the deadline fallback)."""
+        with self._lock:
+            if insight.status == READY:
+                if source == 'llm':
+                    metrics.incr('insight.late_llm')
+                return False
+            insight.status, insight.text, insight.source = READY, text, source
+            insight.settled_ms = round((time.perf_counter() - insight.created) * 1000, 1)
+        insight.event.set()
+        metrics.incr(f'insight.source.{source}')
+        metrics.observe_ms('insight.ready', insight.settled_ms)
+        if self.store is not None and insight.evaluation_id:
+            self.store.set_insight(insight.evaluation_id, text, source)
+        return True
+
+    def wait(self, insight_id, timeout_s=None):
+        """
+        Blocks until the insight is ready, or settles it with the template once
+        its hedged deadline passes. Returns the insight dict, or None if unknown
+        to this process.
+        """
+        with self._lock:
+            insight = self._insights.get(insight_id)
+        if insight is None:
+            return None
+        remaining = insight.deadline - time.perf_counter()
+        if timeout_s is not None:
+            remaining = min(remaining, timeout_s)
+        if not insight.event.wait(max(0.0, remaining)) and time.perf_counter() >= insight.deadline:
+            metrics.incr('insight.deadline')
+            self._settle(insight, insight.fallback, 'template')
+        return insight.to_dict()
+
+    def get(self, insight_id):
+        """Current state without waiting (settles past-deadline insights)."""
+        return self.wait(insight_id, timeout_s=0)
+
+    def generate(self, data, license_outcome, uflpa_outcome):
+        """Blocking variant for callers that need the text now (bounded by the deadline)."""
+        insight_id = self.submit(None, data, license_outcome, uflpa_outcome)
+        result = self.wait(insight_id)
+        with self._lock:
+            self._insights.pop(insight_id, None)
+        return result["ai_insight"]
@@ -0,0 +1,232 @@
+"""
+Fast-Path Intent & Entity Extractor
+-----------------------------------
+Deterministic parser that runs before the intent LLM.
+Inputs: Latest user message, current shipment context
+Outputs: Same structure as AgentOrchestrator.infer_intent
+         ({ intent, shipment_updates, missing_fields, needs_clarification }) plus 'confidence'
+
+Messages that are plain shipment data ("ECCN 5A002 to France, value $5000")
+are parsed exactly with precompiled patterns. Questions and free-form prose
+get a low confidence score and are left to the LLM.
+"""
+
+import os
+import re
+
+from license_exceptions_engine import FULL_COUNTRY_DATA
+
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv('FAST_PATH_MIN_CONFIDENCE', '0.75'))
+
+# =============================================================================
+# COUNTRY INDEX
+# =============================================================================
+
+# Common alternate names -> canonical country_groups.json key
+COUNTRY_ALIASES = {
+    'UK': 'United Kingdom', 'U.K.': 'United Kingdom', 'GREAT BRITAIN': 'United Kingdom', 'BRITAIN': 'United Kingdom', 'ENGLAND': 'United Kingdom',
+    'USA': 'United States', 'U.S.': 'United States', 'U.S.A.': 'United States', 'AMERICA': 'United States',
+    'SOUTH KOREA': 'Korea, South', 'REPUBLIC OF KOREA': 'Korea, South', 'NORTH KOREA': 'Korea, North', 'DPRK': 'Korea, North',
+    'PRC': 'China', "PEOPLE'S REPUBLIC OF CHINA": 'China', 'MAINLAND CHINA': 'China',
+    'UAE': 'United Arab Emirates', 'HOLLAND': 'Netherlands', 'THE NETHERLANDS': 'Netherlands',
+    'CZECH REPUBLIC': 'Czechia', 'IVORY COAST': "Côte d'Ivoire", 'DRC': 'Congo (Democratic Republic of the)',
+}
+
+# ISO 3166 alpha-2 codes. Matched case-sensitively (upper-case only); codes that are
+# also common English words (IN, IT, IS, NO, ...) are deliberately left out.
+COUNTRY_CODES = {
+    'US': 'United States', 'GB': 'United Kingdom', 'CN': 'China', 'FR': 'France', 'DE': 'Germany', 'JP': 'Japan',
+    'KR': 'Korea, South', 'KP': 'Korea, North', 'TW': 'Taiwan', 'HK': 'Hong Kong', 'SG': 'Singapore', 'RU': 'Russia',
+    'CA': 'Canada', 'MX': 'Mexico', 'BR': 'Brazil', 'AU': 'Australia', 'NZ': 'New Zealand', 'ES': 'Spain',
+    'NL': 'Netherlands', 'SE': 'Sweden', 'CH': 'Switzerland', 'PL': 'Poland', 'IR': 'Iran', 'IQ': 'Iraq',
+    'SY': 'Syria', 'CU': 'Cuba', 'VN': 'Vietnam', 'TH': 'Thailand', 'AE': 'United Arab Emirates',
+    'SA': 'Saudi Arabia', 'IL': 'Israel', 'TR': 'Turkey', 'UA': 'Ukraine', 'PK': 'Pakistan', 'VE': 'Venezuela',
+}
+
+def _build_country_index():
+    """Map upper-cased names/aliases to canonical keys, dropping any that aren't in the country data."""
+    index = {name.upper(): name for name in FULL_COUNTRY_DATA}
+    for alias, canonical in COUNTRY_ALIASES.items():
+        if canonical in FULL_COUNTRY_DATA:
+            index[alias] = canonical
+    codes = {code: c for code, c in COUNTRY_CODES.items() if c in FULL_COUNTRY_DATA}
+    return index, codes
+
+COUNTRY_INDEX, COUNTRY_CODE_INDEX = _build_country_index()
+
+def _alternation(words):
+    # Longest first so "Korea, South" wins over "Korea"-like prefixes
+    return '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+_COUNTRY_RE = re.compile(r'(?<![A-Za-z])(' + _alternation(COUNTRY_INDEX) + r')(?![A-Za-z])', re.IGNORECASE)
+_COUNTRY_CODE_RE = re.compile(r'\b(' + _alternation(COUNTRY_CODE_INDEX) + r')\b(?!\$)')
+
+def resolve_country(text):
+    """Canonical country name for a name, alias or ISO-2 code; None if unknown."""
+    t = str(text or '').strip().upper()
+    return COUNTRY_INDEX.get(t) or COUNTRY_CODE_INDEX.get(t)
+
+# =============================================================================
+# ENTITY PATTERNS
+# =============================================================================
+
+_ECCN_RE = re.compile(r'\b(EAR99|[0-9][A-E][0-9]{3}(?:\.[A-Za-z0-9]+)*)\b', re.IGNORECASE)
+_VALUE_RE = re.compile(
+    r'(?:\$\s*(?P<a>\d[\d,]*(?:\.\d+)?)\s*(?P<ak>[kKmM]\b)?)'
+    r'|(?:(?P<b>\d[\d,]*(?:\.\d+)?)\s*(?P<bk>[kKmM]\b)?\s*(?:USD|usd|dollars?))'
+    r'|(?:\bvalue(?:d)?\s*(?:is|of|=|:|at)?\s*(?P<c>\d[\d,]*(?:\.\d+)?)\s*(?P<ck>[kKmM]\b)?)',
+    re.IGNORECASE
+)
+# Party phrases: capture a name up to punctuation or a clause keyword
+_NAME = r"(?P<name>[A-Za-z0-9&.'\- ]+?)(?=\s*(?:[,;.]\s|[,;]|$|\s+(?:and|to|from|with|for|value|eccn|destination|origin)\b))"
+_SUPPLIER_RE = re.compile(r'\b(?:supplier|vendor|manufacturer|made by|sourced from supplier)\s*(?:is|=|:)?\s*' + _NAME, re.IGNORECASE)
+_END_USER_RE = re.compile(r'\b(?:end[\s-]?user(?:\s+name)?|consignee|customer|buyer)\s*(?:is|=|:)?\s*' + _NAME, re.IGNORECASE)
+_DEST_CUE_RE = re.compile(r'\b(?:to|destination(?:\s+is)?|dest|ship(?:ping)?\s+to|export(?:ing)?\s+to|going\s+to)\s*:?\s*$', re.IGNORECASE)
+_ORIGIN_CUE_RE = re.compile(r'\b(?:from|origin(?:\s+is)?|made\s+in|manufactured\s+in|country\s+of\s+origin(?:\s+is)?)\s*:?\s*$', re.IGNORECASE)
+_END_USE_RE = re.compile(r'\b(?:end[\s-]?use\b(?:\s+is)?|used\s+for|intended\s+for|for)\s*(?:=|:)?\s*' + _NAME, re.IGNORECASE)
+_END_USER_TYPE_RE = re.compile(r'\b(government|military|commercial|individual)\b', re.IGNORECASE)
+_QUESTION_RE = re.compile(r"^\s*(?:what|why|how|when|which|who|can|could|does|do|is|are|should|would|explain|tell me|define)\b|\?\s*$", re.IGNORECASE)
+_SCREENING_RE = re.compile(r'\b(?:screen(?:ing)?|denied part(?:y|ies)|restricted party|entity list|uflpa|forced lab(?:o|ou)r|sanction(?:s|ed)?)\b', re.IGNORECASE)
+
+# Words that carry no information beyond the extracted entities
+_FILLER = frozenset("""
+a an the and or of for to is are with please check checking run evaluate evaluation assess license licence
+export exporting ship shipping shipment item items eccn value valued usd dollars destination dest origin from
+it its this my our we i need want can you for me be on at in by end user enduser end-user supplier vendor
+customer consignee buyer type name country going also now let s screen screening ok okay yes
+thanks thank hi hello hey
+""".split())
+
+def _has(context, field):
+    """Context may use snake_case (agent) or camelCase (frontend form) keys."""
+    head, *rest = field.split('_')
+    return bool(context.get(field) or context.get(head + ''.join(w.capitalize() for w in rest)))
+
+def _parse_amount(num, suffix):
+    value = float(num.replace(',', ''))
+    if suffix:
+        value *= 1_000 if suffix.lower() == 'k' else 1_000_000
+    return value
+
+# =============================================================================
+# EXTRACTION
+# =============================================================================
+
+def extract(message, context=None):
+    """
+    Parses one user message.
+    Returns: { intent, shipment_updates, missing_fields, needs_clarification, confidence }
+    """
+    context = context or {}
+    text = (message or '').strip()
+    result = {"intent": "general_qa", "shipment_updates": {}, "missing_fields": [],
+              "needs_clarification": False, "confidence": 0.0}
+    if not text or _QUESTION_RE.search(text):
+        return result
+
+    updates = {}
+    spans = []
+
+    m = _ECCN_RE.search(text)
+    if m:
+        updates['eccn'] = m.group(1).upper()
+        spans.append(m.span())
+
+    m = _VALUE_RE.search(text)
+    if m:
+        for g in ('a', 'b', 'c'):
+            if m.group(g):
+                updates['value'] = _parse_amount(m.group(g), m.group(g + 'k'))
+                break
+        spans.append(m.span())
+
+    for regex, field in ((_SUPPLIER_RE, 'supplier_name'), (_END_USER_RE, 'end_user_name')):
+        m = regex.search(text)
+        if m and m.group('name').strip():
+            updates[field] = m.group('name').strip()
+            spans.append(m.span())
+
+    # Countries: classify by the cue word before each mention. A second, different
+    # country for the same field stays unexplained and the turn goes to the LLM.
+    unassigned = []
+    country_spans = []
+    extra_countries = False
+    for regex in (_COUNTRY_RE, _COUNTRY_CODE_RE):
+        for m in regex.finditer(text):
+            if any(s <= m.start() < e for s, e in spans):
+                continue
+            token = m.group(1)
+            canonical = COUNTRY_INDEX.get(token.upper()) if regex is _COUNTRY_RE else COUNTRY_CODE_INDEX.get(token)
+            country_spans.append(m.span())
+            prefix = text[:m.start()]
+            if _ORIGIN_CUE_RE.search(prefix):
+                field = 'origin_country'
+            elif _DEST_CUE_RE.search(prefix):
+                field = 'destination'
+            else:
+                unassigned.append((canonical, m.span()))
+                continue
+            if updates.setdefault(field, canonical) != canonical:
+                extra_countries = True
+                continue
+            spans.append(m.span())
+    for canonical, span in unassigned:
+        if updates.setdefault('destination', canonical) != canonical:
+            extra_countries = True
+            continue
+        spans.append(span)
+
+    m = _END_USER_TYPE_RE.search(text)
+    if m:
+        updates['end_user_type'] = m.group(1).capitalize()
+        spans.append(m.span())
+
+    # End use ("for radar"): only text no other entity claimed, and not just filler ("for me")
+    for m in _END_USE_RE.finditer(text):
+        start, end = m.span('name')
+        phrase = m.group('name').strip()
+        if any(s < end and start < e for s, e in spans + country_spans):
+            continue
+        if phrase and any(w.lower() not in _FILLER for w in re.findall(r"[A-Za-z0-9']+", phrase)):
+            updates['end_use'] = phrase
+            spans.append(m.span())
+            break
+
+    if not updates:
+        return result
+
+    # Confidence: how much of the message the patterns explain. Every unexplained
+    # word counts, so one stray word already drops below FAST_PATH_MIN_CONFIDENCE
+    # and the LLM gets to read it.
+    residual = list(text)
+    for s, e in spans:
+        residual[s:e] = [' '] * (e - s)
+    leftover = [w for w in re.findall(r"[A-Za-z0-9']+", ''.join(residual)) if w.lower() not in _FILLER]
+    confidence = max(0.0, 1.0 - 0.3 * len(leftover))
+    if extra_countries:
+        confidence = min(confidence, FAST_PATH_MIN_CONFIDENCE / 2)
+
+    # Party/origin data without any licensing fields is a screening request
+    license_fields = {'eccn', 'destination', 'value', 'end_user_type'}
+    intent = 'license_check'
+    if not updates.get('eccn') and (_SCREENING_RE.search(text) or not license_fields & set(updates)):
+        intent = 'screening'
+
+    missing = []
+    if intent == 'screening':
+        if not (updates.get('end_user_name') or updates.get('supplier_name')
+                or _has(context, 'end_user_name') or _has(context, 'supplier_name')):
+            missing.append('end_user_name')
+    else:
+        for field in ['eccn', 'destination', 'value', 'end_use', 'end_user_name', 'commodity_description']:
+            if not updates.get(field) and not _has(context, field):
+                missing.append(field)
+
+    result.update({
+        "intent": intent,
+        "shipment_updates": updates,
+        "missing_fields": missing,
+        "needs_clarification": bool(missing),
+        "confidence": round(confidence, 2)
+    })
+    return result
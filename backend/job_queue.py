@@ -0,0 +1,302 @@
+"""
+Background Job Queue
+--------------------
+In-process worker pool for slow side effects (report rendering, SMTP
+delivery) so request handlers can enqueue and return a job ID at once.
+
+- Handlers are registered per job kind and receive the JSON payload
+- A handler that raises is retried with jittered exponential backoff up to
+  JOB_MAX_ATTEMPTS; raise PermanentJobError to fail without retrying
+- Jobs live in a SQLite file (JOB_QUEUE_DB, WAL) by default: queued jobs
+  survive a restart, and any gunicorn worker can answer a status lookup.
+  Workers claim a job with a conditional UPDATE, so a job recovered by
+  several processes still runs once. With JOB_QUEUE_DB empty the queue is
+  in-memory and per process: /jobs/<id> only finds jobs enqueued by the
+  worker that serves the poll
+
+start() runs the pool and recovers pending jobs; it is called when the app
+is imported, and again lazily after a fork.
+"""
+import heapq
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Shared by every gunicorn worker on the host; set it empty for an in-memory, per-process queue
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', os.path.join(os.path.dirname(__file__), 'data', 'jobs.sqlite3'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '4'))
+JOB_BACKOFF_BASE_S = float(os.getenv('JOB_BACKOFF_BASE_S', '2'))
+JOB_BACKOFF_MAX_S = float(os.getenv('JOB_BACKOFF_MAX_S', '60'))
+# Jobs left 'running' longer than this by a dead process are picked up again
+JOB_LEASE_S = float(os.getenv('JOB_LEASE_S', '300'))
+# Finished jobs kept in memory for status lookups
+JOB_HISTORY_MAX = int(os.getenv('JOB_HISTORY_MAX', '1000'))
+
+QUEUED, RUNNING, RETRYING, SUCCEEDED, FAILED = 'queued', 'running', 'retrying', 'succeeded', 'failed'
+_FINISHED = (SUCCEEDED, FAILED)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad input, not configured)."""
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, db_path=JOB_QUEUE_DB, max_attempts=JOB_MAX_ATTEMPTS,
+                 backoff_base_s=JOB_BACKOFF_BASE_S, backoff_max_s=JOB_BACKOFF_MAX_S,
+                 lease_s=JOB_LEASE_S, history_max=JOB_HISTORY_MAX):
+        self.workers = max(1, workers)
+        self.db_path = db_path or None
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.lease_s = lease_s
+        self.history_max = history_max
+        self._handlers = {}
+        self._jobs = OrderedDict()   # job_id -> job dict (this process)
+        self._heap = []              # (run_at, seq, job_id)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._local = threading.local()
+        if self.db_path:
+            if self.db_path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, run_at REAL NOT NULL, created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL, result TEXT, error TEXT)"
+            )
+            self._conn().execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind, handler):
+        """handler(payload) -> JSON-serializable result."""
+        self._handlers[kind] = handler
+
+    # -------------------------------------------------------------------------
+    # Producer side
+    # -------------------------------------------------------------------------
+
+    def enqueue(self, kind, payload):
+        """Queues one job and returns its ID."""
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for job kind '{kind}'")
+        self._ensure_workers()
+        now = time.time()
+        job = {
+            "id": f"JOB-{uuid.uuid4().hex[:16].upper()}",
+            "kind": kind,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        if self.db_path:
+            self._conn().execute(
+                "INSERT INTO jobs (id, kind, payload, status, attempts, run_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job["id"], kind, json.dumps(payload, default=str), QUEUED, now, now, now)
+            )
+        with self._cond:
+            self._remember(job)
+            self._push(job["id"], now)
+        metrics.incr('jobs.enqueued')
+        return job["id"]
+
+    def get(self, job_id):
+        """Public view of a job: { id, kind, status, attempts, created_at, updated_at, result, error } or None."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+        if self.db_path:
+            row = self._conn().execute(
+                "SELECT id, kind, status, attempts, created_at, updated_at, result, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row:
+                return {
+                    "id": row[0], "kind": row[1], "status": row[2], "attempts": row[3],
+                    "created_at": row[4], "updated_at": row[5],
+                    "result": json.loads(row[6]) if row[6] else None, "error": row[7],
+                }
+        return None
+
+    def depth(self):
+        """Jobs waiting in this process (queued + scheduled retries)."""
+        with self._cond:
+            return len(self._heap)
+
+    @staticmethod
+    def _public(job):
+        return {k: job[k] for k in ("id", "kind", "status", "attempts", "created_at", "updated_at", "result", "error")}
+
+    def _remember(self, job):
+        self._jobs[job["id"]] = job
+        # Drop the oldest finished jobs beyond the history cap
+        excess = len(self._jobs) - self.history_max
+        if excess > 0:
+            for old_id in [i for i, j in self._jobs.items() if j["status"] in _FINISHED][:excess]:
+                del self._jobs[old_id]
+
+    def _push(self, job_id, run_at):
+        self._seq += 1
+        heapq.heappush(self._heap, (run_at, self._seq, job_id))
+        metrics.set_gauge('jobs.queue_depth', len(self._heap))
+        self._cond.notify()
+
+    # -------------------------------------------------------------------------
+    # Workers
+    # -------------------------------------------------------------------------
+
+    def _ensure_workers(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive fork: start a fresh pool in this process
+            self._pid = os.getpid()
+            self._heap = []
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+        if self.db_path:
+            self._recover()
+
+    def start(self):
+        """Starts the pool now (and picks up jobs left in JOB_QUEUE_DB)."""
+        self._ensure_workers()
+
+    def _recover(self):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+            (RETRYING, now, RUNNING, now - self.lease_s)
+        )
+        rows = conn.execute(
+            "SELECT id, kind, payload, status, attempts, run_at, created_at, updated_at FROM jobs"
+            " WHERE status IN (?, ?) ORDER BY run_at", (QUEUED, RETRYING)
+        ).fetchall()
+        with self._cond:
+            for row in rows:
+                if row[0] in self._jobs:
+                    continue
+                self._remember({
+                    "id": row[0], "kind": row[1], "payload": json.loads(row[2]), "status": row[3],
+                    "attempts": row[4], "created_at": row[6], "updated_at": row[7], "result": None, "error": None,
+                })
+                self._push(row[0], row[5])
+        if rows:
+            print(f"Job queue: recovered {len(rows)} pending jobs from {self.db_path}")
+            metrics.incr('jobs.recovered', len(rows))
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._heap:
+                    run_at, _, job_id = self._heap[0]
+                    wait = run_at - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        metrics.set_gauge('jobs.queue_depth', len(self._heap))
+                        return self._jobs.get(job_id)
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+    def _claim(self, job):
+        """Marks the job running; False if another process already took it."""
+        now = time.time()
+        if self.db_path:
+            cur = self._conn().execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?"
+                " WHERE id = ? AND status IN (?, ?)",
+                (RUNNING, now, job["id"], QUEUED, RETRYING)
+            )
+            if cur.rowcount != 1:
+                return False
+        with self._cond:
+            job["status"] = RUNNING
+            job["attempts"] += 1
+            job["updated_at"] = now
+        return True
+
+    def _finish(self, job, status, result=None, error=None, run_at=None):
+        now = time.time()
+        with self._cond:
+            job.update(status=status, result=result, error=error, updated_at=now)
+        if self.db_path:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, run_at = ? WHERE id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, now,
+                 run_at if run_at is not None else now, job["id"])
+            )
+
+    def _backoff_s(self, attempts):
+        delay = min(self.backoff_max_s, self.backoff_base_s * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None or job["status"] in _FINISHED:
+                continue
+            if not self._claim(job):
+                # Another process owns it; status lookups fall through to the DB
+                with self._cond:
+                    self._jobs.pop(job["id"], None)
+                continue
+            if job["attempts"] == 1:
+                metrics.observe_ms('jobs.queue_wait', (time.time() - job["created_at"]) * 1000)
+            start = time.perf_counter()
+            try:
+                result = self._handlers[job["kind"]](job["payload"])
+            except Exception as e:
+                metrics.observe_ms(f'jobs.{job["kind"]}.run', (time.perf_counter() - start) * 1000)
+                permanent = isinstance(e, PermanentJobError)
+                if permanent or job["attempts"] >= self.max_attempts:
+                    print(f"Job {job['id']} ({job['kind']}) failed after {job['attempts']} attempts: {e}")
+                    self._finish(job, FAILED, error=str(e))
+                    metrics.incr('jobs.failed')
+                    metrics.observe_ms('jobs.latency', (time.time() - job["created_at"]) * 1000)
+                else:
+                    run_at = time.time() + self._backoff_s(job["attempts"])
+                    print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed, retrying: {e}")
+                    self._finish(job, RETRYING, error=str(e), run_at=run_at)
+                    metrics.incr('jobs.retried')
+                    with self._cond:
+                        self._push(job["id"], run_at)
+                continue
+            metrics.observe_ms(f'jobs.{job["kind"]}.run', (time.perf_counter() - start) * 1000)
+            self._finish(job, SUCCEEDED, result=result)
+            metrics.incr('jobs.succeeded')
+            metrics.observe_ms('jobs.latency', (time.time() - job["created_at"]) * 1000)
+
+
+JOB_QUEUE = JobQueue()
@@ -0,0 +1,158 @@
+"""
+LLM Response Cache
+------------------
+Content-addressed cache for Gemini responses.
+Key: sha256 of (normalized prompt, model name, generation config).
+
+Two tiers:
+- In-process LRU with TTL (per worker, sub-millisecond hits)
+- Optional SQLite file (WAL mode) shared by all gunicorn workers on the host
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+LLM_CACHE_TTL_S = float(os.getenv('LLM_CACHE_TTL_S', '3600'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB', '')  # e.g. /tmp/llm_cache.sqlite3 ; empty = memory only
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv('LLM_CACHE_DISK_MAX_ENTRIES', '50000'))
+
+# Run the disk eviction sweep every N writes rather than on every insert
+_DISK_SWEEP_EVERY = 200
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so re-indented but identical prompts share a key."""
+    return ' '.join(str(prompt).split())
+
+def make_key(prompt, model_name, generation_config=None):
+    payload = json.dumps({
+        "p": normalize_prompt(prompt),
+        "m": model_name or "",
+        "g": generation_config or {}
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, ttl_s=LLM_CACHE_TTL_S, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 db_path=LLM_CACHE_DB, disk_max_entries=LLM_CACHE_DISK_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.db_path = db_path or None
+        self.disk_max_entries = disk_max_entries
+        self._mem = OrderedDict()   # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        if self.db_path:
+            self._init_db()
+
+    # -------------------------------------------------------------------------
+    # SQLite tier
+    # -------------------------------------------------------------------------
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _disk_get(self, key, now):
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"LLM Cache DB Error: {e}")
+            return None
+        if row and row[1] > now:
+            return row
+        return None
+
+    def _disk_set(self, key, value, now):
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_s, now)
+            )
+            self._writes += 1
+            if self._writes % _DISK_SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"LLM Cache DB Error: {e}")
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def _mem_put(self, key, value, expires_at):
+        with self._lock:
+            self._mem[key] = (value, expires_at)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+            metrics.set_gauge('llm_cache.memory_entries', len(self._mem))
+
+    def get(self, key):
+        """Cached value or None. Memory first, then disk (promoted to memory on hit)."""
+        now = time.time()
+        metrics.incr('llm_cache.lookups')
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._mem.move_to_end(key)
+                    metrics.incr('llm_cache.hit')
+                    metrics.incr('llm_cache.hit_memory')
+                    return entry[0]
+                del self._mem[key]
+
+        if self.db_path:
+            row = self._disk_get(key, now)
+            if row:
+                self._mem_put(key, row[0], row[1])
+                metrics.incr('llm_cache.hit')
+                metrics.incr('llm_cache.hit_disk')
+                return row[0]
+
+        metrics.incr('llm_cache.miss')
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        self._mem_put(key, value, now + self.ttl_s)
+        if self.db_path:
+            self._disk_set(key, value, now)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        if self.db_path:
+            self._conn().execute("DELETE FROM llm_cache")
+
+
+metrics.register_ratio('llm_cache.hit_rate', 'llm_cache.hit', 'llm_cache.lookups')
+
+LLM_CACHE = LLMCache()
@@ -0,0 +1,152 @@
+"""
+LLM Client Helpers
+------------------
+Single entry point for Gemini text generation used by the app, the agent
+orchestrator and the chat agent. Adds response caching (see llm_cache.py),
+single-flight coalescing of concurrent identical calls, and call metrics
+around `model.generate_content`, including prompt/completion token counts
+(from Gemini usage metadata when present, estimated otherwise).
+"""
+import os
+import threading
+import time
+
+import metrics
+from llm_cache import LLM_CACHE, make_key
+from prompt_builder import estimate_tokens
+
+# How long a coalesced caller waits for the in-flight leader before giving up
+LLM_SINGLEFLIGHT_WAIT_S = float(os.getenv('LLM_SINGLEFLIGHT_WAIT_S', '60'))
+
+
+class _InflightCall:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+metrics.register_ratio('llm.avg_prompt_tokens', 'llm.tokens.prompt', 'llm.calls')
+metrics.register_ratio('llm.avg_completion_tokens', 'llm.tokens.completion', 'llm.calls')
+
+
+def model_name_of(model):
+    """Best-effort model identifier for cache keys and logs."""
+    return getattr(model, 'model_name', None) or type(model).__name__
+
+def record_usage(prompt, completion, usage=None, label=None):
+    """Add one call's prompt/completion token counts to the metrics (total and per label)."""
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(str(prompt))
+    completion_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(completion or '')
+    metrics.incr('llm.tokens.prompt', prompt_tokens)
+    metrics.incr('llm.tokens.completion', completion_tokens)
+    if label:
+        metrics.incr(f'llm.tokens.prompt.{label}', prompt_tokens)
+        metrics.incr(f'llm.tokens.completion.{label}', completion_tokens)
+    return prompt_tokens, completion_tokens
+
+def _call_model(model, prompt, generation_config, label=None):
+    start = time.perf_counter()
+    metrics.incr('llm.calls')
+    try:
+        if generation_config:
+            response = model.generate_content(prompt, generation_config=generation_config)
+        else:
+            response = model.generate_content(prompt)
+        record_usage(prompt, response.text, getattr(response, 'usage_metadata', None), label)
+        return response.text
+    except Exception:
+        metrics.incr('llm.errors')
+        raise
+    finally:
+        metrics.observe_ms('llm.generate', (time.perf_counter() - start) * 1000)
+
+def generate_text(model, prompt, generation_config=None, cache=LLM_CACHE, label=None):
+    """
+    Returns the response text for `prompt`. `label` ('intent', 'chat', ...) tags token metrics.
+    Identical (prompt, model, config) requests are served from the cache; concurrent
+    identical misses in this process share one in-flight model call.
+    Raises whatever the model raises; callers keep their own fallbacks.
+    """
+    key = make_key(prompt, model_name_of(model), generation_config)
+    if cache is not None:
+        start = time.perf_counter()
+        cached = cache.get(key)
+        metrics.observe_ms('llm_cache.lookup', (time.perf_counter() - start) * 1000)
+        if cached is not None:
+            return cached
+
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _InflightCall()
+            _inflight[key] = call
+        metrics.set_gauge('llm.inflight', len(_inflight))
+
+    if not leader:
+        metrics.incr('llm.coalesced')
+        if not call.done.wait(LLM_SINGLEFLIGHT_WAIT_S):
+            raise TimeoutError("Timed out waiting for in-flight LLM call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _call_model(model, prompt, generation_config, label)
+        if cache is not None:
+            cache.set(key, call.result)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+            metrics.set_gauge('llm.inflight', len(_inflight))
+        call.done.set()
+
+def stream_text(model, prompt, generation_config=None, cache=LLM_CACHE, label=None):
+    """
+    Yields response text chunks as Gemini produces them (`stream=True`).
+    A cache hit is yielded as a single chunk; a completed stream is cached.
+    """
+    key = make_key(prompt, model_name_of(model), generation_config)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    start = time.perf_counter()
+    first_chunk = True
+    chunks = []
+    usage = None
+    metrics.incr('llm.calls')
+    try:
+        kwargs = {"stream": True}
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        for chunk in model.generate_content(prompt, **kwargs):
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            text = getattr(chunk, 'text', '') or ''
+            if not text:
+                continue
+            if first_chunk:
+                metrics.observe_ms('llm.first_token', (time.perf_counter() - start) * 1000)
+                first_chunk = False
+            chunks.append(text)
+            yield text
+    except Exception:
+        metrics.incr('llm.errors')
+        raise
+    finally:
+        metrics.observe_ms('llm.generate', (time.perf_counter() - start) * 1000)
+
+    record_usage(prompt, ''.join(chunks), usage, label)
+    if cache is not None and chunks:
+        cache.set(key, ''.join(chunks))
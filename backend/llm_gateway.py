@@ -0,0 +1,252 @@
+"""
+LLM Gateway
+-----------
+Wraps a Gemini `GenerativeModel` (or the local fake model, see fake_llm_server.py)
+so every call made by the app, the agent orchestrator and the chat agent is:
+
+- bounded: at most LLM_MAX_CONCURRENCY calls in flight per worker
+- deadlined: each call gets LLM_TIMEOUT_S end to end, retries included
+- retried: transient errors (429/5xx/timeouts) back off with full jitter
+- fused: after LLM_BREAKER_THRESHOLD consecutive failures the circuit opens
+  and calls fail fast for LLM_BREAKER_RESET_S, so callers drop straight to
+  their deterministic fallbacks instead of tying up request threads
+- warm: the API channel is opened at startup and optionally kept alive
+
+The gateway exposes the same `generate_content` / `count_tokens` surface as the
+model it wraps, so llm_client.py and existing callers are unchanged.
+"""
+import inspect
+import os
+import random
+import threading
+import time
+
+import metrics
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_TIMEOUT_S = float(os.getenv('LLM_TIMEOUT_S', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE_S = float(os.getenv('LLM_BACKOFF_BASE_S', '0.25'))
+LLM_BACKOFF_MAX_S = float(os.getenv('LLM_BACKOFF_MAX_S', '4'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET_S = float(os.getenv('LLM_BREAKER_RESET_S', '30'))
+LLM_KEEPALIVE_S = float(os.getenv('LLM_KEEPALIVE_S', '0'))  # 0 = no background keep-alive
+
+# google.api_core exception class names worth retrying (matched by name so the
+# gateway does not depend on google-api-core being importable)
+_TRANSIENT_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway', 'Aborted', 'RetryError',
+    'TimeoutError', 'ConnectionError', 'RemoteDisconnected',
+}
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the gateway refuses a call (circuit open, no slot, deadline spent)."""
+
+
+def is_transient(error):
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_s=LLM_BREAKER_RESET_S):
+        self.threshold = threshold
+        self.reset_s = reset_s
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_s:
+                self.state = 'half_open'
+                self._probe_in_flight = False
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Give back a half-open probe slot that was never used."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self.state != 'closed':
+                print("LLM Gateway: circuit closed")
+            self.state = 'closed'
+        metrics.set_gauge('llm_gateway.circuit_open', 0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or self._failures >= self.threshold:
+                if self.state != 'open':
+                    print(f"LLM Gateway: circuit opened after {self._failures} consecutive failures")
+                    metrics.incr('llm_gateway.circuit_trips')
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+        if self.state == 'open':
+            metrics.set_gauge('llm_gateway.circuit_open', 1)
+
+
+class LLMGateway:
+    def __init__(self, model, max_concurrency=LLM_MAX_CONCURRENCY, timeout_s=LLM_TIMEOUT_S,
+                 max_retries=LLM_MAX_RETRIES, backoff_base_s=LLM_BACKOFF_BASE_S,
+                 backoff_max_s=LLM_BACKOFF_MAX_S, breaker=None):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', None) or type(model).__name__
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self._keepalive_thread = None
+        try:
+            params = inspect.signature(model.generate_content).parameters
+            self._accepts_request_options = 'request_options' in params
+        except (TypeError, ValueError):
+            self._accepts_request_options = False
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _acquire(self, deadline):
+        if not self.breaker.allow():
+            metrics.incr('llm_gateway.rejected_open')
+            raise LLMUnavailableError("LLM circuit open; using fallback")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            metrics.incr('llm_gateway.rejected_busy')
+            # Not the upstream's fault: release a half-open probe without judging it
+            self.breaker.release_probe()
+            raise LLMUnavailableError("LLM concurrency limit reached before deadline")
+        with self._inflight_lock:
+            self._inflight += 1
+            metrics.set_gauge('llm_gateway.inflight', self._inflight)
+
+    def _release(self):
+        with self._inflight_lock:
+            self._inflight -= 1
+            metrics.set_gauge('llm_gateway.inflight', self._inflight)
+        self._slots.release()
+
+    def _kwargs(self, deadline, generation_config, stream):
+        kwargs = {}
+        if generation_config:
+            kwargs['generation_config'] = generation_config
+        if stream:
+            kwargs['stream'] = True
+        if self._accepts_request_options:
+            kwargs['request_options'] = {"timeout": max(0.1, deadline - time.monotonic())}
+        return kwargs
+
+    def _backoff(self, attempt, deadline):
+        """Full-jitter exponential backoff; False if the deadline leaves no room to retry."""
+        delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    # -------------------------------------------------------------------------
+    # Model surface
+    # -------------------------------------------------------------------------
+
+    def generate_content(self, prompt, generation_config=None, stream=False, timeout_s=None):
+        deadline = time.monotonic() + (timeout_s or self.timeout_s)
+        if stream:
+            return self._generate_stream(prompt, generation_config, deadline)
+
+        attempt = 0
+        while True:
+            self._acquire(deadline)
+            try:
+                response = self.model.generate_content(prompt, **self._kwargs(deadline, generation_config, False))
+                response.text  # surface blocked/empty responses as errors here, inside the retry loop
+            except Exception as e:
+                if not is_transient(e):
+                    # Upstream answered (bad request, blocked prompt): not a health signal
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                metrics.incr('llm_gateway.failures')
+                if attempt >= self.max_retries or self.breaker.state == 'open':
+                    raise
+            else:
+                self.breaker.record_success()
+                return response
+            finally:
+                self._release()
+
+            if not self._backoff(attempt, deadline):
+                metrics.incr('llm_gateway.deadline_exceeded')
+                raise LLMUnavailableError("LLM deadline exceeded while retrying")
+            attempt += 1
+            metrics.incr('llm_gateway.retries')
+
+    def _generate_stream(self, prompt, generation_config, deadline):
+        """Holds a concurrency slot until the stream is exhausted. No mid-stream retries."""
+        self._acquire(deadline)
+        try:
+            for chunk in self.model.generate_content(prompt, **self._kwargs(deadline, generation_config, True)):
+                yield chunk
+        except Exception as e:
+            if is_transient(e):
+                self.breaker.record_failure()
+                metrics.incr('llm_gateway.failures')
+            else:
+                self.breaker.record_success()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._release()
+
+    def count_tokens(self, prompt):
+        return self.model.count_tokens(prompt)
+
+    # -------------------------------------------------------------------------
+    # Connection warm-up
+    # -------------------------------------------------------------------------
+
+    def warm(self):
+        """Open the API channel with a cheap call so the first user request skips the handshake."""
+        if not hasattr(self.model, 'count_tokens'):
+            return False
+        try:
+            start = time.perf_counter()
+            self.model.count_tokens("ping")
+            metrics.observe_ms('llm_gateway.warm', (time.perf_counter() - start) * 1000)
+            return True
+        except Exception as e:
+            print(f"LLM Gateway warm-up failed: {e}")
+            return False
+
+    def start_background_warmup(self, keepalive_s=LLM_KEEPALIVE_S):
+        """Warm once without blocking startup; repeat every `keepalive_s` if > 0."""
+        if self._keepalive_thread is not None:
+            return
+
+        def run():
+            self.warm()
+            while keepalive_s > 0:
+                time.sleep(keepalive_s)
+                self.warm()
+
+        self._keepalive_thread = threading.Thread(target=run, name='llm-keepalive', daemon=True)
+        self._keepalive_thread.start()
@@ -0,0 +1,165 @@
+"""
+LLM Record / Replay
+-------------------
+Model adapters with the same `generate_content` / `count_tokens` surface as
+`genai.GenerativeModel`, for offline load and regression runs.
+
+- RecordingModel: passes calls through to a live model and appends every
+  prompt -> response pair (plus observed latency) to a JSONL file
+- ReplayModel: serves responses from that file with synthetic latency
+  (fixed + jitter, or the recorded latency); no network, no API key
+
+Pairs are keyed like the response cache (normalized prompt + generation
+config; model name ignored), so a recording made against one Gemini model
+replays under any adapter name.
+
+Selected in app.py with LLM_MODE=record|replay and LLM_RECORD_PATH.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+import metrics
+from llm_cache import make_key
+from fake_llm_server import fake_completion
+
+LLM_MODE = os.getenv('LLM_MODE', 'live')  # live | record | replay
+LLM_RECORD_PATH = os.getenv('LLM_RECORD_PATH', os.path.join(os.path.dirname(__file__), 'data', 'llm_recording.jsonl'))
+LLM_REPLAY_LATENCY_MS = float(os.getenv('LLM_REPLAY_LATENCY_MS', '0'))
+LLM_REPLAY_JITTER_MS = float(os.getenv('LLM_REPLAY_JITTER_MS', '0'))
+LLM_REPLAY_USE_RECORDED_LATENCY = os.getenv('LLM_REPLAY_USE_RECORDED_LATENCY', 'false').lower() == 'true'
+LLM_REPLAY_ON_MISS = os.getenv('LLM_REPLAY_ON_MISS', 'fake')  # fake | error
+
+
+class ReplayMissError(LookupError):
+    """No recorded response for this prompt (LLM_REPLAY_ON_MISS=error)."""
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+def _replay_key(prompt, generation_config):
+    return make_key(prompt, None, generation_config)
+
+
+class RecordingModel:
+    def __init__(self, model, path=LLM_RECORD_PATH):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', None) or type(model).__name__
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _record(self, prompt, generation_config, text, latency_ms):
+        entry = {
+            "key": _replay_key(prompt, generation_config),
+            "model": self.model_name,
+            "generation_config": generation_config,
+            "prompt": prompt,
+            "text": text,
+            "latency_ms": round(latency_ms, 1),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        metrics.incr('llm_replay.recorded')
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        kwargs = {}
+        if generation_config:
+            kwargs['generation_config'] = generation_config
+        if request_options:
+            kwargs['request_options'] = request_options
+        start = time.perf_counter()
+        if stream:
+            return self._record_stream(prompt, generation_config, kwargs, start)
+        response = self.model.generate_content(prompt, **kwargs)
+        self._record(prompt, generation_config, response.text, (time.perf_counter() - start) * 1000)
+        return response
+
+    def _record_stream(self, prompt, generation_config, kwargs, start):
+        chunks = []
+        for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+            chunks.append(getattr(chunk, 'text', '') or '')
+            yield chunk
+        self._record(prompt, generation_config, ''.join(chunks), (time.perf_counter() - start) * 1000)
+
+    def count_tokens(self, prompt):
+        return self.model.count_tokens(prompt)
+
+
+class ReplayModel:
+    def __init__(self, path=LLM_RECORD_PATH, latency_ms=LLM_REPLAY_LATENCY_MS, jitter_ms=LLM_REPLAY_JITTER_MS,
+                 use_recorded_latency=LLM_REPLAY_USE_RECORDED_LATENCY, on_miss=LLM_REPLAY_ON_MISS,
+                 model_name='replay'):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.use_recorded_latency = use_recorded_latency
+        self.on_miss = on_miss
+        self.model_name = model_name
+        self._entries = self._load(path)
+
+    @staticmethod
+    def _load(path):
+        """key -> (text, latency_ms). Later recordings of the same prompt win."""
+        entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    key = rec.get('key') or _replay_key(rec['prompt'], rec.get('generation_config'))
+                    entries[key] = (rec['text'], rec.get('latency_ms', 0.0))
+        except FileNotFoundError:
+            print(f"Warning: LLM recording {path} not found. Replay will use fallback answers.")
+        print(f"Loaded {len(entries)} recorded LLM responses from {path}")
+        return entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, prompt, generation_config):
+        entry = self._entries.get(_replay_key(prompt, generation_config))
+        if entry is not None:
+            metrics.incr('llm_replay.hit')
+            return entry
+        metrics.incr('llm_replay.miss')
+        if self.on_miss == 'error':
+            raise ReplayMissError("No recorded LLM response for prompt")
+        return fake_completion(prompt, generation_config), None
+
+    def _sleep(self, recorded_ms):
+        ms = recorded_ms if (self.use_recorded_latency and recorded_ms is not None) else self.latency_ms
+        ms += random.uniform(0, self.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        text, recorded_ms = self._lookup(prompt, generation_config)
+        if stream:
+            return self._stream(text, recorded_ms)
+        self._sleep(recorded_ms)
+        return _Response(text)
+
+    def _stream(self, text, recorded_ms):
+        # Spread the latency over the chunks so time-to-first-token is realistic
+        words = text.split(' ')
+        start = time.perf_counter()
+        total_ms = recorded_ms if (self.use_recorded_latency and recorded_ms is not None) else self.latency_ms
+        total_ms += random.uniform(0, self.jitter_ms)
+        for i, word in enumerate(words):
+            due = total_ms * (i + 1) / len(words) / 1000
+            wait = due - (time.perf_counter() - start)
+            if wait > 0:
+                time.sleep(wait)
+            yield _Response(word + (' ' if i < len(words) - 1 else ''))
+
+    def count_tokens(self, prompt):
+        return {"total_tokens": len(str(prompt).split())}
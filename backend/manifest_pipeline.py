@@ -0,0 +1,197 @@
+"""
+ExportShield: Streaming Import-Manifest Screening
+-------------------------------------------------
+Screens CBP entry manifests (CSV/XLSX, one row per entry line) row by row.
+Inputs: Manifest file with supplier, commodity, HTS, origin, region, address columns
+Outputs: Annotated CSV/NDJSON with UFLPA risk and DPS status per row
+
+Rows are read, screened and written in fixed-size batches, so memory use
+does not depend on manifest size.
+
+Usage:
+    python manifest_pipeline.py entries.csv screened.csv --batch-size 1000
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+from forced_labour_screening import screen_forced_labour
+from hts_risk_index import lookup_hts_risk_batch
+from dps_service import screen_party
+
+# XLSX input is optional (read-only streaming mode)
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+DEFAULT_BATCH_SIZE = 500
+
+# Manifest header spellings -> canonical column
+COLUMN_ALIASES = {
+    'supplier': 'supplier', 'suppliername': 'supplier', 'manufacturer': 'supplier', 'seller': 'supplier',
+    'commodity': 'commodity', 'description': 'commodity', 'commoditydescription': 'commodity',
+    'hts': 'hts_code', 'htscode': 'hts_code', 'htsnumber': 'hts_code', 'hscode': 'hts_code', 'tariffnumber': 'hts_code',
+    'origin': 'origin', 'countryoforigin': 'origin', 'origincountry': 'origin', 'coo': 'origin',
+    'region': 'region', 'province': 'region',
+    'address': 'address', 'supplieraddress': 'address', 'manufactureraddress': 'address',
+}
+
+ANNOTATION_COLUMNS = ['uflpa_risk_level', 'uflpa_reasons', 'uflpa_action', 'dps_status', 'dps_match']
+
+
+def _canonical(header):
+    key = ''.join(ch for ch in (header or '').lower() if ch.isalnum())
+    return COLUMN_ALIASES.get(key)
+
+# =============================================================================
+# READERS / WRITERS
+# =============================================================================
+
+def _iter_csv(path):
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        yield reader.fieldnames or []
+        for row in reader:
+            yield row
+
+def _iter_xlsx(path):
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("XLSX manifests require openpyxl (pip install openpyxl).")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else '' for h in next(rows, [])]
+        yield header
+        for values in rows:
+            yield {h: ('' if v is None else str(v)) for h, v in zip(header, values)}
+    finally:
+        wb.close()
+
+def iter_manifest(path):
+    """Yield the header list, then one dict per manifest row."""
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return _iter_xlsx(path)
+    return _iter_csv(path)
+
+
+class _CsvSink:
+    def __init__(self, f, fieldnames):
+        self._writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+class _NdjsonSink:
+    def __init__(self, f, fieldnames):
+        self._f = f
+
+    def write(self, rows):
+        for row in rows:
+            self._f.write(json.dumps(row) + "\n")
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+def _fields(row, columns):
+    return {canon: row.get(header, '') for header, canon in columns.items()}
+
+def screen_manifest_row(row, columns, hts_entry=None):
+    """Runs UFLPA + DPS on one manifest row and returns the annotated row."""
+    fields = _fields(row, columns)
+    supplier = fields.get('supplier', '')
+
+    uflpa = screen_forced_labour(
+        supplier,
+        fields.get('commodity', ''),
+        fields.get('origin', ''),
+        fields.get('region', ''),
+        fields.get('hts_code', ''),
+        fields.get('address', ''),
+        hts_entry=hts_entry
+    )
+    dps = screen_party(supplier)
+
+    annotated = dict(row)
+    annotated['uflpa_risk_level'] = uflpa['risk_level']
+    annotated['uflpa_reasons'] = " | ".join(uflpa.get('reasons', []))
+    annotated['uflpa_action'] = uflpa.get('action', '')
+    annotated['dps_status'] = dps.get('status', 'CLEAR')
+    annotated['dps_match'] = dps.get('match_name', '')
+    return annotated
+
+def screen_manifest(input_path, output_path, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Streams a manifest through the UFLPA and DPS screeners.
+    `progress(stats)` is called after every batch.
+    Returns: { rows, flagged, elapsed_s, rows_per_s }
+    """
+    rows_iter = iter_manifest(input_path)
+    header = next(rows_iter)
+    columns = {h: _canonical(h) for h in header if _canonical(h)}
+    if 'supplier' not in columns.values() and 'commodity' not in columns.values() and 'hts_code' not in columns.values():
+        raise ValueError(f"Manifest has no supplier/commodity/HTS column. Found: {header}")
+
+    stats = {'rows': 0, 'flagged': 0, 'elapsed_s': 0.0, 'rows_per_s': 0.0}
+    start = time.perf_counter()
+    fieldnames = list(header) + ANNOTATION_COLUMNS
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        sink = _NdjsonSink(out, fieldnames) if output_path.lower().endswith(('.ndjson', '.jsonl')) else _CsvSink(out, fieldnames)
+
+        batch = []
+        for row in rows_iter:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _flush(batch, columns, sink, out, stats, start, progress)
+                batch = []
+        if batch:
+            _flush(batch, columns, sink, out, stats, start, progress)
+
+    return stats
+
+def _flush(batch, columns, sink, out, stats, start, progress):
+    # One index pass for the batch's HTS lines, then per-row screening
+    hts_entries = lookup_hts_risk_batch([_fields(r, columns).get('hts_code', '') for r in batch])
+    annotated = [screen_manifest_row(r, columns, e) for r, e in zip(batch, hts_entries)]
+    sink.write(annotated)
+    out.flush()
+
+    stats['rows'] += len(annotated)
+    stats['flagged'] += sum(1 for r in annotated if r['uflpa_risk_level'] != 'CLEAR' or r['dps_status'] != 'CLEAR')
+    stats['elapsed_s'] = round(time.perf_counter() - start, 3)
+    stats['rows_per_s'] = round(stats['rows'] / stats['elapsed_s'], 1) if stats['elapsed_s'] else 0.0
+    if progress:
+        progress(stats)
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _print_progress(stats):
+    print(f"\rScreened {stats['rows']:,} rows ({stats['flagged']:,} flagged) - {stats['rows_per_s']:,.0f} rows/s",
+          end='', file=sys.stderr, flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream-screen an import manifest for UFLPA and DPS risk.")
+    parser.add_argument('input', help="Manifest file (.csv or .xlsx)")
+    parser.add_argument('output', help="Annotated output (.csv, or .ndjson/.jsonl)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--quiet', action='store_true', help="Suppress progress output")
+    args = parser.parse_args(argv)
+
+    stats = screen_manifest(args.input, args.output, args.batch_size, None if args.quiet else _print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Done: {stats['rows']:,} rows, {stats['flagged']:,} flagged, "
+          f"{stats['elapsed_s']}s ({stats['rows_per_s']:,.0f} rows/s) -> {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
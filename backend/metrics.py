@@ -0,0 +1,67 @@
+"""
+In-Process Metrics
+------------------
+Thread-safe counters, gauges and timing summaries for the backend.
+Values are per worker process (each gunicorn worker keeps its own registry).
+Exposed via GET /metrics.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_timings = {}   # name -> [count, total_ms, max_ms]
+_ratios = {}    # name -> (numerator counter, denominator counter)
+
+
+def incr(name, n=1):
+    """Increment a counter."""
+    with _lock:
+        _counters[name] += n
+
+def set_gauge(name, value):
+    """Set a point-in-time value (queue depth, cache size, ...)."""
+    with _lock:
+        _gauges[name] = value
+
+def observe_ms(name, ms):
+    """Record one duration sample in milliseconds."""
+    with _lock:
+        t = _timings.get(name)
+        if t is None:
+            _timings[name] = [1, ms, ms]
+        else:
+            t[0] += 1
+            t[1] += ms
+            if ms > t[2]:
+                t[2] = ms
+
+def register_ratio(name, numerator, denominator):
+    """Report `numerator / denominator` (counter names) under `name` in snapshots."""
+    with _lock:
+        _ratios[name] = (numerator, denominator)
+
+def snapshot():
+    """Return a JSON-serializable view of all metrics."""
+    with _lock:
+        counters = dict(_counters)
+        return {
+            "counters": counters,
+            "gauges": dict(_gauges),
+            "timings_ms": {
+                name: {"count": c, "avg": round(total / c, 3) if c else 0.0, "max": round(mx, 3)}
+                for name, (c, total, mx) in _timings.items()
+            },
+            "ratios": {
+                name: round(counters.get(num, 0) / counters[den], 4) if counters.get(den) else 0.0
+                for name, (num, den) in _ratios.items()
+            }
+        }
+
+def reset():
+    """Clear all metrics (used by local load runs between scenarios)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
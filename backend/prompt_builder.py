@@ -0,0 +1,163 @@
+"""
+Prompt Builder
+--------------
+Shared, token-budgeted prompt assembly for the intent router (agent_orchestrator)
+and the chat agent (chat_agent).
+
+- Compact JSON: no indentation, empty values dropped
+- Context: every fact value is sent each turn (Gemini calls are stateless);
+  fields changed since the last prompt sent are named so the model sees the delta
+- Token budget: fixed sections always go in; conversation history fills the
+  remaining budget newest-first, older turns are shortened to a one-line
+  summary and then dropped
+
+Token counts are estimated (~4 characters per token) so building a prompt
+never calls the API. Actual usage reported by Gemini is recorded in llm_client.
+"""
+import json
+import os
+
+PROMPT_TOKEN_BUDGET_INTENT = int(os.getenv('PROMPT_TOKEN_BUDGET_INTENT', '1500'))
+PROMPT_TOKEN_BUDGET_CHAT = int(os.getenv('PROMPT_TOKEN_BUDGET_CHAT', '2500'))
+PROMPT_MAX_MESSAGE_CHARS = int(os.getenv('PROMPT_MAX_MESSAGE_CHARS', '800'))
+
+_CHARS_PER_TOKEN = 4
+_SUMMARY_SHARE = 0.2
+
+
+def estimate_tokens(text):
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+def prune(data):
+    """Recursively drop None/''/[]/{} values."""
+    if isinstance(data, dict):
+        out = {k: prune(v) for k, v in data.items()}
+        return {k: v for k, v in out.items() if not _is_empty(v)}
+    if isinstance(data, list):
+        return [prune(v) for v in data if not _is_empty(v)]
+    return data
+
+def compact_json(data):
+    """Single-line JSON without empty values."""
+    return json.dumps(prune(data), separators=(',', ':'), ensure_ascii=False, default=str)
+
+def context_delta(context, previous=None):
+    """
+    Splits `context` against the one sent last turn.
+    Returns (changed: dict of new/changed non-empty fields, unchanged: sorted field names).
+    """
+    current = prune(context or {})
+    if not previous:
+        return current, []
+    before = prune(previous)
+    changed = {k: v for k, v in current.items() if before.get(k) != v}
+    unchanged = sorted(k for k in current if k not in changed)
+    return changed, unchanged
+
+def render_context(context, previous=None, empty_text="None"):
+    """
+    Context block for a prompt: every fact value as compact JSON (the model is
+    called statelessly, so values from earlier prompts are not in its context),
+    plus the names of fields that changed since the last prompt sent.
+    """
+    changed, unchanged = context_delta(context, previous)
+    if not changed and not unchanged:
+        return empty_text
+    lines = [f"Fields: {compact_json(context)}"]
+    if previous and changed:
+        lines.append(f"Changed since last turn: {', '.join(sorted(changed))}")
+    return "\n".join(lines)
+
+
+class _History:
+    def __init__(self, messages, labels, empty_text):
+        self.messages = messages
+        self.labels = labels
+        self.empty_text = empty_text
+
+
+class PromptBuilder:
+    """
+    Collects prompt sections in order; at most one history section, which is
+    fitted into whatever budget the fixed sections leave.
+    `stats` after build(): { prompt_tokens_est, history_kept, history_summarized, history_dropped }
+    """
+
+    def __init__(self, budget_tokens, max_message_chars=PROMPT_MAX_MESSAGE_CHARS):
+        self.budget_tokens = budget_tokens
+        self.max_message_chars = max_message_chars
+        self._sections = []
+        self.stats = {}
+
+    def add(self, text):
+        self._sections.append(text)
+        return self
+
+    def add_history(self, messages, user_label="User", assistant_label="Assistant",
+                    empty_text="This is the start of the conversation."):
+        self._sections.append(_History(messages, {'user': user_label, 'assistant': assistant_label}, empty_text))
+        return self
+
+    def _line(self, msg, labels):
+        role = msg.get('role', 'user')
+        content = ' '.join(str(msg.get('content', '')).split())
+        if len(content) > self.max_message_chars:
+            content = content[:self.max_message_chars] + '...'
+        return f"{labels.get(role, role)}: {content}"
+
+    def _fit_history(self, history, budget):
+        """Newest messages in full while they fit; older user turns summarized on one line."""
+        kept = []
+        used = 0
+        messages = list(history.messages)
+        lines = [self._line(m, history.labels) for m in messages]
+        # If everything doesn't fit, hold back a fifth of the budget for the summary line
+        total = sum(estimate_tokens(line) + 1 for line in lines)
+        recent_budget = budget if total <= budget else int(budget * (1 - _SUMMARY_SHARE))
+        idx = len(messages)
+        while idx > 0:
+            line = lines[idx - 1]
+            cost = estimate_tokens(line) + 1
+            if used + cost > recent_budget:
+                break
+            kept.append(line)
+            used += cost
+            idx -= 1
+        kept.reverse()
+
+        older = messages[:idx]
+        summarized = 0
+        if older:
+            topics = []
+            for msg in older:
+                if msg.get('role', 'user') != 'user':
+                    continue
+                snippet = ' '.join(str(msg.get('content', '')).split())[:60]
+                candidate = f"(Earlier: {len(older)} messages omitted; user asked about: {'; '.join(topics + [snippet])})"
+                if used + estimate_tokens(candidate) + 1 > budget:
+                    break
+                topics.append(snippet)
+                summarized += 1
+            summary = (f"(Earlier: {len(older)} messages omitted; user asked about: {'; '.join(topics)})"
+                       if topics else f"(Earlier: {len(older)} messages omitted)")
+            if used + estimate_tokens(summary) + 1 <= budget:
+                kept.insert(0, summary)
+
+        self.stats.update({
+            "history_kept": len(messages) - len(older),
+            "history_summarized": summarized,
+            "history_dropped": len(older) - summarized,
+        })
+        return "\n".join(kept) if kept else history.empty_text
+
+    def build(self):
+        fixed = sum(estimate_tokens(s) for s in self._sections if isinstance(s, str))
+        remaining = max(0, self.budget_tokens - fixed)
+        self.stats = {"history_kept": 0, "history_summarized": 0, "history_dropped": 0}
+        parts = [self._fit_history(s, remaining) if isinstance(s, _History) else s for s in self._sections]
+        prompt = "\n".join(parts)
+        self.stats["prompt_tokens_est"] = estimate_tokens(prompt)
+        return prompt
@@ -0,0 +1,182 @@
+"""
+Shipment Normalizer
+-------------------
+Builds a ShipmentCase from frontend form data and LLM `shipment_updates`
+in a single pass.
+
+Every accepted key spelling (camelCase form fields, snake_case LLM fields,
+legacy names) is listed once in FIELD_ALIASES and folded into a lookup
+table at import time. Each ShipmentCase field has a typed coercer
+(money, integers, booleans, units, countries, end-user type).
+
+Keys that match neither the table nor IGNORED_KEYS are counted, so the
+table can be extended from real traffic (see unknown_key_stats, /metrics).
+"""
+
+import re
+import threading
+from collections import Counter
+
+import metrics
+from data_models import ShipmentCase
+from intent_extractor import resolve_country
+
+# Canonical ShipmentCase field -> accepted spellings (matched case/punctuation-insensitively)
+FIELD_ALIASES = {
+    'eccn': ['eccn', 'eccnCode', 'classification', 'exportClassification'],
+    'destination': ['destination', 'destinationCountry', 'dest', 'shipTo', 'country'],
+    'value': ['value', 'valueUsd', 'value_usd', 'shipmentValue', 'amount', 'price', 'declaredValue'],
+    'quantity': ['quantity', 'qty'],
+    'end_user_type': ['end_user_type', 'endUserType', 'userType', 'customerType'],
+    'end_user_name': ['end_user_name', 'endUserName', 'endUser', 'end_user', 'consignee', 'customerName', 'buyer'],
+    'supplier_name': ['supplier_name', 'supplierName', 'supplier', 'vendor', 'manufacturer'],
+    'commodity_description': ['commodity_description', 'commodityDescription', 'commodity', 'description',
+                              'product', 'productDescription', 'item', 'itemDescription'],
+    'origin_country': ['origin_country', 'originCountry', 'origin', 'countryOfOrigin', 'coo'],
+    'hts_code': ['hts_code', 'htsCode', 'hts', 'htsNumber', 'hsCode', 'tariffNumber'],
+    'end_use': ['end_use', 'endUse', 'purpose', 'intendedUse'],
+    'is_reexport': ['is_reexport', 'isReexport', 'isReExport', 'reexport', 'reExport'],
+    'unit': ['unit', 'units', 'uom', 'unitOfMeasure'],
+}
+
+# Known request keys that are not ShipmentCase inputs (not counted as unknown)
+IGNORED_KEYS = {'region', 'supplieraddress', 'address', 'currency', 'isgovernmentcontract', 'notes', 'sessionid'}
+
+
+def fold_key(key):
+    """'endUserName', 'end_user_name' and 'End-User Name' all fold to 'endusername'."""
+    return ''.join(ch for ch in str(key).lower() if ch.isalnum())
+
+def _build_alias_index():
+    index = {}
+    for field_name, spellings in FIELD_ALIASES.items():
+        for spelling in spellings + [field_name]:
+            folded = fold_key(spelling)
+            if index.get(folded, field_name) != field_name:
+                raise ValueError(f"Alias '{spelling}' maps to both {index[folded]} and {field_name}")
+            index[folded] = field_name
+    return index
+
+ALIAS_INDEX = _build_alias_index()
+
+# =============================================================================
+# COERCERS
+# =============================================================================
+
+_MONEY_RE = re.compile(r'(-?\d+(?:\.\d+)?)\s*([kKmM])?\b')
+
+_UNIT_ALIASES = {
+    'unit': 'units', 'units': 'units', 'pc': 'units', 'pcs': 'units', 'piece': 'units', 'pieces': 'units', 'ea': 'units', 'each': 'units',
+    'kg': 'kg', 'kgs': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'g': 'g', 'gram': 'g', 'grams': 'g',
+    'lb': 'lbs', 'lbs': 'lbs', 'pound': 'lbs', 'pounds': 'lbs',
+    'l': 'liters', 'liter': 'liters', 'liters': 'liters', 'litre': 'liters', 'litres': 'liters',
+    'm': 'meters', 'meter': 'meters', 'meters': 'meters', 'metre': 'meters', 'metres': 'meters',
+}
+
+_END_USER_TYPES = {'commercial': 'Commercial', 'government': 'Government', 'individual': 'Individual', 'military': 'Military'}
+
+_TRUE = {'true', 'yes', 'y', '1', 'on'}
+
+
+def to_money(v):
+    """5000, '5000', '$5,000', '5k', '1.2M USD' -> float. Unparseable -> 0.0."""
+    if isinstance(v, bool):
+        return 0.0
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = _MONEY_RE.search(str(v).replace(',', '').replace('$', ''))
+    if not m:
+        return 0.0
+    amount = float(m.group(1))
+    if m.group(2):
+        amount *= 1_000 if m.group(2).lower() == 'k' else 1_000_000
+    return amount
+
+def to_int(v):
+    try:
+        return max(1, int(float(str(v).replace(',', ''))))
+    except (TypeError, ValueError):
+        return 1
+
+def to_bool(v):
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() in _TRUE
+
+def to_unit(v):
+    text = str(v).strip()
+    return _UNIT_ALIASES.get(text.lower(), text)
+
+def to_country(v):
+    text = str(v).strip()
+    return resolve_country(text) or text
+
+def to_end_user_type(v):
+    text = str(v).strip()
+    return _END_USER_TYPES.get(text.lower(), text)
+
+def to_text(v):
+    return str(v).strip()
+
+def to_eccn(v):
+    return str(v).strip().upper()
+
+COERCERS = {
+    'eccn': to_eccn,
+    'destination': to_country,
+    'value': to_money,
+    'quantity': to_int,
+    'end_user_type': to_end_user_type,
+    'end_user_name': to_text,
+    'supplier_name': to_text,
+    'commodity_description': to_text,
+    'origin_country': to_country,
+    'hts_code': to_text,
+    'end_use': to_text,
+    'is_reexport': to_bool,
+    'unit': to_unit,
+}
+
+# =============================================================================
+# NORMALIZER
+# =============================================================================
+
+_unknown_keys = Counter()
+_unknown_lock = threading.Lock()
+# Bounds for the unknown-key tally (keys come straight from request bodies)
+_MAX_UNKNOWN_KEYS = 1000
+_MAX_KEY_CHARS = 100
+
+
+def normalize_shipment(*sources):
+    """
+    One pass over each source dict (later sources win) -> ShipmentCase.
+    Empty values (None, '') never overwrite a value set by an earlier key.
+    """
+    fields = {}
+    unknown = []
+    for source in sources:
+        for key, raw in (source or {}).items():
+            field_name = ALIAS_INDEX.get(fold_key(key))
+            if field_name is None:
+                if fold_key(key) not in IGNORED_KEYS:
+                    unknown.append(key)
+                continue
+            if raw is None or raw == '':
+                continue
+            fields[field_name] = COERCERS[field_name](raw)
+
+    if unknown:
+        metrics.incr('shipment.unknown_keys', len(unknown))
+        with _unknown_lock:
+            for key in unknown:
+                key = str(key)[:_MAX_KEY_CHARS]
+                if key in _unknown_keys or len(_unknown_keys) < _MAX_UNKNOWN_KEYS:
+                    _unknown_keys[key] += 1
+    return ShipmentCase(**fields)
+
+def unknown_key_stats(limit=50):
+    """Most frequent unrecognised keys: [{ key, count }]."""
+    with _unknown_lock:
+        return [{"key": k, "count": c} for k, c in _unknown_keys.most_common(limit)]
@@ -0,0 +1,238 @@
+"""
+ExportShield: Multi-Tier Supply Chain Screening
+-----------------------------------------------
+Graph screening mode for UFLPA exposure that sits several tiers upstream
+(e.g. polysilicon -> wafers -> cells -> modules).
+Inputs: Supplier -> sub-supplier edges (with material and supplier region), root SKU/finished good
+Outputs: Offending paths to UFLPA entities or XUAR-located suppliers
+
+Each node's offending paths are computed once and memoized, so sub-graphs
+shared by many SKUs (common raw-material suppliers) are only walked once.
+Memoized paths are linked lists of hops that share their tails with the
+suppliers' paths, so a chain N tiers deep costs O(N), not O(N^2); the hop
+list is only materialized for the paths returned.
+Supplier cycles are memoized per strongly connected component, so results
+don't depend on screening order. Traversal is iterative, so deep chains
+don't hit the recursion limit.
+"""
+
+import csv
+import json
+from collections import defaultdict, deque
+
+from forced_labour_screening import match_uflpa_entity, touches_xuar
+
+# Max offending paths kept per node. Bounds memory on dense graphs where the
+# number of distinct paths grows combinatorially.
+DEFAULT_MAX_PATHS = 5
+
+
+def _norm(name):
+    return (name or "").strip().upper()
+
+def _chain(prefix, tail):
+    """
+    Forward hop link (edge, next) for prefix + tail. `prefix` is a parent-pointer
+    link (previous, edge) from a BFS, walked once; `tail` is shared, not copied.
+    """
+    while prefix is not None:
+        prefix, edge = prefix
+        tail = (edge, tail)
+    return tail
+
+def _hops(link):
+    """Tuple of (buyer, supplier, material) hops for a forward hop link."""
+    hops = []
+    while link is not None:
+        edge, link = link
+        hops.append(edge)
+    return tuple(hops)
+
+
+class SupplyChainGraph:
+    """Directed graph of buyer -> supplier edges with memoized exposure lookup."""
+
+    def __init__(self, max_paths=DEFAULT_MAX_PATHS):
+        self.max_paths = max_paths
+        self._suppliers = defaultdict(list)  # buyer -> [(supplier, material)]
+        self._regions = {}                   # node -> region text
+        self._memo = {}                      # node -> tuple of (hop_link, offender, reason)
+        self.edge_count = 0
+
+    # -------------------------------------------------------------------------
+    # Construction
+    # -------------------------------------------------------------------------
+
+    def add_edge(self, buyer, supplier, material=None, region=None):
+        """Register `supplier` as a sub-supplier of `buyer` (optionally with supplier region)."""
+        buyer, supplier = _norm(buyer), _norm(supplier)
+        if not buyer or not supplier:
+            return
+        self._suppliers[buyer].append((supplier, material or ""))
+        if region:
+            self._regions[supplier] = region
+        self.edge_count += 1
+        self._memo.clear()
+
+    def set_region(self, node, region):
+        self._regions[_norm(node)] = region
+        self._memo.clear()
+
+    @classmethod
+    def from_edges(cls, edges, max_paths=DEFAULT_MAX_PATHS):
+        """Build from an iterable of dicts: { buyer, supplier, material, region }."""
+        graph = cls(max_paths=max_paths)
+        for e in edges:
+            graph.add_edge(e.get('buyer'), e.get('supplier'), e.get('material'), e.get('region'))
+        return graph
+
+    @classmethod
+    def load(cls, file_path, max_paths=DEFAULT_MAX_PATHS):
+        """Load edges from a CSV (buyer,supplier,material,region) or JSON ({"edges": [...]}) file."""
+        if file_path.lower().endswith('.json'):
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+            edges = data.get('edges', []) if isinstance(data, dict) else data
+            return cls.from_edges(edges, max_paths=max_paths)
+
+        with open(file_path, 'r', newline='') as f:
+            return cls.from_edges(csv.DictReader(f), max_paths=max_paths)
+
+    # -------------------------------------------------------------------------
+    # Screening
+    # -------------------------------------------------------------------------
+
+    def _node_flag(self, node):
+        """Reason string if the node itself is a UFLPA hit, else None."""
+        entity_hit = match_uflpa_entity(node)
+        if entity_hit:
+            entity, info = entity_hit
+            return f"ENTITY MATCH: '{entity}' is on the UFLPA Entity List ({info['category']})."
+        region = self._regions.get(node)
+        if region and touches_xuar(region):
+            return f"REGION MATCH: Supplier located in Xinjiang (XUAR): {region}."
+        return None
+
+    def _component_paths(self, component):
+        """
+        Offending paths for every node of one strongly connected component.
+        Suppliers outside the component are already memoized; inside it, each
+        member reaches the others over shortest internal paths (BFS), so the
+        result never depends on where the traversal entered the cycle.
+        """
+        members = set(component)
+        result = {}
+        for start in component:
+            found = []
+            prefix = {start: None}   # node -> parent-pointer link of the hops from start
+            queue = deque([start])
+            while queue and len(found) < self.max_paths:
+                node = queue.popleft()
+                hops = prefix[node]
+                reason = self._node_flag(node)
+                if reason:
+                    found.append((_chain(hops, None), node, reason))
+                for supplier, material in self._suppliers.get(node, ()):
+                    if len(found) >= self.max_paths:
+                        break
+                    edge = (node, supplier, material)
+                    if supplier in members:
+                        if supplier not in prefix:
+                            prefix[supplier] = (hops, edge)
+                            queue.append(supplier)
+                        continue
+                    for sub_link, offender, r in self._memo.get(supplier, ()):
+                        found.append((_chain(hops, (edge, sub_link)), offender, r))
+                        if len(found) >= self.max_paths:
+                            break
+            result[start] = tuple(found[:self.max_paths])
+        return result
+
+    def offending_paths(self, root):
+        """
+        All (up to max_paths) paths from `root` that reach a UFLPA entity or XUAR supplier.
+        Returns a tuple of (hops, offender, reason).
+        """
+        root = _norm(root)
+        if root not in self._memo:
+            self._screen(root)
+        return tuple((_hops(link), offender, reason) for link, offender, reason in self._memo[root])
+
+    def _screen(self, root):
+        """Memoizes the offending paths of `root` and everything upstream of it."""
+        # Iterative Tarjan: a strongly connected component (a supplier cycle) is
+        # memoized as a whole once all of its members' outside suppliers are done.
+        index = {root: 0}
+        low = {root: 0}
+        component_stack = [root]
+        on_stack = {root}
+        stack = [(root, iter(self._suppliers.get(root, ())))]
+        while stack:
+            node, children = stack[-1]
+            for supplier, _material in children:
+                if supplier in self._memo:
+                    continue
+                if supplier not in index:
+                    index[supplier] = low[supplier] = len(index)
+                    component_stack.append(supplier)
+                    on_stack.add(supplier)
+                    stack.append((supplier, iter(self._suppliers.get(supplier, ()))))
+                    break
+                if supplier in on_stack:
+                    low[node] = min(low[node], index[supplier])
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = component_stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.reverse()
+                    self._memo.update(self._component_paths(component))
+
+
+def _format_path(hops, offender, reason):
+    return {
+        "tiers": len(hops),
+        "path": [{"buyer": b, "supplier": s, "material": m} for b, s, m in hops],
+        "offender": offender,
+        "reason": reason
+    }
+
+def screen_supply_chain(graph, root):
+    """
+    Screens a finished good / SKU against its full upstream supply chain.
+    Returns: {
+        root, risk_level: 'CLEAR'|'SEIZURE_LIKELY',
+        paths: [{ tiers, path: [...], offender, reason }],
+        reasons: [...], action: "..."
+    }
+    """
+    found = graph.offending_paths(root)
+    paths = [_format_path(*p) for p in found]
+
+    if paths:
+        return {
+            "root": _norm(root),
+            "risk_level": "SEIZURE_LIKELY",
+            "paths": paths,
+            "reasons": sorted({p['reason'] for p in paths}),
+            "action": "IMPORT PROHIBITED. Upstream tier touches UFLPA entity or XUAR. Clear and convincing evidence required."
+        }
+    return {
+        "root": _norm(root),
+        "risk_level": "CLEAR",
+        "paths": [],
+        "reasons": ["No UFLPA entity or XUAR supplier found upstream."],
+        "action": "Proceed with standard import procedures."
+    }
+
+def screen_skus(graph, roots):
+    """Screens many SKUs against one graph; shared sub-graphs are walked once."""
+    return [screen_supply_chain(graph, r) for r in roots]
@@ -0,0 +1,83 @@
+"""Agent orchestrator tool selection and speculation (no server, no LLM)."""
+from agent_orchestrator import AgentOrchestrator
+
+
+class FailingModel:
+    """Stands in for the LLM; every call fails so the turn falls back."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self.calls += 1
+        raise RuntimeError("LLM unavailable")
+
+
+def test_select_tools_follows_intent():
+    orchestrator = AgentOrchestrator()
+    shipment = orchestrator.build_shipment({"eccn": "3A001", "destination": "China", "supplier_name": "Acme"}, {})
+    assert sorted(orchestrator.select_tools('full_check', shipment)) == ['license', 'uflpa']
+    assert sorted(orchestrator.select_tools('screening', shipment)) == ['uflpa']
+    assert orchestrator.select_tools('general_qa', orchestrator.build_shipment({"eccn": "3A001"}, {})) == {}
+
+
+def test_fast_path_turn_does_not_speculate():
+    model = FailingModel()
+    orchestrator = AgentOrchestrator(model=model)
+    response = orchestrator.process_request([{"role": "user", "content": "ECCN 5A002 to Germany"}],
+                                            {"eccn": "3A001", "destination": "China"})
+    assert response['meta']['intent_source'] == 'fast_path'
+    assert 'speculation' not in response['meta']
+    assert model.calls == 0
+
+
+def test_llm_turn_speculates_on_known_context():
+    orchestrator = AgentOrchestrator(model=FailingModel())
+    response = orchestrator.process_request([{"role": "user", "content": "hmm, what should I do about this?"}],
+                                            {"eccn": "3A001", "destination": "China"})
+    assert response['meta']['intent_source'] == 'llm'
+    assert 'speculation' in response['meta']
+
+
+def test_tools_run_concurrently_and_failures_degrade_to_unknown():
+    import time
+
+    orchestrator = AgentOrchestrator(tool_timeout=0.3)
+
+    def slow_license(shipment):
+        time.sleep(1.0)
+
+    def broken_uflpa(shipment):
+        raise RuntimeError("engine crashed")
+
+    orchestrator._run_license = slow_license
+    orchestrator._run_uflpa = broken_uflpa
+    shipment = orchestrator.build_shipment({"eccn": "5A002", "destination": "Germany", "supplier_name": "Acme",
+                                            "end_user_name": "Thales"}, {})
+    timings = {}
+    start = time.perf_counter()
+    results = orchestrator.execute_tools('full_check', shipment, timings)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.8  # bounded by the shared deadline, not by the slow engine
+    assert results['license'].status == 'UNKNOWN' and 'timed out' in results['license'].trace[0]
+    assert results['uflpa'].outcome == 'UNKNOWN' and 'failed' in results['uflpa'].reasoning[0]
+    assert results['dps'].outcome in ('CLEAR', 'MATCH', 'WARNING')
+    # Measured waits, not the configured timeout or None
+    assert 250 <= timings['license'] <= 800
+    assert all(isinstance(ms, float) for ms in timings.values())
+
+
+def test_failed_license_check_is_shown_as_unknown_verdict():
+    orchestrator = AgentOrchestrator(tool_timeout=0.3)
+
+    def broken_license(shipment):
+        raise RuntimeError("engine crashed")
+
+    orchestrator._run_license = broken_license
+    response = orchestrator.process_request([{"role": "user", "content": "ECCN 5A002 to Germany"}], {})
+    verdict = next(m for m in response['messages'] if m['kind'] == 'verdict_card')
+    assert verdict['data']['status'] == 'UNKNOWN'
+    assert response['meta']['tool_timings_ms']['license'] is not None
+    next_steps = next(m for m in response['messages'] if m['kind'] == 'next_steps')
+    assert next_steps['data']['actions'] == []
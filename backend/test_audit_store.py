@@ -0,0 +1,102 @@
+"""Audit store writer tests: durability of the index under write failures (no server needed)."""
+import os
+import sqlite3
+
+import pytest
+
+from audit_store import AuditStore
+
+
+def _event(i, event_type='DPS_SCREEN'):
+    return {'id': str(i), 'timestamp': '2026-01-01T00:00:00', 'event_type': event_type,
+            'input_data': {'company': f'Company {i}', 'result': 'CLEAR'}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AuditStore(str(tmp_path), fsync=False, commit_interval_ms=1)
+
+
+def test_append_flush_query(store):
+    for i in range(5):
+        store.append(_event(i))
+    assert store.flush()
+    events, cursor = store.query(limit=3)
+    assert [e['id'] for e in events] == ['4', '3', '2']
+    events, cursor = store.query(limit=3, cursor=cursor)
+    assert [e['id'] for e in events] == ['1', '0'] and cursor is None
+    assert store.usage()['usage']['entityScreening'] == 5
+
+
+def test_failed_index_write_is_rolled_back_and_retried(store):
+    apply = store._rollups.apply
+    failures = []
+
+    def flaky_apply(conn, usage):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return apply(conn, usage)
+
+    store._rollups.apply = flaky_apply
+    store.append(_event(0))
+    assert store.flush(timeout_s=5)
+    for i in range(1, 3):
+        store.append(_event(i))
+    assert store.flush(timeout_s=5)
+
+    assert failures == [1]
+    events, _ = store.query(limit=10)
+    assert sorted(e['id'] for e in events) == ['0', '1', '2']
+    # The rolled-back attempt left no partial rows behind
+    assert store._conn().execute("SELECT COUNT(*) FROM audit_index").fetchone()[0] == 3
+    assert store.usage()['totals']['event_type'] == {'DPS_SCREEN': 3}
+
+
+def test_reindex_restores_index_and_rollups(store):
+    for i in range(4):
+        store.append(_event(i, 'UFLPA_SCREEN'))
+    assert store.flush()
+    before = store.usage()['totals']
+    store._conn().execute("DELETE FROM audit_index")
+    assert store.rebuild_index() == 4
+    assert len(store.query(limit=10)[0]) == 4
+    assert store.usage()['totals'] == before
+
+
+class _FailingSegment:
+    """Segment file stand-in that writes half of the batch and then fails like a full disk."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, data):
+        self._f.write(data[:len(data) // 2])
+        self._f.flush()
+        raise OSError(28, 'No space left on device')
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def test_failed_segment_write_does_not_advance_the_chain(tmp_path):
+    from audit_integrity import verify_directory
+
+    store = AuditStore(str(tmp_path), fsync=False, commit_interval_ms=1, seal_key='k')
+    store.append(_event(0))
+    assert store.flush()
+    name, f = store._segment
+    size = f.tell()
+    store._segment = (name, _FailingSegment(f))
+    store.append(_event(1))
+    assert store.flush()
+    assert os.path.getsize(os.path.join(str(tmp_path), name)) == size
+
+    store.append(_event(2))
+    assert store.flush()
+    store.close()
+    segments = sorted(n for n in os.listdir(str(tmp_path)) if n.endswith('.log'))
+    report = verify_directory(str(tmp_path), segments, workers=1, key='k')
+    assert report['ok'], report['errors']
+    assert report['records'] == 2
+    assert sorted(e['id'] for e in store.query(limit=10)[0]) == ['0', '2']
@@ -0,0 +1,46 @@
+"""Streaming batch parser tests (no server needed)."""
+import io
+
+import pytest
+
+from batch_evaluation import BatchInputError, BatchRowError, iter_chunks, iter_json_rows
+
+
+def _rows(body, read_size=7):
+    return list(iter_json_rows(io.BytesIO(body), read_size=read_size))
+
+
+def test_array_and_ndjson_across_small_reads():
+    assert _rows(b'[{"a": 1}, {"a": 2}]') == [{"a": 1}, {"a": 2}]
+    assert _rows(b'{"a": 1}\n{"a": "\xc3\xa9"}\n') == [{"a": 1}, {"a": "é"}]
+
+
+def test_bad_ndjson_line_is_skipped_not_fatal():
+    rows = _rows(b'{"a": 1}\n{"a": oops\n{"a": 3}\n')
+    assert rows[0] == {"a": 1} and rows[2] == {"a": 3}
+    assert isinstance(rows[1], BatchRowError)
+
+
+def test_non_utf8_bytes_fail_only_their_row():
+    rows = _rows(b'{"a": 1}\n{"a": "\xff\xfe"}\n\xff\n{"a": 4}\n')
+    assert rows[0] == {"a": 1} and rows[-1] == {"a": 4}
+    assert [str(r) for r in rows[1:3]] == ["Row is not valid UTF-8", "Invalid NDJSON line: invalid UTF-8"]
+
+
+def test_bad_array_raises_after_earlier_rows():
+    chunks = iter_chunks(iter_json_rows(io.BytesIO(b'[{"a": 1}, {"a": oops}]')), size=10)
+    assert next(chunks) == [{"a": 1}]
+    with pytest.raises(BatchInputError):
+        next(chunks)
+
+
+def test_app_streams_summary_for_non_utf8_body(app_module):
+    import json
+
+    app = app_module
+    body = b'{"eccn": "5A002", "destination": "Germany"}\n\xff\xfe garbage\n{"eccn": "3A001", "destination": "China"}\n'
+    response = app.app.test_client().post('/evaluate/batch', data=body, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line.get('index') for line in lines[:3]] == [0, 1, 2]
+    assert 'error' in lines[1] and 'license_results' in lines[2]
+    assert lines[-1]['summary']['rows'] == 3 and lines[-1]['summary']['errors'] == 1
@@ -0,0 +1,89 @@
+"""Conversation store tests: eviction, expiry, message cap, SQLite persistence (no server needed)."""
+import time
+
+import pytest
+
+from conversation_store import MemoryConversationStore, SQLiteConversationStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == 'sqlite':
+            return SQLiteConversationStore(db_path=str(tmp_path / 'conversations.sqlite3'), **kwargs)
+        return MemoryConversationStore(**kwargs)
+    return make
+
+
+def _contents(store, session_id, limit=100):
+    return [m['content'] for m in store.history(session_id, limit=limit)]
+
+
+def test_history_returns_last_messages_oldest_first(make_store):
+    store = make_store()
+    for i in range(5):
+        store.append('s1', 'user', f'm{i}', data={'i': i} if i == 4 else None)
+    assert _contents(store, 's1', limit=3) == ['m2', 'm3', 'm4']
+    assert store.history('s1', limit=1)[0]['data'] == {'i': 4}
+    assert _contents(store, 'other') == []
+
+
+def test_messages_are_trimmed_to_the_cap(make_store):
+    store = make_store(max_messages=3)
+    for i in range(7):
+        store.append('s1', 'user', f'm{i}')
+    assert _contents(store, 's1') == ['m4', 'm5', 'm6']
+
+
+def test_idle_session_expires(make_store):
+    store = make_store(ttl_s=0.05)
+    store.append('s1', 'user', 'hello')
+    store.update_context('s1', {'eccn': '5A002'})
+    time.sleep(0.1)
+    assert store.get('s1')['context'] == {}
+    assert _contents(store, 's1') == []
+
+
+def test_context_and_meta_updates(make_store):
+    store = make_store()
+    store.update_context('s1', {'eccn': '5A002'})
+    assert store.update_context('s1', {'destination': 'France'}) == {'eccn': '5A002', 'destination': 'France'}
+    store.set_meta('s1', 'sent_context', {'eccn': '5A002'})
+    assert store.get('s1')['meta'] == {'sent_context': {'eccn': '5A002'}}
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryConversationStore(max_sessions=2)
+    store.append('a', 'user', 'a0')
+    store.append('b', 'user', 'b0')
+    store.append('a', 'user', 'a1')  # 'b' is now least recently used
+    store.append('c', 'user', 'c0')
+    assert store.stats()['sessions'] == 2
+    assert _contents(store, 'a') == ['a0', 'a1']
+    # 'b' was evicted and starts over (which in turn evicts 'c')
+    assert _contents(store, 'b') == []
+
+
+def test_sqlite_store_is_shared_across_instances(tmp_path):
+    db_path = str(tmp_path / 'conversations.sqlite3')
+    first = SQLiteConversationStore(db_path=db_path)
+    first.append('s1', 'user', 'hello')
+    first.append('s1', 'assistant', 'hi', data={'intent': 'GREETING'})
+    first.update_context('s1', {'destination': 'France'})
+
+    second = SQLiteConversationStore(db_path=db_path)
+    assert _contents(second, 's1') == ['hello', 'hi']
+    assert second.history('s1')[-1]['data'] == {'intent': 'GREETING'}
+    assert second.get('s1')['context'] == {'destination': 'France'}
+    second.append('s1', 'user', 'again')
+    assert _contents(first, 's1') == ['hello', 'hi', 'again']
+
+
+def test_sqlite_sweep_deletes_expired_sessions(tmp_path):
+    store = SQLiteConversationStore(db_path=str(tmp_path / 'conversations.sqlite3'), ttl_s=0.05)
+    store.append('old', 'user', 'hello')
+    time.sleep(0.1)
+    store.append('new', 'user', 'hello')
+    store.sweep()
+    assert store.stats()['sessions'] == 1
+    assert store._conn().execute("SELECT COUNT(*) FROM messages WHERE session_id = 'old'").fetchone()[0] == 0
@@ -0,0 +1,107 @@
+"""Conversation compaction tests: bounded, deterministic summaries and /chat recording (no server needed)."""
+import json
+
+import pytest
+
+import chat_agent
+from conversation_store import MemoryConversationStore
+from conversation_summary import fold, render_summary
+
+DESTINATIONS = ['Germany', 'China', 'France', 'Russia']
+
+
+def _turn(i):
+    """One user/assistant exchange; the ECCN and destination change every few turns."""
+    context = {'eccn': f'{i // 5 % 4 + 1}A00{i % 3}', 'destination': DESTINATIONS[i // 7 % 4], 'value': 1000 + i}
+    status = 'LICENSE_REQUIRED' if context['destination'] in ('China', 'Russia') else 'NLR'
+    return [
+        {'role': 'user', 'content': f'question {i} about {context["destination"]}'},
+        {'role': 'assistant', 'content': f'answer {i}',
+         'data': {'context': context, 'results': {'license_status': status, 'evaluation_id': f'EVAL-{i}'}}},
+    ]
+
+
+def _messages(turns):
+    return [m for i in range(turns) for m in _turn(i)]
+
+
+@pytest.fixture
+def chat_store(monkeypatch):
+    store = MemoryConversationStore()
+    monkeypatch.setattr(chat_agent, 'CONVERSATIONS', store)
+    monkeypatch.setattr(chat_agent, 'CONVERSATION_COMPACT_AFTER', 8)
+    monkeypatch.setattr(chat_agent, 'CONVERSATION_COMPACT_KEEP', 4)
+    return store
+
+
+def test_summary_stays_bounded_over_many_turns():
+    sizes = []
+    summary = None
+    for start in range(0, 1000, 10):
+        summary = fold(summary, [m for i in range(start, start + 10) for m in _turn(i)])
+        sizes.append(len(render_summary(summary)))
+    assert summary['turns'] == 1000 and summary['messages'] == 2000
+    assert len(summary['decisions']) <= 20 and len(summary['topics']) <= 8
+    assert all(len(values) <= 3 for values in summary['changes'].values())
+    # After the first few hundred turns the rendered block no longer grows
+    assert max(sizes) <= sizes[30] + 40
+
+
+def test_facts_are_capped_but_known_fields_keep_updating():
+    messages = [{'role': 'assistant', 'content': '', 'data': {'context': {f'field{n}': n for n in range(60)}}}]
+    summary = fold(None, messages)
+    assert len(summary['facts']) == 40
+    summary = fold(summary, [{'role': 'assistant', 'content': '', 'data': {'context': {'field0': 'new'}}}])
+    assert summary['facts']['field0'] == 'new' and summary['changes']['field0'] == [0]
+
+
+def test_fold_is_deterministic_and_chunking_does_not_matter():
+    messages = _messages(60)
+    whole = fold(None, messages)
+    chunked = None
+    for start in range(0, len(messages), 14):
+        chunked = fold(chunked, messages[start:start + 14])
+    assert whole == chunked
+    assert render_summary(whole) == render_summary(fold(None, messages))
+
+
+def test_summary_keeps_latest_facts_results_and_outcome_changes():
+    summary = fold(None, _messages(30))
+    last = _turn(29)[1]['data']
+    assert summary['facts'] == last['context']
+    assert summary['results'] == last['results']
+    # Every license outcome change is recorded with its turn and shipment
+    assert summary['decisions'][0] == 'turn 1: license_status NLR for eccn 1A000, destination Germany'
+    assert any(d.startswith('turn 8: license_status LICENSE_REQUIRED') for d in summary['decisions'])
+    assert summary['topics'][-1] == 'turn 30: ' + _turn(29)[0]['content']
+    assert render_summary(None) == ''
+
+
+def test_record_turn_compacts_without_losing_messages(chat_store):
+    for i in range(20):
+        user, assistant = _turn(i)
+        chat_agent.update_context('s1', assistant['data']['context'])
+        chat_agent.record_turn('s1', user['content'], assistant['content'],
+                               {'license_results': {'status': assistant['data']['results']['license_status']}})
+    summary = chat_store.get('s1')['meta']['summary']
+    history = chat_store.history('s1', limit=100)
+    assert len(history) <= 8
+    # Every message is either folded into the summary or still in the history
+    assert summary['messages'] + len(history) == 40
+    assert history[-1]['content'] == 'answer 19'
+    assert summary['facts']['eccn'] == _turn(summary['turns'] - 1)[1]['data']['context']['eccn']
+    prompt = chat_agent.build_chat_prompt('s1', 'what next?')
+    assert 'EARLIER IN THIS CONVERSATION' in prompt and 'answer 19' in prompt
+
+
+def test_chat_endpoint_records_every_turn(chat_store, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'model', None)
+    client = app_module.app.test_client()
+    for i in range(12):
+        response = client.post('/chat', json={'session_id': 's1', 'message': f'question {i}',
+                                              'context': {'eccn': '5A002', 'destination': DESTINATIONS[i % 4]}})
+        assert response.status_code == 200
+    summary = chat_store.get('s1')['meta']['summary']
+    assert summary['messages'] + len(chat_store.history('s1', limit=100)) == 24
+    assert summary['results']['license_status']
+    assert json.dumps(summary)  # stored summaries stay JSON-serialisable (SQLite store)
@@ -0,0 +1,110 @@
+"""SMTP pool tests against a local aiosmtpd server (skipped without aiosmtpd)."""
+import socket
+import threading
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+from email_service import EmailService, SMTPPool
+
+
+class CountingHandler:
+    """Records which SMTP session delivered each message."""
+
+    def __init__(self):
+        self.servers = []
+        self.delivered = []  # (session number, recipients)
+        self._lock = threading.Lock()
+
+    def _session_number(self, server):
+        with self._lock:
+            if server not in self.servers:
+                self.servers.append(server)
+            return self.servers.index(server)
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.append((self._session_number(server), list(envelope.rcpt_tos)))
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = CountingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    try:
+        yield controller, handler
+    finally:
+        controller.stop()
+
+
+def _service(controller, monkeypatch):
+    monkeypatch.setenv('EMAIL_PROVIDER', 'smtp')
+    monkeypatch.setenv('SMTP_HOST', controller.hostname)
+    monkeypatch.setenv('SMTP_PORT', str(controller.port))
+    monkeypatch.setenv('SMTP_SECURITY', 'none')
+    monkeypatch.setenv('FROM_EMAIL', 'compliance@example.com')
+    monkeypatch.delenv('SMTP_USER', raising=False)
+    return EmailService()
+
+
+def _mail(n):
+    return {'to_email': f'user{n}@example.com', 'subject': f'Report {n}', 'html_content': '<p>ok</p>'}
+
+
+def test_pool_reuses_session_across_sends(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    service = _service(controller, monkeypatch)
+    for n in range(3):
+        assert service.send_email(**_mail(n))['success']
+    service.pool.close()
+    assert [session for session, _ in handler.delivered] == [0, 0, 0]
+
+
+def test_send_batch_uses_one_session(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    service = _service(controller, monkeypatch)
+    results = service.send_batch([_mail(n) for n in range(5)])
+    service.pool.close()
+    assert all(r['success'] for r in results)
+    assert [rcpt for _, rcpt in handler.delivered] == [[f'user{n}@example.com'] for n in range(5)]
+    assert len(handler.servers) == 1
+
+
+def test_pool_reconnects_after_server_drops(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    service = _service(controller, monkeypatch)
+    assert service.send_email(**_mail(0))['success']
+
+    # Server side hangs up the idle pooled session
+    dropped = handler.servers[0]
+    controller.loop.call_soon_threadsafe(dropped.transport.close)
+    deadline = time.time() + 5
+    while dropped.transport is not None and not dropped.transport.is_closing() and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert service.send_email(**_mail(1))['success']
+    service.pool.close()
+    assert [session for session, _ in handler.delivered] == [0, 1]
+
+
+def test_stale_idle_session_is_checked_with_noop(smtp_server):
+    controller, handler = smtp_server
+    pool = SMTPPool(controller.hostname, controller.port, security='none', idle_check_s=0)
+    message = MIMEText('ok')
+    message['From'], message['To'], message['Subject'] = 'compliance@example.com', 'user@example.com', 'Report'
+    assert pool.send_messages([message]) == [None]
+    controller.loop.call_soon_threadsafe(handler.servers[0].transport.close)
+    time.sleep(0.1)
+    assert pool.send_messages([message]) == [None]
+    pool.close()
+    assert len(handler.servers) == 2
@@ -0,0 +1,39 @@
+"""Evaluation store failure handling in /evaluate and /report."""
+import sqlite3
+
+import pytest
+
+SHIPMENT = {"eccn": "5A002", "destination": "Germany", "value": 1000}
+
+
+@pytest.fixture
+def app(app_module):
+    return app_module
+
+
+@pytest.fixture
+def broken_store(monkeypatch, app):
+    def save(input_data, result):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(app.EVALUATION_STORE, 'save', save)
+
+
+def test_evaluate_stores_result(app):
+    body = app.app.test_client().post('/evaluate', json=SHIPMENT).get_json()
+    assert body['evaluation_id'].startswith('EVAL-')
+    assert app.EVALUATION_STORE.get(body['evaluation_id'])['input'] == SHIPMENT
+
+
+def test_evaluate_serves_result_when_store_fails(app, broken_store):
+    response = app.app.test_client().post('/evaluate', json=SHIPMENT)
+    body = response.get_json()
+    assert response.status_code == 200
+    assert 'evaluation_id' not in body
+    assert body['license_results']['status'] and body['insight_id']
+    assert app.app.test_client().get(f"/insights/{body['insight_id']}").status_code == 200
+
+
+def test_report_renders_when_store_fails(app, broken_store):
+    response = app.app.test_client().post('/report', json={**SHIPMENT, 'format': 'json'})
+    assert response.status_code == 200
+    assert response.get_json()['evaluation_id'] is None
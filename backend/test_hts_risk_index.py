@@ -0,0 +1,65 @@
+"""HTS risk trie and HTS-based forced labour screening tests."""
+import pytest
+
+from forced_labour_screening import screen_forced_labour
+from hts_risk_index import HtsRiskTrie, lookup_hts_risk, lookup_hts_risk_batch, normalize_hts
+
+
+def test_longest_prefix_wins():
+    trie = HtsRiskTrie()
+    trie.insert('52', {'sector': 'COTTON', 'risk': 'MEDIUM'})
+    trie.insert('5201', {'sector': 'COTTON', 'risk': 'HIGH'})
+    assert trie.longest_match('5201.00.1000')['prefix'] == '5201'
+    assert trie.longest_match('5209.11')['prefix'] == '52'
+    assert trie.longest_match('5') is None
+    assert trie.longest_match('8471.30') is None
+    assert len(trie) == 2
+
+
+def test_insert_rejects_non_numeric_prefix():
+    with pytest.raises(ValueError):
+        HtsRiskTrie().insert('n/a', {})
+
+
+def test_normalize_hts_strips_formatting():
+    assert normalize_hts('8541.43-00 10') == '8541430010'
+    assert normalize_hts(None) == ''
+
+
+def test_shared_index_resolves_subheadings():
+    assert lookup_hts_risk('8541.43.0010')['sector'] == 'SOLAR'
+    assert lookup_hts_risk('2804.61.0000')['sector'] == 'POLYSILICON'
+    # Heading 2804 also covers hydrogen and rare gases: only the silicon lines are listed
+    assert lookup_hts_risk('2804.10.0000') is None
+
+
+def test_hydrogen_is_not_screened_as_silica():
+    result = screen_forced_labour('Acme', 'hydrogen gas', 'China', '', '2804.10.0000')
+    assert result['risk_level'] == 'CLEAR'
+
+
+def test_high_risk_hts_from_china():
+    result = screen_forced_labour('Acme', 'modules', 'China', '', '8541.43.0010')
+    assert result['risk_level'] == 'HIGH_RISK'
+    assert result['matches']['hts'] == '854143'
+
+
+def test_medium_risk_hts_from_china_only_warns():
+    result = screen_forced_labour('Acme', 'frozen fish', 'China', '', '0304.71.1000')
+    assert result['risk_level'] == 'WARNING'
+    assert 'medium-risk' in result['reasons'][0]
+
+
+def test_hts_match_with_xuar_region_is_seizure_likely():
+    result = screen_forced_labour('Acme', 'yarn', 'China', 'Aksu', '5205.11')
+    assert result['risk_level'] == 'SEIZURE_LIKELY'
+
+
+def test_batch_lookup_matches_per_row_screening():
+    codes = ['8541.43.0010', '0304.71.1000', '2804.10.0000', '']
+    entries = lookup_hts_risk_batch(codes)
+    assert [e['hts_code'] for e in entries] == codes
+    assert [e['match'] and e['match']['sector'] for e in entries] == ['SOLAR', 'SEAFOOD', None, None]
+    for code, entry in zip(codes, entries):
+        assert (screen_forced_labour('Acme', 'goods', 'China', '', code, hts_entry=entry)
+                == screen_forced_labour('Acme', 'goods', 'China', '', code))
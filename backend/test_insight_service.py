@@ -0,0 +1,117 @@
+"""Deferred insight tests: hedged deadline, load shedding, stored-evaluation fallback (no server needed)."""
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from evaluation_store import EvaluationStore
+from insight_service import InsightService, insight_id_for
+
+LICENSE = {'status': 'LICENSE_REQUIRED', 'results': [
+    {'type': 'LICENSE_REQUIRED', 'code': 'NS1', 'title': 'National Security', 'justification': 'NS1 applies to China.'}]}
+UFLPA = {'risk_level': 'CLEAR', 'reasons': [], 'action': ''}
+
+
+class SlowModel:
+    """Fake Gemini model whose answers are held until released."""
+    model_name = 'slow-fake-model'
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        self.release.wait(5)
+        return SimpleNamespace(text='LLM insight', usage_metadata=None)
+
+
+def _shipment():
+    # Unique supplier per call so the shared LLM response cache never answers for the model
+    return {'eccn': '5A002', 'destination': 'China', 'supplier': f'Supplier {uuid.uuid4().hex}', 'commodity': 'routers'}
+
+
+def _counter(name):
+    return metrics.snapshot()['counters'].get(name, 0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EvaluationStore(db_path=str(tmp_path / 'evaluations.sqlite3'))
+
+
+def test_template_settles_at_deadline_and_late_answer_is_ignored(store):
+    model = SlowModel()
+    service = InsightService(model, store=store, deadline_s=0.05)
+    evaluation_id = store.save({}, {'insight_status': 'pending'})
+    late_before = _counter('insight.late_llm')
+
+    insight_id = service.submit(evaluation_id, _shipment(), LICENSE, UFLPA)
+    assert service.get(insight_id)['status'] == 'pending'
+    state = service.wait(insight_id)
+    assert state['status'] == 'ready' and state['source'] == 'template'
+    assert state['ai_insight'].startswith('License View: ECCN 5A002 to China evaluates as LICENSE_REQUIRED.')
+
+    model.release.set()
+    service._pool.shutdown(wait=True)
+    assert model.calls == 1
+    assert _counter('insight.late_llm') == late_before + 1
+    # Neither the in-memory state nor the stored evaluation is overwritten by the late answer
+    assert service.get(insight_id)['ai_insight'] == state['ai_insight']
+    stored = store.get(evaluation_id)['result']
+    assert stored['insight_source'] == 'template' and stored['ai_insight'] == state['ai_insight']
+
+
+def test_llm_answer_before_deadline_wins():
+    model = SlowModel()
+    model.release.set()
+    service = InsightService(model, deadline_s=5)
+    state = service.wait(service.submit(None, _shipment(), LICENSE, UFLPA))
+    assert state['source'] == 'llm' and state['ai_insight'] == 'LLM insight'
+
+
+def test_backlog_over_max_pending_is_shed_to_template():
+    model = SlowModel()
+    service = InsightService(model, deadline_s=5, max_pending=1)
+    shed_before = _counter('insight.shed')
+    queued = service.submit(None, _shipment(), LICENSE, UFLPA)
+    shed = service.submit(None, _shipment(), LICENSE, UFLPA)
+
+    state = service.get(shed)
+    assert state['status'] == 'ready' and state['source'] == 'template'
+    assert _counter('insight.shed') == shed_before + 1
+    assert service.get(queued)['status'] == 'pending'
+
+    model.release.set()
+    assert service.wait(queued)['source'] == 'llm'
+    assert model.calls == 1
+    # The backlog drained, so new insights queue for the model again
+    assert service.wait(service.submit(None, _shipment(), LICENSE, UFLPA))['source'] == 'llm'
+    assert model.calls == 2
+
+
+def test_insight_endpoint_falls_back_to_stored_evaluation(app_module, monkeypatch):
+    client = app_module.app.test_client()
+    store = app_module.EVALUATION_STORE
+    result = {'license_results': LICENSE, 'uflpa_results': UFLPA, 'ai_insight': None, 'insight_status': 'pending'}
+
+    # Settled by another worker: served from the stored result
+    settled = store.save(_shipment(), result)
+    store.set_insight(settled, 'Stored insight', 'llm')
+    body = client.get(f'/insights/{insight_id_for(settled)}').get_json()
+    assert body['status'] == 'ready' and body['source'] == 'llm' and body['ai_insight'] == 'Stored insight'
+
+    # Still within another worker's deadline: pending
+    monkeypatch.setattr(app_module.INSIGHTS, 'deadline_s', 60)
+    pending = store.save(_shipment(), result)
+    assert client.get(f'/insights/{insight_id_for(pending)}').get_json()['status'] == 'pending'
+
+    # Past the deadline with no worker holding it: settled here with the template and stored
+    monkeypatch.setattr(app_module.INSIGHTS, 'deadline_s', 0)
+    body = client.get(f'/insights/{insight_id_for(pending)}').get_json()
+    assert body['status'] == 'ready' and body['source'] == 'template'
+    assert store.get(pending)['result']['ai_insight'] == body['ai_insight']
+
+    assert client.get('/insights/INS-UNKNOWN').status_code == 404
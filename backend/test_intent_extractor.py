@@ -0,0 +1,35 @@
+"""Fast-path intent extractor tests (no LLM)."""
+from intent_extractor import FAST_PATH_MIN_CONFIDENCE, extract
+
+
+def test_plain_shipment_data_is_parsed_exactly():
+    result = extract("ECCN 5A002 to France, value $5000, end user is Thales for radar")
+    assert result['intent'] == 'license_check' and result['confidence'] == 1.0
+    assert result['shipment_updates'] == {'eccn': '5A002', 'destination': 'France', 'value': 5000.0,
+                                          'end_user_name': 'Thales', 'end_use': 'radar'}
+    assert 'end_use' not in result['missing_fields']
+
+
+def test_end_use_phrase_does_not_swallow_countries_or_filler():
+    result = extract("check license for France ECCN 3A001")
+    assert result['shipment_updates'] == {'eccn': '3A001', 'destination': 'France'}
+    assert 'end_use' not in extract("ECCN 3A001 to China for me")['shipment_updates']
+
+
+def test_a_single_unexplained_word_leaves_the_turn_to_the_llm():
+    result = extract("ECCN 5A002 to France, urgently")
+    assert result['shipment_updates'] == {'eccn': '5A002', 'destination': 'France'}
+    assert result['confidence'] < FAST_PATH_MIN_CONFIDENCE
+
+
+def test_questions_are_not_fast_pathed():
+    assert extract("What does ECCN 5A002 control?")['confidence'] == 0.0
+
+
+def test_a_second_country_leaves_the_turn_to_the_llm():
+    for message in ("ECCN 5A002 to China and Russia", "ECCN 5A002 to US for Jordan"):
+        result = extract(message)
+        assert result['confidence'] < FAST_PATH_MIN_CONFIDENCE, message
+        assert 'end_use' not in result['shipment_updates']
+    # Origin and destination are two fields, not a conflict
+    assert extract("ECCN 3A001 from Germany to France")['confidence'] == 1.0
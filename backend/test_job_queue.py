@@ -0,0 +1,76 @@
+"""Background job queue tests: retries, permanent failures, restart recovery (no server needed)."""
+import sqlite3
+import threading
+import time
+
+from job_queue import FAILED, SUCCEEDED, JobQueue, PermanentJobError
+
+
+def _wait_for(queue, job_id, status, timeout_s=5):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job and job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{job_id} never reached {status}: {queue.get(job_id)}")
+
+
+def test_retries_with_backoff_then_succeeds():
+    queue = JobQueue(workers=1, db_path='', backoff_base_s=0.01)
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise RuntimeError("smtp down")
+        return {"sent": payload["to"]}
+
+    queue.register('send', flaky)
+    job = _wait_for(queue, queue.enqueue('send', {"to": "a@example.com"}), SUCCEEDED)
+    assert job['attempts'] == 3 and job['result'] == {"sent": "a@example.com"}
+
+
+def test_permanent_error_is_not_retried():
+    queue = JobQueue(workers=1, db_path='', backoff_base_s=0.01)
+    calls = []
+
+    def not_configured(payload):
+        calls.append(payload)
+        raise PermanentJobError("email not configured")
+
+    queue.register('send', not_configured)
+    job = _wait_for(queue, queue.enqueue('send', {}), FAILED)
+    assert len(calls) == 1 and job['error'] == "email not configured"
+
+
+def test_start_recovers_jobs_left_in_the_db(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    JobQueue(db_path=db_path)  # creates the schema
+    now = time.time()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("INSERT INTO jobs (id, kind, payload, status, attempts, run_at, created_at, updated_at)"
+                 " VALUES ('JOB-QUEUED', 'send', '{\"n\": 1}', 'queued', 0, ?, ?, ?)", (now, now, now))
+    # Left 'running' by a process that died more than a lease ago
+    conn.execute("INSERT INTO jobs (id, kind, payload, status, attempts, run_at, created_at, updated_at)"
+                 " VALUES ('JOB-STALE', 'send', '{\"n\": 2}', 'running', 1, ?, ?, ?)",
+                 (now - 600, now - 600, now - 600))
+
+    done = []
+    finished = threading.Event()
+
+    def handler(payload):
+        done.append(payload['n'])
+        if len(done) == 2:
+            finished.set()
+
+    queue = JobQueue(workers=1, db_path=db_path, lease_s=60)
+    queue.register('send', handler)
+    queue.start()  # no new enqueue needed
+    assert finished.wait(5)
+    assert sorted(done) == [1, 2]
+
+    # Another worker process answers status lookups from the shared DB
+    other = JobQueue(db_path=db_path)
+    assert _wait_for(other, 'JOB-QUEUED', SUCCEEDED)['attempts'] == 1
+    assert _wait_for(other, 'JOB-STALE', SUCCEEDED)['attempts'] == 2
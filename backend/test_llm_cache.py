@@ -0,0 +1,71 @@
+"""LLM response cache tests: LRU/TTL memory tier, SQLite tier, key separation (no server needed)."""
+import threading
+import time
+from types import SimpleNamespace
+
+from llm_cache import LLMCache, make_key
+from llm_client import generate_text
+
+
+class CountingModel:
+    """Fake Gemini model that counts generate_content calls."""
+    model_name = 'fake-model'
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self._lock:
+            self.calls += 1
+        return SimpleNamespace(text=f'answer to {prompt}', usage_metadata=None)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = LLMCache(max_entries=2, db_path='')
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'  # 'b' is now least recently used
+    cache.set('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
+
+
+def test_memory_entries_expire():
+    cache = LLMCache(ttl_s=0.05, db_path='')
+    cache.set('a', 'A')
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_sqlite_tier_serves_memory_misses(tmp_path):
+    db_path = str(tmp_path / 'llm_cache.sqlite3')
+    first = LLMCache(max_entries=1, db_path=db_path)
+    first.set('a', 'A')
+    first.set('b', 'B')  # 'a' evicted from memory, still on disk
+    assert first.get('a') == 'A'
+
+    # Another worker on the same host: empty memory tier, shared file
+    second = LLMCache(db_path=db_path)
+    assert second.get('b') == 'B'
+    assert 'b' in second._mem  # promoted to memory on the disk hit
+
+
+def test_key_separates_model_and_generation_config():
+    prompt = 'Classify  this\n  message'
+    key = make_key(prompt, 'm1', {'temperature': 0})
+    # Whitespace-only differences share a key
+    assert key == make_key('Classify this message', 'm1', {'temperature': 0})
+    assert key != make_key(prompt, 'm2', {'temperature': 0})
+    assert key != make_key(prompt, 'm1', {'temperature': 0.7})
+    assert key != make_key(prompt, 'm1')
+
+
+def test_generate_text_calls_the_model_once_per_key():
+    cache = LLMCache(db_path='')
+    model = CountingModel()
+    assert generate_text(model, 'hello', cache=cache) == 'answer to hello'
+    assert generate_text(model, ' hello ', cache=cache) == 'answer to hello'
+    assert model.calls == 1
+    generate_text(model, 'hello', generation_config={'temperature': 0.2}, cache=cache)
+    assert model.calls == 2
@@ -0,0 +1,95 @@
+"""Single-flight tests: concurrent identical LLM calls share one model call (no server needed)."""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+import metrics
+from llm_client import generate_text
+
+
+class BlockingModel:
+    """Fake Gemini model that counts calls and holds each one until released."""
+    model_name = 'fake-model'
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.error = error
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(text=f'answer to {prompt}', usage_metadata=None)
+
+
+def _coalesced():
+    return metrics.snapshot()['counters'].get('llm.coalesced', 0)
+
+
+def _run_concurrently(model, prompt, waiters):
+    """Start a leader and `waiters` identical calls, release the model once all have joined."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(generate_text(model, prompt, cache=None))
+        except Exception as e:
+            errors.append(e)
+
+    before = _coalesced()
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    assert model.entered.wait(5)
+    threads += [threading.Thread(target=call) for _ in range(waiters)]
+    for t in threads[1:]:
+        t.start()
+    deadline = time.time() + 5
+    while _coalesced() - before < waiters and time.time() < deadline:
+        time.sleep(0.005)
+    model.release.set()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_identical_calls_make_one_model_call():
+    model = BlockingModel()
+    results, errors = _run_concurrently(model, 'same prompt', waiters=7)
+    assert errors == []
+    assert results == ['answer to same prompt'] * 8
+    assert model.calls == 1
+    assert llm_client._inflight == {}
+
+
+def test_leader_error_reaches_every_waiter():
+    model = BlockingModel(error=RuntimeError('quota exceeded'))
+    results, errors = _run_concurrently(model, 'failing prompt', waiters=3)
+    assert results == []
+    assert len(errors) == 4 and all(str(e) == 'quota exceeded' for e in errors)
+    assert model.calls == 1
+    # The failed call is not left in flight: the next caller tries again
+    model.error = None
+    assert generate_text(model, 'failing prompt', cache=None) == 'answer to failing prompt'
+    assert model.calls == 2
+
+
+def test_waiter_gives_up_after_the_singleflight_timeout(monkeypatch):
+    monkeypatch.setattr(llm_client, 'LLM_SINGLEFLIGHT_WAIT_S', 0.05)
+    model = BlockingModel()
+    leader = threading.Thread(target=generate_text, args=(model, 'slow prompt'), kwargs={'cache': None})
+    leader.start()
+    assert model.entered.wait(5)
+    try:
+        with pytest.raises(TimeoutError):
+            generate_text(model, 'slow prompt', cache=None)
+    finally:
+        model.release.set()
+        leader.join(5)
+    assert model.calls == 1
@@ -0,0 +1,65 @@
+"""LLM gateway + fake client recovery tests against the in-process fake server (no network)."""
+import socket
+
+import pytest
+
+from fake_llm_server import FakeModel, FakeUpstreamError, start_server
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+
+
+@pytest.fixture
+def slow_server():
+    server, url = start_server(latency_ms=300)
+    yield url
+    server.shutdown()
+
+
+@pytest.fixture
+def failing_server():
+    server, url = start_server(error_rate=1.0)
+    yield url
+    server.shutdown()
+
+
+def test_client_recovers_after_read_timeout(slow_server):
+    model = FakeModel(slow_server)
+    with pytest.raises(TimeoutError):
+        model.generate_content("first", request_options={"timeout": 0.05})
+    # Same thread, same FakeModel: the half-used connection must not be reused
+    assert model.generate_content("second", request_options={"timeout": 5}).text.startswith("[fake-llm]")
+
+
+def test_client_reconnects_after_server_closes_connection(slow_server):
+    model = FakeModel(slow_server)
+    model.generate_content("warm", request_options={"timeout": 5})
+    model._local.conn.sock.shutdown(socket.SHUT_RDWR)  # keep-alive connection dropped
+    assert model.generate_content("again", request_options={"timeout": 5}).text
+
+
+def test_gateway_retries_timeout_then_succeeds(slow_server):
+    model = FakeModel(slow_server)
+    gateway = LLMGateway(model, timeout_s=5, max_retries=2, backoff_base_s=0.01)
+    calls = []
+    original = model.generate_content
+
+    def first_call_times_out(prompt, **kwargs):
+        calls.append(prompt)
+        if len(calls) == 1:
+            kwargs['request_options'] = {"timeout": 0.05}
+        return original(prompt, **kwargs)
+
+    model.generate_content = first_call_times_out
+    gateway._accepts_request_options = True
+    assert gateway.generate_content("hello").text
+    assert len(calls) == 2
+
+
+def test_gateway_opens_breaker_on_upstream_errors(failing_server):
+    breaker = CircuitBreaker(threshold=2, reset_s=60)
+    gateway = LLMGateway(FakeModel(failing_server), timeout_s=5, max_retries=5, backoff_base_s=0.001,
+                         breaker=breaker)
+    with pytest.raises(FakeUpstreamError):
+        gateway.generate_content("hello")
+    assert breaker.state == 'open'
+    with pytest.raises(LLMUnavailableError):
+        gateway.generate_content("hello")
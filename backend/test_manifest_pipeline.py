@@ -0,0 +1,62 @@
+"""Streaming manifest screening tests on small temporary manifests (no server needed)."""
+import csv
+import json
+
+import pytest
+
+from manifest_pipeline import ANNOTATION_COLUMNS, screen_manifest
+
+ROWS = [
+    ('Hoshine Silicon', 'polysilicon', '2804.61.0000', 'China', ''),
+    ('Acme Textiles', 'cotton yarn', '5205.11', 'Vietnam', ''),
+    ('Bosch GmbH', 'widgets', '8471.30', 'Germany', ''),
+    ('Huawei Technologies', 'routers', '8517.62', 'China', ''),
+    ('Kashgar Weaving', 'fabric', '', 'China', 'Kashgar, Xinjiang'),
+]
+
+
+def _write_manifest(path, header=('Seller', 'Commodity Description', 'HTS Number', 'COO', 'Supplier Address'),
+                    rows=ROWS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_csv_output_is_annotated_in_batches(tmp_path):
+    manifest = _write_manifest(tmp_path / 'entries.csv')
+    output = str(tmp_path / 'screened.csv')
+    progress = []
+    stats = screen_manifest(manifest, output, batch_size=2, progress=lambda s: progress.append(dict(s)))
+
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    # Input columns pass through unchanged, annotations appended
+    assert list(rows[0]) == ['Seller', 'Commodity Description', 'HTS Number', 'COO', 'Supplier Address'] + ANNOTATION_COLUMNS
+    assert [r['Seller'] for r in rows] == [r[0] for r in ROWS]
+    assert [r['uflpa_risk_level'] for r in rows] == ['SEIZURE_LIKELY', 'WARNING', 'CLEAR', 'CLEAR', 'HIGH_RISK']
+    assert 'HTS 280461 (POLYSILICON)' in rows[0]['uflpa_reasons']
+    assert rows[3]['dps_status'] == 'BLOCKED' and rows[3]['dps_match'] == 'HUAWEI'
+    assert rows[2]['dps_status'] == 'CLEAR' and rows[2]['dps_match'] == ''
+
+    # 5 rows in batches of 2: progress after each of the 3 flushes
+    assert [p['rows'] for p in progress] == [2, 4, 5]
+    assert stats['rows'] == 5 and stats['flagged'] == 4
+
+
+def test_ndjson_output(tmp_path):
+    manifest = _write_manifest(tmp_path / 'entries.csv')
+    output = str(tmp_path / 'screened.ndjson')
+    screen_manifest(manifest, output, batch_size=10)
+    with open(output, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 5
+    assert rows[1]['Seller'] == 'Acme Textiles' and rows[1]['uflpa_risk_level'] == 'WARNING'
+
+
+def test_manifest_without_screenable_columns_is_rejected(tmp_path):
+    manifest = _write_manifest(tmp_path / 'entries.csv', header=('Entry', 'Port', 'Date'),
+                               rows=[('1', 'LAX', '2026-01-01')])
+    with pytest.raises(ValueError, match='no supplier/commodity/HTS column'):
+        screen_manifest(manifest, str(tmp_path / 'out.csv'))
@@ -0,0 +1,59 @@
+"""Regression tests for multi-tier supply chain screening (no server needed)."""
+from supply_chain_graph import SupplyChainGraph, screen_supply_chain
+
+
+def _cycle_graph():
+    graph = SupplyChainGraph()
+    graph.add_edge('A', 'B', 'wafers')
+    graph.add_edge('B', 'C', 'ingots')
+    graph.add_edge('C', 'A', 'scrap')
+    graph.add_edge('A', 'Hoshine Silicon', 'polysilicon')
+    return graph
+
+
+def test_cycle_member_flagged_after_screening_another_member():
+    graph = _cycle_graph()
+    assert screen_supply_chain(graph, 'A')['risk_level'] == 'SEIZURE_LIKELY'
+    result = screen_supply_chain(graph, 'C')
+    assert result['risk_level'] == 'SEIZURE_LIKELY'
+    assert [hop['supplier'] for hop in result['paths'][0]['path']] == ['A', 'HOSHINE SILICON']
+
+
+def test_cycle_results_do_not_depend_on_screening_order():
+    fresh = {root: screen_supply_chain(_cycle_graph(), root) for root in 'ABC'}
+    graph = _cycle_graph()
+    for root in 'CBA':
+        assert screen_supply_chain(graph, root) == fresh[root]
+
+
+def test_clean_cycle_is_clear():
+    graph = SupplyChainGraph()
+    graph.add_edge('A', 'B')
+    graph.add_edge('B', 'A')
+    graph.add_edge('B', 'B')
+    assert screen_supply_chain(graph, 'A')['risk_level'] == 'CLEAR'
+
+
+def test_deep_chain_and_path_cap():
+    graph = SupplyChainGraph(max_paths=2)
+    for i in range(5000):
+        graph.add_edge(f'N{i}', f'N{i + 1}')
+    for i in range(4):
+        graph.add_edge('N5000', f'Hoshine Silicon {i}')
+    result = screen_supply_chain(graph, 'N0')
+    assert result['risk_level'] == 'SEIZURE_LIKELY'
+    assert len(result['paths']) == 2
+    assert result['paths'][0]['tiers'] == 5001
+
+
+def test_memoized_paths_share_their_tails():
+    graph = SupplyChainGraph()
+    for i in range(20000):
+        graph.add_edge(f'N{i}', f'N{i + 1}')
+    graph.add_edge('N20000', 'Hoshine Silicon')
+    result = screen_supply_chain(graph, 'N0')
+    assert result['paths'][0]['tiers'] == 20001
+    # Each tier adds one hop onto its supplier's path instead of copying it
+    link = graph._memo['N0'][0][0]
+    assert link[1] is graph._memo['N1'][0][0]
+    assert screen_supply_chain(graph, 'N19999')['paths'][0]['path'][-1]['supplier'] == 'HOSHINE SILICON'
@@ -0,0 +1,76 @@
+"""XUAR gazetteer matching tests."""
+import json
+import os
+
+from forced_labour_screening import screen_forced_labour
+from xuar_gazetteer import MultiPatternMatcher, find_xuar_places, normalize_text
+
+
+def _names(*texts):
+    return sorted(p['name'] for p in find_xuar_places(*texts))
+
+
+def test_official_pinyin_matches_prefecture():
+    assert _names("No. 8 Renmin Rd, Kashi, China") == ['Kashgar']
+    assert _names("Yili Kazakh Autonomous Prefecture") == ['Ili']
+    assert _names("Wulumuqi") == ['Urumqi']
+
+
+def test_latin_variants_need_word_boundaries():
+    assert _names("Kashiwa, Chiba, Japan") == []
+    assert _names("Bay Area logistics", "Lop Buri, Thailand") == []
+    assert _names("BAY COUNTY, Aksu") == ['Aksu', 'Bay']
+
+
+def test_ambiguous_latin_names_need_china_context():
+    assert _names("Aksu, Antalya", "Turkey") == []
+    assert _names("Khorgos, Almaty Region, Kazakhstan") == []
+    assert _names("Aksu", "China") == ['Aksu']
+    assert _names("Aksu Industrial Park, Xinjiang") == ['Aksu', 'Xinjiang Uyghur Autonomous Region']
+    assert _names("Korla", "PRC") == ['Korla']
+
+
+def test_non_china_origin_with_ambiguous_name_is_not_a_region_match():
+    result = screen_forced_labour('Acme', 'widgets', 'Turkey', 'Aksu, Antalya')
+    assert result['risk_level'] == 'CLEAR'
+    result = screen_forced_labour('Acme', 'widgets', 'China', 'Aksu')
+    assert result['matches']['region']
+
+
+def test_homonyms_elsewhere_in_china_taiwan_and_japan_need_xuar_context():
+    assert _names("台中市北屯區") == []
+    assert _names("广州市番禺区沙湾镇") == []
+    assert _names("Wada Seisakusho, 和田町, Japan") == []
+    assert _names("Yutian County, Tangshan, Hebei, China") == []
+    assert _names("Shawan District, Leshan, Sichuan, China") == []
+    assert _names("新疆沙湾县") == ['Shawan', 'Xinjiang Uyghur Autonomous Region']
+    assert _names("和田地区", "Urumqi") == ['Hotan', 'Urumqi']
+
+
+def test_taiwan_address_with_homonym_is_not_a_region_match():
+    result = screen_forced_labour('Acme', 'widgets', 'Taiwan', '', None, '台中市北屯區')
+    assert result['risk_level'] == 'CLEAR'
+
+
+def test_diacritics_separators_and_chinese_script():
+    assert normalize_text("Ürümqi-city") == "URUMQI CITY"
+    assert _names("Ürümqi-city") == ['Urumqi']
+    assert _names("中国新疆喀什地区") == ['Kashgar', 'Xinjiang Uyghur Autonomous Region']
+
+
+def test_matcher_reports_overlapping_patterns():
+    matcher = MultiPatternMatcher()
+    for pattern in ("HE", "SHE", "HERS"):
+        matcher.add(pattern, pattern)
+    assert sorted((s, e, p) for s, e, p, _ in matcher.finditer("USHERS")) == [
+        (1, 4, 'SHE'), (2, 4, 'HE'), (2, 6, 'HERS')]
+
+
+def test_every_prefecture_lists_a_pinyin_and_a_chinese_variant():
+    with open(os.path.join(os.path.dirname(__file__), 'data', 'xuar_gazetteer.json'), encoding='utf-8') as f:
+        places = json.load(f)['places']
+    for place in places:
+        if place['level'] != 'prefecture':
+            continue
+        assert any(v.isascii() for v in place['variants']), place['name']
+        assert any(not v.isascii() for v in place['variants']), place['name']
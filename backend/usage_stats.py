@@ -0,0 +1,159 @@
+"""
+Usage Stats
+-----------
+Incrementally maintained usage counters for dashboards and /stats.
+
+Every audit event maps to a handful of "dimension:value" keys
+(event_type, status, destination, ECCN, risk). The audit writer adds each
+batch's counts to per-minute, per-hour and per-day buckets plus all-time
+totals in the audit index database, in the same transaction as the index
+rows. Counts therefore survive restarts, are shared by all workers and
+never need a scan of the log. A /stats query reads O(buckets x keys)
+rows.
+"""
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Bucket width (seconds) and how long buckets are kept
+GRANULARITIES = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+USAGE_RETENTION_S = {
+    'minute': float(os.getenv('USAGE_MINUTE_RETENTION_H', '48')) * 3600,
+    'hour': float(os.getenv('USAGE_HOUR_RETENTION_D', '90')) * 86400,
+    'day': float(os.getenv('USAGE_DAY_RETENTION_D', '1825')) * 86400,
+}
+_TOTALS = 'all'
+
+# Retention sweep runs every N commits
+_SWEEP_EVERY = 1000
+
+# Dashboard tiles (useUsageStats) -> 'dimension:value' keys that count towards them
+# (an evaluation_batch event counts its rows, not itself)
+USAGE_TILES = {
+    'licenseChecks': ('event_type:evaluation', 'rows:evaluation_batch'),
+    'entityScreening': ('event_type:DPS_SCREEN',),
+    'forcedLabor': ('event_type:UFLPA_SCREEN', 'event_type:SUPPLY_CHAIN_SCREEN'),
+    'docs': ('event_type:email_send',),
+}
+
+
+def usage_keys(event):
+    """Counter of 'dimension:value' -> count for one audit event."""
+    keys = Counter()
+    event_type = event.get('event_type')
+    keys[f"event_type:{event_type}"] += 1
+    data = event.get('input_data') or {}
+    if not isinstance(data, dict):
+        return keys
+
+    if event_type == 'evaluation_batch':
+        # One event summarises many rows
+        keys["rows:evaluation_batch"] += int(data.get('rows') or 0)
+        for status, n in (data.get('license_status') or {}).items():
+            keys[f"status:{status}"] += n
+        for risk, n in (data.get('uflpa_risk') or {}).items():
+            keys[f"risk:{risk}"] += n
+        return keys
+
+    status = data.get('license_status') or data.get('result')
+    if status is None and 'success' in data:
+        status = 'SENT' if data['success'] else 'FAILED'
+    if isinstance(status, str) and status:
+        keys[f"status:{status}"] += 1
+    risk = data.get('risk_factors') or data.get('risk')
+    if isinstance(risk, str) and risk:
+        keys[f"risk:{risk}"] += 1
+    if data.get('destination'):
+        keys[f"destination:{str(data['destination']).strip()}"] += 1
+    if data.get('eccn'):
+        keys[f"eccn:{str(data['eccn']).strip().upper()}"] += 1
+    return keys
+
+
+class UsageRollups:
+    """Rollup table helpers; the caller owns the connection and the transaction."""
+
+    def __init__(self):
+        self._commits = 0
+
+    @staticmethod
+    def create(conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage_rollups ("
+            " granularity TEXT NOT NULL, bucket INTEGER NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (granularity, bucket, key)) WITHOUT ROWID"
+        )
+
+    def apply(self, conn, entries):
+        """entries: [(ts, Counter of keys)]. Adds them to every granularity and the totals."""
+        now = time.time()
+        cutoffs = {g: now - USAGE_RETENTION_S[g] for g in GRANULARITIES}
+        deltas = Counter()
+        for ts, keys in entries:
+            for granularity, width in GRANULARITIES.items():
+                if ts < cutoffs[granularity]:
+                    continue  # already past retention (reindex of old segments)
+                bucket = int(ts // width * width)
+                for key, n in keys.items():
+                    deltas[(granularity, bucket, key)] += n
+            for key, n in keys.items():
+                deltas[(_TOTALS, 0, key)] += n
+        conn.executemany(
+            "INSERT INTO usage_rollups (granularity, bucket, key, count) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (granularity, bucket, key) DO UPDATE SET count = count + excluded.count",
+            [(*k, n) for k, n in deltas.items() if n]
+        )
+        self._commits += 1
+        if self._commits % _SWEEP_EVERY == 0:
+            for granularity, cutoff in cutoffs.items():
+                conn.execute("DELETE FROM usage_rollups WHERE granularity = ? AND bucket < ?",
+                             (granularity, int(cutoff)))
+
+    @staticmethod
+    def query(conn, granularity='hour', since=None, until=None):
+        """
+        { totals, usage, granularity, series: [{ bucket, counts }] } where totals/counts
+        are { dimension: { value: count } }. Without `since`, the last 24 buckets.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        width = GRANULARITIES[granularity]
+        until = time.time() if until is None else until
+        since = until - 24 * width if since is None else since
+
+        totals = {}
+        for key, count in conn.execute(
+            "SELECT key, count FROM usage_rollups WHERE granularity = ? AND bucket = 0", (_TOTALS,)
+        ):
+            _nest(totals, key, count)
+
+        series = {}
+        for bucket, key, count in conn.execute(
+            "SELECT bucket, key, count FROM usage_rollups WHERE granularity = ? AND bucket >= ? AND bucket < ?"
+            " ORDER BY bucket", (granularity, int(since // width * width), int(until))
+        ):
+            _nest(series.setdefault(bucket, {}), key, count)
+
+        def total(key):
+            dimension, _, value = key.partition(':')
+            return totals.get(dimension, {}).get(value, 0)
+
+        return {
+            "granularity": granularity,
+            "totals": totals,
+            "usage": {tile: sum(total(k) for k in keys) for tile, keys in USAGE_TILES.items()},
+            "series": [
+                {"bucket": datetime.fromtimestamp(b, timezone.utc).isoformat(), "counts": counts}
+                for b, counts in series.items()
+            ],
+        }
+
+
+def _nest(target, key, count):
+    dimension, _, value = key.partition(':')
+    target.setdefault(dimension, {})[value] = count
@@ -0,0 +1,163 @@
+"""
+ExportShield: XUAR Gazetteer Matcher
+------------------------------------
+Detects Xinjiang (XUAR) place names in supplier address / region text.
+Inputs: Free text (address, region, origin) in Latin or Chinese script
+Outputs: Matched places (name, level, parent, matched variant)
+
+All gazetteer variants are compiled into one Aho-Corasick automaton, so a
+record is scanned in a single pass and the cost per record depends on the
+text length, not on the number of place names.
+"""
+
+import json
+import os
+import unicodedata
+
+# =============================================================================
+# AUTOMATON
+# =============================================================================
+
+class MultiPatternMatcher:
+    """Aho-Corasick automaton over upper-cased patterns."""
+
+    def __init__(self):
+        self._goto = [{}]      # state -> {char: next_state}
+        self._fail = [0]
+        self._out = [[]]       # state -> [pattern_id]
+        self._patterns = []    # pattern_id -> (pattern, payload)
+        self._compiled = False
+
+    def add(self, pattern, payload):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self._patterns))
+        self._patterns.append((pattern, payload))
+        self._compiled = False
+
+    def compile(self):
+        """Build failure links (BFS) and merge output sets."""
+        queue = list(self._goto[0].values())
+        for s in queue:
+            self._fail[s] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._compiled = True
+
+    def finditer(self, text):
+        """Yield (start, end, pattern, payload) for every occurrence in `text`."""
+        if not self._compiled:
+            self.compile()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in out[state]:
+                pattern, payload = patterns[pid]
+                yield i - len(pattern) + 1, i + 1, pattern, payload
+
+
+def normalize_text(text):
+    """Upper-case, strip diacritics (Ürümqi -> URUMQI) and unify separators."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.replace('-', ' ').replace('_', ' ').upper().split())
+
+# Words that put an ambiguous Latin place name in a Chinese context
+CHINA_CONTEXT = ("CHINA", "PRC", "中国")
+
+# Context a variant needs before it counts: none, China, or XUAR itself
+_NEEDS_NONE, _NEEDS_CHINA, _NEEDS_XUAR = 0, 1, 2
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+# =============================================================================
+# GAZETTEER
+# =============================================================================
+
+def load_gazetteer(file_path=None):
+    """Compile `data/xuar_gazetteer.json` into a matcher."""
+    if file_path is None:
+        file_path = os.path.join(os.path.dirname(__file__), 'data', 'xuar_gazetteer.json')
+    matcher = MultiPatternMatcher()
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {file_path} not found. Falling back to XINJIANG/XUAR keywords only.")
+        data = {"places": [{"name": "Xinjiang Uyghur Autonomous Region", "level": "region",
+                            "parent": None, "variants": ["XINJIANG", "XUAR"]}]}
+
+    for place in data.get('places', []):
+        info = {"name": place['name'], "level": place.get('level'), "parent": place.get('parent')}
+        ambiguous = {normalize_text(v) for v in place.get('ambiguous', [])}
+        homonyms = {normalize_text(v) for v in place.get('homonyms', [])}
+        for variant in place.get('variants', []):
+            pattern = normalize_text(variant)
+            needs = _NEEDS_XUAR if pattern in homonyms else _NEEDS_CHINA if pattern in ambiguous else _NEEDS_NONE
+            matcher.add(pattern, (info, needs))
+    for word in CHINA_CONTEXT:
+        matcher.add(normalize_text(word), (None, _NEEDS_NONE))
+    matcher.compile()
+    return matcher
+
+XUAR_GAZETTEER = load_gazetteer()
+
+def find_xuar_places(*texts):
+    """
+    Scans each text once and returns distinct matched places:
+    [{ name, level, parent, variant }]
+    Latin variants must sit on word boundaries; Chinese-script variants match anywhere.
+    Ambiguous variants (Aksu is also in Turkey) only count when one of the texts
+    names China or an unambiguous XUAR place; homonyms (北屯 is also in Taichung)
+    only count next to an unambiguous XUAR place such as XINJIANG or 新疆.
+    """
+    found = {}
+    pending = {}   # name -> (needs, place)
+    context = _NEEDS_NONE
+    for text in texts:
+        norm = normalize_text(text)
+        if not norm:
+            continue
+        for start, end, pattern, (info, needs) in XUAR_GAZETTEER.finditer(norm):
+            if pattern.isascii():
+                if start > 0 and _is_word_char(norm[start - 1]):
+                    continue
+                if end < len(norm) and _is_word_char(norm[end]):
+                    continue
+            if info is None:
+                context = max(context, _NEEDS_CHINA)
+                continue
+            if needs:
+                if info['name'] not in pending or needs < pending[info['name']][0]:
+                    pending[info['name']] = (needs, {**info, "variant": pattern})
+                continue
+            context = _NEEDS_XUAR
+            if info['name'] not in found:
+                found[info['name']] = {**info, "variant": pattern}
+    for name, (needs, place) in pending.items():
+        if needs <= context:
+            found.setdefault(name, place)
+    return list(found.values())
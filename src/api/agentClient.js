@@ -10,15 +10,17 @@ import { API_URL } from '../config/api';
  * Calls the /agent endpoint.
  * @param {Array} messages - Chat history [{role, content}]
  * @param {Object} context - Structured shipment data (eccn, destination, etc.)
+ * @param {string} [sessionId] - session_id from a previous AgentResponse (reuses engine results)
  * @returns {Promise<Object>} - AgentResponse
  */
-async function callAgent(messages, context) {
+async function callAgent(messages, context, sessionId) {
     // Ensure context has valueUsd mapped if available so we don't depend on Orchestrator doing it all (though it does)
     // Actually, let's just pass what we have.
 
     const payload = {
         messages,
-        context
+        context,
+        session_id: sessionId
     };
 
     const response = await fetch(`${API_URL}/agent`, {
@@ -63,10 +65,67 @@ export async function runShipmentEvaluation(formData) {
  * Runs a chat interaction.
  * @param {Array} history - Full message history
  * @param {Object} currentContext - Current form data context
+ * @param {string} [sessionId] - session_id returned by the previous turn
  * @returns {Promise<Object>} - The raw AgentResponse
  */
-export async function runAgentChat(history, currentContext) {
-    return await callAgent(history, currentContext);
+export async function runAgentChat(history, currentContext, sessionId) {
+    return await callAgent(history, currentContext, sessionId);
+}
+
+/**
+ * Streaming chat via /agent/stream (Server-Sent Events over a POST body).
+ * @param {Array} history - Full message history
+ * @param {Object} currentContext - Current form data context
+ * @param {Object} handlers - { onMessage(msg), onToken(text), onStatus(status) }
+ * @param {string} [sessionId] - session_id returned by the previous turn
+ * @returns {Promise<Object>} - The final AgentResponse (same shape as runAgentChat)
+ */
+export async function streamAgentChat(history, currentContext, handlers = {}, sessionId) {
+    const response = await fetch(`${API_URL}/agent/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify({ messages: history, context: currentContext, session_id: sessionId })
+    });
+
+    if (!response.ok || !response.body) {
+        const errorText = await response.text();
+        throw new Error(`Agent API Error: ${response.status} ${errorText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let final = null;
+
+    const dispatch = (block) => {
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        if (!data) return;
+        const payload = JSON.parse(data);
+        if (event === 'message') handlers.onMessage?.(payload);
+        else if (event === 'token') handlers.onToken?.(payload.text);
+        else if (event === 'status') handlers.onStatus?.(payload);
+        else if (event === 'done') final = payload;
+        else if (event === 'error') throw new Error(payload.error || 'Agent stream error');
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buffer.indexOf('\n\n')) !== -1) {
+            dispatch(buffer.slice(0, idx));
+            buffer = buffer.slice(idx + 2);
+        }
+    }
+    if (buffer.trim()) dispatch(buffer);
+
+    return final;
 }
 
 /**
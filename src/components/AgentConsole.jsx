@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, useMemo } from 'react';
 import { Send, Sparkles, RefreshCw, Paperclip, AlertOctagon, LayoutDashboard } from 'lucide-react';
-import { runAgentChat } from '../api/agentClient';
+import { streamAgentChat } from '../api/agentClient';
 import { API_URL } from '../config/api';
 import AIOrb from './AIOrb';
 import SidebarPanel from './SidebarPanel';
@@ -17,12 +17,13 @@ const AgentConsole = () => {
     const [isAgentThinking, setIsAgentThinking] = useState(false);
     const [loading, setLoading] = useState(false);
     const [mood, setMood] = useState('idle');
-    const { stats, increment } = useUsageStats(); // Hook
+    const { stats, refresh: refreshStats } = useUsageStats(); // Hook
 
     // Restoring missing state for Sidebar/Context
     const [isSidebarOpen, setIsSidebarOpen] = useState(false);
     const [formData, setFormData] = useState({});
     const [lastAgentResponse, setLastAgentResponse] = useState(null);
+    const [sessionId, setSessionId] = useState(null);
 
     const messagesEndRef = useRef(null);
     const scrollToBottom = () => messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -68,19 +69,32 @@ const AgentConsole = () => {
         setMood('thinking');
         setIsAgentThinking(true);
 
-        // Track usage (heuristic)
-        if (query.toLowerCase().includes('license') || query.toLowerCase().includes('eccn')) increment('licenseChecks');
-        if (query.toLowerCase().includes('screen') || query.toLowerCase().includes('party')) increment('entityScreening');
-        if (query.toLowerCase().includes('uflpa') || query.toLowerCase().includes('labor')) increment('forcedLabor');
-
         try {
             // Actual API Call
             // Fix: Pass full history, not just query string
             // We also pass the current formData (context) so the backend knows what we already have
-            const response = await runAgentChat([...messages, userMsg], formData);
-
-            if (response && response.messages) {
-                setMessages(prev => [...prev, ...response.messages]);
+            // Bubbles are appended as the backend emits them; narrative tokens
+            // render into a draft bubble that the final text message replaces.
+            let draftOpen = false;
+            const response = await streamAgentChat([...messages, userMsg], formData, {
+                onToken: (text) => {
+                    const first = !draftOpen;
+                    draftOpen = true;
+                    setMessages(prev => {
+                        if (first) return [...prev, { role: 'assistant', kind: 'text', content: text, streaming: true }];
+                        const last = prev[prev.length - 1];
+                        return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+                    });
+                },
+                onMessage: (msg) => {
+                    const replaceDraft = draftOpen && msg.kind === 'text';
+                    if (replaceDraft) draftOpen = false;
+                    setMessages(prev => replaceDraft ? [...prev.slice(0, -1), msg] : [...prev, msg]);
+                }
+            }, sessionId);
+
+            if (response) {
+                if (response.session_id) setSessionId(response.session_id);
                 if (response.mood) setMood(response.mood);
 
                 // CRITICAL: Update State from Backend
@@ -99,6 +113,8 @@ const AgentConsole = () => {
         } finally {
             setLoading(false);
             setIsAgentThinking(false);
+            // Usage is counted server-side from the audit log
+            refreshStats();
         }
     };
 
@@ -107,6 +123,7 @@ const AgentConsole = () => {
         setMood('idle');
         setFormData({});
         setLastAgentResponse(null);
+        setSessionId(null);
     };
 
     const isLanding = messages.length === 0;
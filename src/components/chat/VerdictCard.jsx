@@ -22,6 +22,16 @@ const VerdictCard = ({ data }) => {
         };
     }
 
+    if (status === 'UNKNOWN') {
+        config = {
+            icon: ShieldAlert,
+            bg: "bg-gradient-to-br from-slate-500 to-slate-600",
+            shadow: "shadow-slate-200",
+            title: "Incomplete",
+            desc: "License determination unavailable. Re-run the check before shipping."
+        };
+    }
+
     if (status === 'BLOCKED') {
         config = {
             icon: ShieldBan,
@@ -1,38 +1,50 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
+import { API_URL } from '../config/api';
 
 const STORAGE_KEY = 'export_shield_stats';
 
+const EMPTY_STATS = {
+    licenseChecks: 0,
+    entityScreening: 0,
+    forcedLabor: 0,
+    docs: 0
+};
+
+/**
+ * Dashboard usage tiles from the backend's /stats counters (maintained from the
+ * audit log, so they count every request, from any client).
+ * The last response is cached so the tiles have values while offline.
+ */
 export const useUsageStats = () => {
-    const [stats, setStats] = useState({
-        licenseChecks: 0,
-        entityScreening: 0,
-        forcedLabor: 0,
-        docs: 0
+    const [stats, setStats] = useState(() => {
+        try {
+            const parsed = JSON.parse(localStorage.getItem(STORAGE_KEY));
+            if (parsed && typeof parsed === 'object') return { ...EMPTY_STATS, ...parsed };
+        } catch (e) {
+            console.warn('Failed to parse usage stats', e);
+            localStorage.removeItem(STORAGE_KEY);
+        }
+        return EMPTY_STATS;
     });
 
-    useEffect(() => {
-        const stored = localStorage.getItem(STORAGE_KEY);
-        if (stored) {
-            try {
-                const parsed = JSON.parse(stored);
-                if (parsed && typeof parsed === 'object') {
-                    setStats(parsed);
-                }
-            } catch (e) {
-                console.warn('Failed to parse usage stats', e);
-                // Optional: clear bad data
-                localStorage.removeItem(STORAGE_KEY);
+    const refresh = useCallback(async () => {
+        try {
+            const response = await fetch(`${API_URL}/stats`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const data = await response.json();
+            if (data && data.usage) {
+                const next = { ...EMPTY_STATS, ...data.usage };
+                localStorage.setItem(STORAGE_KEY, JSON.stringify(next));
+                setStats(next);
             }
+        } catch (e) {
+            console.warn('Failed to fetch usage stats', e);
         }
     }, []);
 
-    const increment = (key) => {
-        setStats(prev => {
-            const next = { ...prev, [key]: (prev[key] || 0) + 1 };
-            localStorage.setItem(STORAGE_KEY, JSON.stringify(next));
-            return next;
-        });
-    };
+    useEffect(() => {
+        refresh();
+    }, [refresh]);
 
-    return { stats, increment };
+    return { stats, refresh };
 };